@@ -13,6 +13,15 @@ def get_version():
                 return line.split(delim)[1]
     raise RuntimeError("Unable to find version string.")
 
+# Optional Cython kernel for installs without numba; skipped if Cython is missing
+def get_ext_modules():
+    try:
+        from Cython.Build import cythonize
+    except ImportError:
+        return []
+    return cythonize([os.path.join("smard_utils", "_battery_kernel.pyx")],
+                     compiler_directives={"language_level": "3"})
+
 class PyTest(TestCommand):
     user_options = []
 
@@ -40,6 +49,7 @@ setup(
         "seaborn",
     ],
     tests_require=["pytest","pytest-cov"],
+    ext_modules=get_ext_modules(),
     cmdclass={"test": PyTest},
     entry_points={
         "console_scripts": [
@@ -0,0 +1,156 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+# -*- coding: utf-8 -*-
+"""
+Cython-Fassung von _simulate_scan (battery_model) und _aggregate (battery_simulation).
+
+Vorkompiliert, also ohne JIT-Aufwärmzeit; battery_model und
+battery_simulation verwenden sie nur, wenn numba fehlt. Bauen mit:
+
+    pip install cython
+    python setup.py build_ext --inplace
+
+Gleiche Argumente und Rückgaben wie die Python-Kerne, Rechenweg wie
+_loading_step Schritt für Schritt.
+"""
+
+import numpy as np
+
+from cython cimport floating
+from libc.math cimport pow
+
+
+ctypedef struct Step:
+    double storage
+    double inflow
+    double outflow
+    double residual
+    double exflow
+    double loss
+
+
+cdef inline double _r0_coef(double dt_h, double r0_ohm, double u_nom) noexcept nogil:
+    """Faktor k mit I²R₀-Verlust [kWh] = k · P², wie battery_model._r0_coef."""
+    if r0_ohm <= 0 or u_nom <= 0:
+        return 0.0
+    return (1000.0 / u_nom) ** 2 * r0_ohm * dt_h / 1000.0
+
+
+cdef inline double _saturation_curve(double x, double df, double df_min, double sub) noexcept nogil:
+    """Konkave Sättigungskurve, wie battery_model._saturation_curve."""
+    if sub > 0:
+        return sub
+    cdef double u = (x - df_min) / (1 - df_min)
+    return 1 - pow(1 - u, df)
+
+
+cdef Step _loading_step(signed char strategy, double renew, double demand, double storage,
+                        double cap, double ppstep, double dt, double eff_c, double eff_d,
+                        double min_soc, double max_soc, double decay, double r0k,
+                        double discharging_factor) except *:
+    """Ein Zeitschritt, wie battery_model._loading_step."""
+    cdef Step s
+    cdef double _exflow = 0.0
+    cdef double energy_balance = renew - demand
+    cdef double lo = min_soc * cap
+    cdef double hi = max_soc * cap
+    cdef double max_energy = ppstep * dt
+    cdef double room, allowed_energy, actual_charge, stored_energy
+    cdef double needed, available, limit, requested, candidate
+    s.inflow = s.outflow = s.residual = s.exflow = s.loss = 0.0
+
+    if strategy == 1:    # Balance.LOAD
+        room = hi - storage
+        allowed_energy = room if room < max_energy else max_energy
+        actual_charge = allowed_energy if allowed_energy < energy_balance else energy_balance
+        actual_charge = actual_charge if actual_charge > 0.0 else 0.0
+        s.loss = r0k * (actual_charge / dt) * (actual_charge / dt)
+        stored_energy = actual_charge - s.loss
+        stored_energy = (stored_energy if stored_energy > 0.0 else 0.0) * eff_c
+        s.inflow = stored_energy
+        storage += stored_energy
+        _exflow = energy_balance - actual_charge
+    elif strategy == 2:  # Balance.UNLOAD
+        needed = -energy_balance
+        if not needed >= 0.0:
+            raise ValueError("Something strange with model")
+        available = storage - lo
+        limit = available if available < max_energy else max_energy
+        allowed_energy = _saturation_curve(discharging_factor, 3.0, 0.7, 0.0) * limit
+        requested = needed / (1e-9 if 1e-9 > eff_d else eff_d)
+        candidate = requested if requested < allowed_energy else allowed_energy
+        candidate = candidate if candidate > 0.0 else 0.0
+        s.loss = r0k * (candidate / dt) * (candidate / dt)
+        s.outflow = (candidate - s.loss) * eff_d
+        s.outflow = s.outflow if s.outflow > 0.0 else 0.0
+        storage -= candidate
+        s.residual = needed - s.outflow
+    elif strategy == 3:  # Balance.EXPORT
+        _exflow = energy_balance if energy_balance > 0.0 else 0.0
+
+    if _exflow > 0:
+        s.exflow = _exflow
+
+    # Selbstentladung und clamp
+    storage *= decay
+    s.storage = lo if storage < lo else (hi if storage > hi else storage)
+    return s
+
+
+def simulate_scan(const signed char[:] strategy, const floating[:] renew,
+                  const floating[:] demand, const double[:] factors, double storage,
+                  double capacity, double power, double dt_h, double eff_c, double eff_d,
+                  double min_soc, double max_soc, double disch, double r0, double u_nom):
+    """
+    Ganze Zeitreihe mit _loading_step in einem Durchlauf (wie _simulate_scan).
+
+    Ergebnis-Arrays im dtype von renew, der Ladestand läuft in double.
+    """
+    cdef Py_ssize_t i, n = renew.shape[0]
+    dtype = np.float32 if floating is float else np.float64
+    storage_levels_a = np.empty(n, dtype)
+    inflows_a = np.empty(n, dtype)
+    outflows_a = np.empty(n, dtype)
+    residuals_a = np.empty(n, dtype)
+    exflows_a = np.empty(n, dtype)
+    losses_a = np.empty(n, dtype)
+    exporting_a = np.empty(n, dtype=np.bool_)
+    cdef floating[::1] storage_levels = storage_levels_a
+    cdef floating[::1] inflows = inflows_a
+    cdef floating[::1] outflows = outflows_a
+    cdef floating[::1] residuals = residuals_a
+    cdef floating[::1] exflows = exflows_a
+    cdef floating[::1] losses = losses_a
+    cdef unsigned char[::1] exporting = exporting_a.view(np.uint8)
+    cdef double decay = 1.0 - disch * dt_h
+    cdef double r0k = _r0_coef(dt_h, r0, u_nom)
+    cdef Step s
+
+    for i in range(n):
+        s = _loading_step(strategy[i], renew[i], demand[i], storage, capacity, power, dt_h,
+                          eff_c, eff_d, min_soc, max_soc, decay, r0k, factors[i])
+        storage = s.storage
+        storage_levels[i] = <floating>s.storage
+        inflows[i] = <floating>s.inflow
+        outflows[i] = <floating>s.outflow
+        residuals[i] = <floating>s.residual
+        exflows[i] = <floating>s.exflow
+        losses[i] = <floating>s.loss
+        exporting[i] = s.exflow > 0
+    return (storage_levels_a, inflows_a, outflows_a, residuals_a, exflows_a, losses_a,
+            exporting_a)
+
+
+def aggregate(const floating[:] demand, const floating[:] residuals, const floating[:] exflows,
+              const floating[:] losses, const floating[:] price, double marketing_costs):
+    """Kennzahlen-Summen in einem Durchlauf (wie _aggregate)."""
+    cdef double demand_total = 0.0, residual_total = 0.0, exflow_total = 0.0
+    cdef double loss_total = 0.0, spot = 0.0, revenue = 0.0
+    cdef Py_ssize_t i
+    for i in range(residuals.shape[0]):
+        demand_total += demand[i]
+        residual_total += residuals[i]
+        exflow_total += exflows[i]
+        loss_total += losses[i]
+        spot += residuals[i] * price[i]
+        revenue += exflows[i] * (price[i] - marketing_costs)
+    return demand_total, residual_total, exflow_total, loss_total, spot, revenue
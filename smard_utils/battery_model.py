@@ -3,8 +3,28 @@
 # -*- coding: utf-8 -*-
 # bat_model_extended.py
 import numpy as np
+import pandas as pd
 
+from collections import ChainMap
 from enum import Enum
+from smard_utils.utils.jit import NUMBA_AVAILABLE, njit, prange, vectorize
+
+try:
+    from scipy.optimize import linprog
+except ImportError:
+    linprog = None
+
+# Spalten von BatteryModel.history (je Feld ein float64-Array statt dict pro Schritt)
+HISTORY_FIELDS = ("storage_kwh", "soc", "inflow_kwh", "outflow_kwh", "residual_kwh",
+                  "exflow_kwh", "loss_kwh", "price", "avrgprice")
+
+def _apply_defaults(obj, defaults):
+    """Defaults hinten an obj.basic_data_set (ChainMap) hängen und als Attribute setzen."""
+    data_set = obj.basic_data_set
+    data_set.maps.append(defaults)
+    for k in defaults:
+        setattr(obj, k, data_set[k])
+
 
 # Einfaches Enum
 class Balance(Enum):
@@ -13,52 +33,632 @@ class Balance(Enum):
     UNLOAD = 2
     EXPORT = 3
 
+
+def _balance_strategy(renew, demand):
+    """Balance.value je Schritt aus Überschuss/Bedarf, als Masken statt verschachteltem np.where.
+
+    Überschuss → LOAD, Bedarf → UNLOAD, ausgeglichen (oder NaN) → NONE.
+    """
+    energy_balance = renew - demand
+    strategy = (energy_balance > 0).astype(np.int8)              # Balance.LOAD
+    strategy[energy_balance < 0] = Balance.UNLOAD.value
+    return strategy
+
+
+@njit(cache=True)
+def _r0_coef(dt_h, r0_ohm, u_nom):
+    """Faktor k mit I²R₀-Verlust [kWh] = k · P² (P in kW); 0, wenn R₀ oder U abgeschaltet."""
+    if r0_ohm <= 0 or u_nom <= 0:
+        return 0.0
+    # (P·1000/U)²·R₀ [W] · dt_h / 1000 → kWh
+    return (1000.0 / u_nom) ** 2 * r0_ohm * dt_h / 1000.0
+
+
+@njit(cache=True)
+def _r0_loss(power_kw, dt_h, r0_ohm, u_nom):
+    """I²R₀-Verlust (kWh) für gegebene Leistung und Dauer."""
+    return _r0_coef(dt_h, r0_ohm, u_nom) * power_kw * power_kw
+
+
+@njit(cache=True)
+def _r0_loss_k(r0k, power_kw):
+    """I²R₀-Verlust (kWh) mit vorab berechnetem r0k = _r0_coef(dt_h, r0_ohm, u_nom)."""
+    return r0k * power_kw * power_kw
+
+
+@vectorize(["float64(float64, float64, float64, float64)"], cache=True)
+def r0_losses(power_kw, dt_h, r0_ohm, u_nom):
+    """I²R₀-Verlust (kWh) elementweise über Arrays (ufunc, gleiche Formel wie _r0_loss)."""
+    return _r0_coef(dt_h, r0_ohm, u_nom) * power_kw * power_kw
+
+
+def battery_r0_losses(power_kw, dt_h, r0_ohm, u_nom):
+    """I²R₀-Verlust (kWh) für Skalar oder Array; gemeinsamer Kern der Batteriemodelle."""
+    if np.ndim(power_kw):
+        return r0_losses(power_kw, dt_h, r0_ohm, u_nom)
+    return _r0_loss(float(power_kw), dt_h, r0_ohm, u_nom)
+
+
+@njit(cache=True)
+def _saturation_curve(x, df, df_min, sub):
+    """
+    Konkave Sättigungskurve
+    - f(df_min) = 0
+    - f(1) = 1
+    - f'(df_min) = hoch (steil am Anfang)
+    - f'(1) = 0 (flach am Ende)
+    """
+    if sub > 0:
+        return sub
+    u = (x - df_min) / (1 - df_min)
+    return 1 - (1 - u) ** df
+
+
+@njit(cache=True)
+def _loading_step(strategy, renew, demand, storage, cap, ppstep, dt,
+                  eff_c, eff_d, min_soc, max_soc, decay, r0k,
+                  discharging_factor):
+    """
+    Ein Zeitschritt von BatteryModel.loading_strategie, nur mit floats.
+
+    strategy ist Balance.value, decay = 1 - Selbstentladung · dt und
+    r0k = _r0_coef(dt, R₀, U) (beide vom Aufrufer einmal je Lauf berechnet,
+    damit die R₀-Abfrage nicht in jedem Schritt läuft). Rückgabe:
+    (storage, inflow, outflow, residual, exflow, loss)
+
+    min/max als Ternär: gleiche Werte wie die Builtins, aber ohne generischen
+    Aufruf, falls ohne numba in CPython ausgeführt. Lade-/Entlademengen werden
+    auf ≥ 0 geklemmt statt verzweigt; eine Menge 0 ergibt dieselben Flüsse.
+    """
+    inflow = outflow = residual = exflow = _exflow = loss = 0.0
+    energy_balance = renew - demand   # positiv = Überschuss, negativ = Bedarf
+    lo = min_soc * cap                # Speichergrenzen [kWh]
+    hi = max_soc * cap
+    max_energy = ppstep * dt          # Leistungsgrenze im Zeitschritt [kWh]
+
+    if strategy == 1:    # Balance.LOAD
+        # Laden aus Überschuss
+        room = hi - storage
+        allowed_energy = room if room < max_energy else max_energy
+        # kWh aus Überschuss, bevor Verluste
+        actual_charge = allowed_energy if allowed_energy < energy_balance else energy_balance
+        actual_charge = actual_charge if actual_charge > 0.0 else 0.0
+        loss = _r0_loss_k(r0k, actual_charge / dt)
+        stored_energy = actual_charge - loss
+        stored_energy = (stored_energy if stored_energy > 0.0 else 0.0) * eff_c
+        inflow = stored_energy
+        storage += stored_energy
+        # exflow = überschüssige Energie, die nicht geladen wurde (immer setzen)
+        _exflow = energy_balance - actual_charge
+    elif strategy == 2:  # Balance.UNLOAD
+        # Entladen zur Bedarfsdeckung
+        needed = -energy_balance       # Bedarf ≥ 0 (statt fabs + Vergleich)
+        if not needed >= 0.0:
+            raise ValueError("Something strange with model")
+        # Obergrenze der entnehmbaren Energie in einem Zeitschritt Δt fest —
+        # also die maximale Energiemenge, die die Batterie in dieser Stunde
+        #  (oder Zeitschrittlänge dt_h) abgeben darf, ohne physikalische oder
+        #  betriebliche Grenzen zu verletzen.
+        # good for all 20 MWh, best for >> 20 MWh: df, df_min, sub = 3, 0.7, 0.0
+        #  best for capacity <= 20 MWh, ok vor >> 20 MWh: 1.3, 0.8, 1.0
+        available = storage - lo
+        limit = available if available < max_energy else max_energy
+        allowed_energy = _saturation_curve(discharging_factor, 3.0, 0.7, 0.0) * limit
+        # Wähle candidate so, dass netto möglichst den Bedarf trifft (einfacher Ansatz)
+        # candidate ist Energie, die aus dem Speicher entnommen wird (kWh)
+        requested = needed / (1e-9 if 1e-9 > eff_d else eff_d)
+        candidate = requested if requested < allowed_energy else allowed_energy
+        candidate = candidate if candidate > 0.0 else 0.0
+        loss = _r0_loss_k(r0k, candidate / dt)
+        # Nettolieferung an Netz / Last:
+        outflow = (candidate - loss) * eff_d
+        outflow = outflow if outflow > 0.0 else 0.0
+        storage -= candidate
+        residual = needed - outflow
+    elif strategy == 3:  # Balance.EXPORT
+        _exflow = energy_balance if energy_balance > 0.0 else 0.0
+
+    if _exflow > 0:
+        exflow = _exflow
+
+    # Selbstentladung und clamp (Ternär-Form → minsd/maxsd ohne Sprung)
+    storage *= decay
+    storage = lo if storage < lo else (hi if storage > hi else storage)
+
+    return storage, inflow, outflow, residual, exflow, loss
+
+@njit(cache=True)
+def _source_step(decision, renew, storage, cap, ppstep, dt,
+                 eff_c, eff_d, min_soc, max_soc, decay, r0k):
+    """
+    Ein Zeitschritt von BatterySourceModel.loading_strategie, nur mit floats.
+
+    decision ist Balance.value aus _source_decisions. Rückgabe:
+    (storage, inflow, outflow, residual, exflow, loss, exporting)
+    """
+    inflow = outflow = residual = exflow = loss = 0.0
+    exporting = False
+    max_energy = ppstep * dt
+
+    if decision == 1:    # Balance.LOAD
+        room = (max_soc * cap) - storage
+        allowed_energy = room if room < max_energy else max_energy
+        actual_charge = allowed_energy if allowed_energy < renew else renew
+        actual_charge = actual_charge if actual_charge > 0.0 else 0.0
+        loss = _r0_loss_k(r0k, actual_charge / dt)
+        stored_energy = (actual_charge - loss) * eff_c
+        inflow = stored_energy
+        storage += stored_energy
+        exflow = renew - actual_charge
+        exflow = exflow if exflow > 0 else 0.0
+        exporting = exflow > 0
+    elif decision == 2:  # Balance.UNLOAD
+        available = storage - min_soc * cap
+        allowed_energy = available if available < max_energy else max_energy
+        actual_discharge = allowed_energy if allowed_energy < renew else renew
+        actual_discharge = actual_discharge if actual_discharge > 0.0 else 0.0
+        loss = _r0_loss_k(r0k, actual_discharge / dt)
+        outflow = (actual_discharge - loss) * eff_d
+        storage -= (actual_discharge / eff_d)
+        exflow = renew + outflow
+        exflow = exflow if exflow > 0 else 0.0
+        exporting = exflow > 0
+    elif decision == 3:  # Balance.EXPORT
+        exflow = renew
+        exporting = True
+
+    # Selbstentladung und clamp
+    storage *= decay
+    lo, hi = min_soc * cap, max_soc * cap
+    storage = lo if storage < lo else (hi if storage > hi else storage)
+
+    return storage, inflow, outflow, residual, exflow, loss, exporting
+
+
+@njit(cache=True)
+def _solbat_step(branch, renew, storage, cap, ppstep, dt, price, discharging_factor,
+                 control_exflow, eff_c, eff_d, min_soc, max_soc, decay, r0k):
+    """
+    Ein Zeitschritt von BatterySolBatModel.loading_strategie, nur mit floats.
+
+    branch: 1 = Entladen (battery_cond_export_a), 2 = Laden (battery_cond_load),
+    3 = Export (battery_cond_export_b), 0 = nichts. Die Bedingungen bleiben
+    Methoden des Modells (überschreibbar) und werden vorher ausgewertet.
+    Rückgabe: (storage, inflow, outflow, residual, exflow, loss, exporting)
+    """
+    inflow = outflow = residual = exflow = loss = 0.0
+    exporting = False
+    max_energy = ppstep * dt
+
+    if branch == 1:
+        # Entladen; good for all 20 MWh, best for >> 20 MWh: df, df_min, sub = 3, 0.7, 0.0
+        available = storage - min_soc * cap
+        limit = available if available < max_energy else max_energy
+        actual_discharge = _saturation_curve(discharging_factor, 3.0, 0.7, 0.0) * limit
+        actual_discharge = actual_discharge if actual_discharge > 0.0 else 0.0
+        loss = _r0_loss_k(r0k, actual_discharge / dt)
+        outflow = (actual_discharge - loss) * eff_d
+        storage -= (actual_discharge / eff_d)
+        exflow = renew + outflow
+        exporting = True
+        if exflow < 0:
+            raise ValueError("exflow < 0")
+    elif branch == 2:
+        # Laden
+        room = (max_soc * cap) - storage
+        allowed_energy = room if room < max_energy else max_energy
+        actual_charge = allowed_energy if allowed_energy < renew else renew
+        actual_charge = actual_charge if actual_charge > 0.0 else 0.0
+        loss = _r0_loss_k(r0k, actual_charge / dt)
+        stored_energy = (actual_charge - loss) * eff_c
+        inflow = stored_energy
+        storage += stored_energy
+        if renew > actual_charge and price > 0.0 and control_exflow > 0:
+            exflow = renew - actual_charge
+            exporting = True
+    elif branch == 3:
+        exflow = renew if renew > 0 else 0.0
+        exporting = exflow > 0
+
+    # Selbstentladung und clamp
+    storage *= decay
+    lo, hi = min_soc * cap, max_soc * cap
+    storage = lo if storage < lo else (hi if storage > hi else storage)
+
+    return storage, inflow, outflow, residual, exflow, loss, exporting
+
+
+@njit(cache=True)
+def _source_decisions(price, limit, hysteresis, last_cycle):
+    """
+    Entscheidungen von BatterySourceModel.is_loading/is_unloading für die
+    ganze Zeitreihe. limit = load_threshold * avrgprice (vorab vektoriell).
+
+    Rückgabe: (Balance.value je Schritt, last_cycle nach dem letzten Schritt)
+
+    Ohne Sprünge formuliert: is_unloading greift nur, wenn is_loading
+    nicht lädt, also p >= limit; sein zweiter Zweig (p < limit nach
+    last_cycle = 0) kann dann nie greifen. Bleiben drei Vergleiche, die
+    Entscheidung als Summe der Wahrheitswerte und last_cycle als Auswahl.
+    """
+    decisions = np.empty(price.size, np.int8)
+    for i in range(price.size):
+        p = price[i]
+        lim = limit[i]
+        below = p < lim
+        load = below | (p < lim + last_cycle)
+        unload = (p > lim) & ~load
+        export = (p > 0.0) & ~(load | unload)
+        # 1 = Balance.LOAD, 2 = Balance.UNLOAD, 3 = Balance.EXPORT, sonst NONE
+        decisions[i] = load + 2 * unload + 3 * export
+        # laden: Hysterese setzen bzw. halten, entladen: -Hysterese, sonst 0
+        last_cycle = hysteresis if below else (
+            last_cycle if load else (-hysteresis if unload else 0.0))
+    return decisions, last_cycle
+
+
+@njit(cache=True)
+def _plan_step(charge, discharge, renew, demand, storage, cap, ppstep, dt,
+               eff_c, eff_d, min_soc, max_soc, decay, r0k):
+    """
+    Ein Zeitschritt von BatteryLPModel: geplante Lade- bzw. Entlademenge [kWh]
+    mit Leistungs-, SOC- und R0-Grenzen umsetzen.
+
+    Laden nur aus Überschuss, Entladen deckt Bedarf oder geht ins Netz.
+    Rückgabe: (storage, inflow, outflow, residual, exflow, loss)
+    """
+    inflow = outflow = loss = 0.0
+    lo = min_soc * cap
+    hi = max_soc * cap
+    max_energy = ppstep * dt
+    surplus = renew - demand
+
+    if charge > 0:
+        room = hi - storage
+        limit = room if room < max_energy else max_energy
+        limit = limit if limit < surplus else surplus
+        actual = charge if charge < limit else limit
+        if actual > 0:
+            loss = _r0_loss_k(r0k, actual / dt)
+            stored = actual - loss
+            inflow = (stored if stored > 0.0 else 0.0) * eff_c
+            storage += inflow
+            surplus -= actual
+    elif discharge > 0:
+        available = storage - lo
+        limit = available if available < max_energy else max_energy
+        actual = discharge if discharge < limit else limit
+        if actual > 0:
+            loss = _r0_loss_k(r0k, actual / dt)
+            outflow = (actual - loss) * eff_d
+            outflow = outflow if outflow > 0.0 else 0.0
+            storage -= actual
+            surplus += outflow
+
+    residual = -surplus if surplus < 0.0 else 0.0
+    exflow = surplus if surplus > 0.0 else 0.0
+
+    storage *= decay
+    storage = lo if storage < lo else (hi if storage > hi else storage)
+    return storage, inflow, outflow, residual, exflow, loss
+
+
+@njit(cache=True)
+def _simulate_plan(charge, discharge, renew, demand, storage, capacity, power, dt_h,
+                   eff_c, eff_d, min_soc, max_soc, disch, r0, u_nom):
+    """Geplante Lade-/Entlademengen mit _plan_step über ein Zeitfenster."""
+    n = renew.shape[0]
+    storage_levels = np.empty(n, renew.dtype)
+    inflows = np.empty(n, renew.dtype)
+    outflows = np.empty(n, renew.dtype)
+    residuals = np.empty(n, renew.dtype)
+    exflows = np.empty(n, renew.dtype)
+    losses = np.empty(n, renew.dtype)
+    exporting = np.empty(n, dtype=np.bool_)
+    decay = 1.0 - disch * dt_h
+    r0k = _r0_coef(dt_h, r0, u_nom)
+    for i in range(n):
+        storage, inflow, outflow, residual, exflow, loss = _plan_step(
+            charge[i], discharge[i], renew[i], demand[i], storage, capacity, power, dt_h,
+            eff_c, eff_d, min_soc, max_soc, decay, r0k)
+        storage_levels[i] = storage
+        inflows[i] = inflow
+        outflows[i] = outflow
+        residuals[i] = residual
+        exflows[i] = exflow
+        losses[i] = loss
+        exporting[i] = exflow > 0
+    return storage_levels, inflows, outflows, residuals, exflows, losses, exporting
+
+
+@njit(cache=True)
+def _py_simulate_scan(strategy, renew, demand, factors, storage, capacity, power, dt_h,
+                   eff_c, eff_d, min_soc, max_soc, disch, r0, u_nom):
+    """
+    Ganze Zeitreihe mit _loading_step in einem Durchlauf.
+
+    Nur der Ladestand hängt vom Vorgänger ab; Strategie (Balance.value)
+    und Entladefaktor kommen als vorab berechnete Arrays. Die Ergebnis-
+    Arrays haben den dtype von renew, der Ladestand läuft immer in float64.
+    """
+    n = renew.shape[0]
+    storage_levels = np.empty(n, renew.dtype)
+    inflows = np.empty(n, renew.dtype)
+    outflows = np.empty(n, renew.dtype)
+    residuals = np.empty(n, renew.dtype)
+    exflows = np.empty(n, renew.dtype)
+    losses = np.empty(n, renew.dtype)
+    exporting = np.empty(n, dtype=np.bool_)
+    decay = 1.0 - disch * dt_h
+    r0k = _r0_coef(dt_h, r0, u_nom)
+    for i in range(n):
+        storage, inflow, outflow, residual, exflow, loss = _loading_step(
+            strategy[i], renew[i], demand[i], storage, capacity, power, dt_h,
+            eff_c, eff_d, min_soc, max_soc, decay, r0k, factors[i])
+        storage_levels[i] = storage
+        inflows[i] = inflow
+        outflows[i] = outflow
+        residuals[i] = residual
+        exflows[i] = exflow
+        losses[i] = loss
+        exporting[i] = exflow > 0
+    return storage_levels, inflows, outflows, residuals, exflows, losses, exporting
+
+
+try:
+    from smard_utils._battery_kernel import simulate_scan as _cy_simulate_scan
+except ImportError:
+    _cy_simulate_scan = None
+
+# ohne numba die vorkompilierte Cython-Fassung, falls gebaut (_battery_kernel.pyx)
+if not NUMBA_AVAILABLE and _cy_simulate_scan is not None:
+    _simulate_scan = _cy_simulate_scan
+else:
+    _simulate_scan = _py_simulate_scan
+
+
+@njit(cache=True)
+def _simulate_totals(strategy, renew, demand, factors, price, storage, capacity, power, dt_h,
+                     eff_c, eff_d, min_soc, max_soc, disch, r0, u_nom):
+    """
+    Wie _simulate_scan, aber nur Summen statt Zeitreihen (O(1) Speicher).
+
+    Rückgabe: (Ladestand am Ende, inflow, outflow, residual, exflow, loss,
+    Erlös Σ exflow·price, Anzahl Exportschritte)
+    """
+    tot_inflow = tot_outflow = tot_residual = tot_exflow = tot_loss = revenue = 0.0
+    export_steps = 0
+    decay = 1.0 - disch * dt_h
+    r0k = _r0_coef(dt_h, r0, u_nom)
+    for i in range(renew.shape[0]):
+        storage, inflow, outflow, residual, exflow, loss = _loading_step(
+            strategy[i], renew[i], demand[i], storage, capacity, power, dt_h,
+            eff_c, eff_d, min_soc, max_soc, decay, r0k, factors[i])
+        tot_inflow += inflow
+        tot_outflow += outflow
+        tot_residual += residual
+        tot_exflow += exflow
+        tot_loss += loss
+        revenue += exflow * price[i]
+        if exflow > 0:
+            export_steps += 1
+    return (storage, tot_inflow, tot_outflow, tot_residual, tot_exflow, tot_loss,
+            revenue, export_steps)
+
+
+@njit(parallel=True, cache=True)
+def _sweep_scan(strategy, renew, demand, factors, capacities, powers, dt_h,
+                eff_c, eff_d, min_soc, max_soc, disch, r0, u_nom):
+    """
+    _simulate_scan für mehrere (Kapazität, Leistung)-Paare parallel (prange).
+
+    Strategie und Entladefaktor hängen nicht von der Kapazität ab; jeder
+    Lauf startet bei 50 % Ladestand. Rückgabe: 2D-Arrays (Lauf × Zeitschritt).
+    """
+    m_count = capacities.shape[0]
+    n = renew.shape[0]
+    storage_levels = np.empty((m_count, n), renew.dtype)
+    inflows = np.empty((m_count, n), renew.dtype)
+    outflows = np.empty((m_count, n), renew.dtype)
+    residuals = np.empty((m_count, n), renew.dtype)
+    exflows = np.empty((m_count, n), renew.dtype)
+    losses = np.empty((m_count, n), renew.dtype)
+    exporting = np.empty((m_count, n), dtype=np.bool_)
+    for m in prange(m_count):
+        run = _simulate_scan(strategy, renew, demand, factors, 0.5 * capacities[m],
+                             capacities[m], powers[m], dt_h,
+                             eff_c, eff_d, min_soc, max_soc, disch, r0, u_nom)
+        storage_levels[m] = run[0]
+        inflows[m] = run[1]
+        outflows[m] = run[2]
+        residuals[m] = run[3]
+        exflows[m] = run[4]
+        losses[m] = run[5]
+        exporting[m] = run[6]
+    return storage_levels, inflows, outflows, residuals, exflows, losses, exporting
+
+
+@njit(cache=True)
+def _simulate_source_scan(decisions, renew, storage, capacity, power, dt_h,
+                          eff_c, eff_d, min_soc, max_soc, disch, r0, u_nom):
+    """
+    Ganze Zeitreihe mit _source_step in einem Durchlauf
+    (Entscheidungen vorab aus _source_decisions).
+    """
+    n = renew.shape[0]
+    storage_levels = np.empty(n, renew.dtype)
+    inflows = np.empty(n, renew.dtype)
+    outflows = np.empty(n, renew.dtype)
+    residuals = np.empty(n, renew.dtype)
+    exflows = np.empty(n, renew.dtype)
+    losses = np.empty(n, renew.dtype)
+    exporting = np.empty(n, dtype=np.bool_)
+    decay = 1.0 - disch * dt_h
+    r0k = _r0_coef(dt_h, r0, u_nom)
+    for i in range(n):
+        storage, inflow, outflow, residual, exflow, loss, exporting[i] = _source_step(
+            decisions[i], renew[i], storage, capacity, power, dt_h,
+            eff_c, eff_d, min_soc, max_soc, decay, r0k)
+        storage_levels[i] = storage
+        inflows[i] = inflow
+        outflows[i] = outflow
+        residuals[i] = residual
+        exflows[i] = exflow
+        losses[i] = loss
+    return storage_levels, inflows, outflows, residuals, exflows, losses, exporting
+
+
+@njit(cache=True)
+def _simulate_solbat_scan(renew, price, factors, may_unload, may_load, may_export,
+                          storage, capacity, power, dt_h,
+                          limit_soc_threshold, control_exflow,
+                          eff_c, eff_d, min_soc, max_soc, disch, r0, u_nom):
+    """
+    Ganze Zeitreihe mit _solbat_step in einem Durchlauf, mit den
+    Standard-Bedingungen von BatterySolBatModel (battery_cond_*) inline.
+
+    may_unload/may_load/may_export: zustandsfreie Teile der Bedingungen
+    (Entladefaktor, Preis) als vorab berechnete Masken; im Schritt bleibt
+    nur der Vergleich mit dem Ladestand.
+    """
+    n = renew.shape[0]
+    storage_levels = np.empty(n, renew.dtype)
+    inflows = np.empty(n, renew.dtype)
+    outflows = np.empty(n, renew.dtype)
+    residuals = np.empty(n, renew.dtype)
+    exflows = np.empty(n, renew.dtype)
+    losses = np.empty(n, renew.dtype)
+    exporting = np.empty(n, dtype=np.bool_)
+    # Ladestandsgrenzen der Bedingungen (schleifeninvariant)
+    unload_min = (min_soc + limit_soc_threshold) * capacity
+    load_max = (max_soc - limit_soc_threshold) * capacity
+    decay = 1.0 - disch * dt_h
+    r0k = _r0_coef(dt_h, r0, u_nom)
+    for i in range(n):
+        if may_unload[i] and storage >= unload_min and storage >= -limit_soc_threshold:
+            branch = 1    # battery_cond_export_a
+        elif may_load[i] and storage <= load_max and storage >= limit_soc_threshold:
+            branch = 2    # battery_cond_load
+        elif may_export[i]:
+            branch = 3    # battery_cond_export_b
+        else:
+            branch = 0
+        storage, inflow, outflow, residual, exflow, loss, exporting[i] = _solbat_step(
+            branch, renew[i], storage, capacity, power, dt_h, price[i], factors[i],
+            control_exflow, eff_c, eff_d, min_soc, max_soc, decay, r0k)
+        storage_levels[i] = storage
+        inflows[i] = inflow
+        outflows[i] = outflow
+        residuals[i] = residual
+        exflows[i] = exflow
+        losses[i] = loss
+    return storage_levels, inflows, outflows, residuals, exflows, losses, exporting
+
+
+# Default-Parameter je Modell (nur gelesen; hinter basic_data_set in der ChainMap)
+_BM_DEFAULTS = {
+    "battery_discharge": 0.0005,      # Selbstentladung [Fraktion pro Stunde], typ. 0.01–0.001 %/h
+    "efficiency_charge": 0.96,        # Wirkungsgrad beim Laden (Energie → Speicher)
+    "efficiency_discharge": 0.96,     # Wirkungsgrad beim Entladen (Speicher → Energieabgabe)
+    "min_soc": 0.05,                  # Untere Ladegrenze [5 % vom Speicher] → verhindert Tiefentladung
+    "max_soc": 0.95,                  # Obere Ladegrenze [95 % vom Speicher] → schützt vor Überladung
+    "max_c_rate": 0.5,                # Maximale C-Rate (0.5 C = Vollladung/Entladung in 2 h)
+    "fix_contract": False,            # True = fester Strompreisvertrag, False = Spotmarktpreis aktiv
+    "r0_ohm": 0.006,                  # Interner Widerstand (Ω) → ohmsche Verluste I²·R
+    "u_nom": 800.0,                   # Nominale Systemspannung [V] → typisch für 1 MW Batterie
+}
+
+_SOURCE_DEFAULTS = {
+    "load_threshold": 0.9,
+    "load_threshold_high": 1.2,
+    "load_threshold_hytheresis": 0.05,
+    "exflow_stop_limit": 0.0,
+}
+
+_SOLBAT_DEFAULTS = {
+    # "load_threshold": 0.9,
+    # "load_threshold_high": 1.2,
+    # "load_threshold_hytheresis": 0.05,
+    # "exflow_stop_limit": 0.0,
+    "limit_soc_threshold": 0.05,
+    "control_exflow": 3,
+}
+
+_LP_DEFAULTS = {
+    "lp_horizon_h": 24.0,     # Planungsfenster [h]
+}
+
+# RawBat: Grundparameter plus SolBat-Steuerung
+_RAW_DEFAULTS = {**_BM_DEFAULTS, **_SOLBAT_DEFAULTS}
+
+
 class BatteryModel:
+    # Feste Attribute statt __dict__ (schnellerer Zugriff im Simulationsschritt)
+    __slots__ = ("basic_data_set",
+                 "battery_discharge", "efficiency_charge", "efficiency_discharge",
+                 "min_soc", "max_soc", "max_c_rate", "fix_contract", "r0_ohm", "u_nom",
+                 "capacity_kwh", "p_max_kw", "current_storage", "_history", "_history_len",
+                 "price_array", "_data", "_hour_idx", "_exporting", "_step_consts")
+
     def __init__(self, basic_data_set=None, capacity_kwh=2000.0, p_max_kw=None, 
                  init_storage_kwh=None, i=None, **kwargs):
-        self.basic_data_set = basic_data_set.copy() if basic_data_set else {}
-        defaults = {
-            "battery_discharge": 0.0005,      # Selbstentladung [Fraktion pro Stunde], typ. 0.01–0.001 %/h
-            "efficiency_charge": 0.96,        # Wirkungsgrad beim Laden (Energie → Speicher)
-            "efficiency_discharge": 0.96,     # Wirkungsgrad beim Entladen (Speicher → Energieabgabe)
-            "min_soc": 0.05,                  # Untere Ladegrenze [5 % vom Speicher] → verhindert Tiefentladung
-            "max_soc": 0.95,                  # Obere Ladegrenze [95 % vom Speicher] → schützt vor Überladung
-            "max_c_rate": 0.5,                # Maximale C-Rate (0.5 C = Vollladung/Entladung in 2 h)
-            "fix_contract": False,            # True = fester Strompreisvertrag, False = Spotmarktpreis aktiv
-            "r0_ohm": 0.006,                  # Interner Widerstand (Ω) → ohmsche Verluste I²·R
-            "u_nom": 800.0                    # Nominale Systemspannung [V] → typisch für 1 MW Batterie
-        }
-        for k, v in defaults.items():
-            self.basic_data_set.setdefault(k, v)
-            setattr(self, k, self.basic_data_set[k])
+        # Eigene Änderungen landen in maps[0], die Übergabe wird nur gelesen (keine Kopie)
+        self.basic_data_set = ChainMap({}, basic_data_set if basic_data_set is not None else {})
+        _apply_defaults(self, _BM_DEFAULTS)
 
         self.capacity_kwh = float(capacity_kwh)
         self.p_max_kw = float(p_max_kw or (self.basic_data_set["max_c_rate"] * self.capacity_kwh))
         self.current_storage = init_storage_kwh or 0.5 * self.capacity_kwh
-        self.history = []
+        self._step_consts = (None, 1.0, 0.0)
+        self.allocate_history(0)
+
+    def allocate_history(self, n, dtype=np.float64):
+        """Leere history mit vorab angelegten Arrays für n Zeitschritte (dtype je Spalte)."""
+        self._history = {k: np.empty(n, dtype=dtype) for k in HISTORY_FIELDS}
+        self._history_len = 0
+
+    @property
+    def history(self):
+        """Bisherige Zeitschritte als dict Spalte → Array (Sichten, keine Kopie)."""
+        n = self._history_len
+        return {k: v[:n] for k, v in self._history.items()}
+
+    @property
+    def history_df(self):
+        """history als DataFrame, mit dem Index von data, falls die Länge passt."""
+        history = self.history
+        index = getattr(self, "_data", None)
+        index = None if index is None else index.index
+        if index is not None and len(index) != self._history_len:
+            index = None
+        return pd.DataFrame(history, index=index, copy=False)
 
     def soc(self):
         return self.current_storage / self.capacity_kwh
 
     def _r0_losses(self, power_kw, dt_h):
-        """Berechne I²R₀-Verlust (kWh) für gegebene Leistung und Dauer."""
-        if self.r0_ohm <= 0 or self.u_nom <= 0 or power_kw == 0:
-            return 0.0
-        p_w = abs(power_kw) * 1000.0
-        i = p_w / self.u_nom               # A
-        p_loss_w = (i ** 2) * self.r0_ohm  # W
-        return (p_loss_w * dt_h) / 1000.0  # in kWh
+        """Berechne I²R₀-Verlust (kWh) für gegebene Leistung und Dauer (Skalar oder Array)."""
+        return battery_r0_losses(power_kw, dt_h, self.r0_ohm, self.u_nom)
+
+    def _update_step_consts(self, dt_h):
+        """(dt_h, Selbstentladefaktor, R0-Koeffizient) für loading_strategie neu bilden.
+
+        Im Lauf unveränderlich; loading_strategie ruft das nur bei i == 0
+        (Parameter können sich zwischen Läufen ändern) oder anderem dt_h auf.
+        """
+        dt_h = float(dt_h)
+        self._step_consts = (dt_h, 1.0 - self.battery_discharge * dt_h,
+                             _r0_coef(dt_h, self.r0_ohm, self.u_nom))
+        return self._step_consts
 
     def setup_discharging_factor(self, i, dt_h):
         price_per_kwh = self._data["price_per_kwh"]
         rest_len = min(int(24/dt_h), len(price_per_kwh.index)-i)
-        vals = [(price_per_kwh.index[j].hour, price_per_kwh.iloc[j]) for j in range(i,i+rest_len)]
-        vals_set = []
-        vals_indices = []
-        for val in vals:
-            if val[0] not in vals_indices:
-                vals_set.append(val)
-                vals_indices.append(val[0])
+        hours = self._hour_idx[i:i+rest_len]
+        prices = price_per_kwh.to_numpy()[i:i+rest_len]
+        # je Stunde nur der erste Wert, in zeitlicher Reihenfolge
+        first = np.sort(np.unique(hours, return_index=True)[1])
+        vals_set = list(zip(hours[first], prices[first]))
         assert len(vals_set) < 25, f"vals_set largen than 24: {len(vals_set)}"
         vals = sorted(vals_set, key=lambda x: x[1])
         nvals = np.ones(24)*12
@@ -73,6 +673,26 @@ class BatteryModel:
     def discharging_factor(self, tact, dt_h):
         return (self.price_array[tact.hour])
 
+    def _step_factor(self, i, dt_h):
+        """discharging_factor für Zeitschritt i, ohne überschriebene Methode über _hour_idx."""
+        if type(self).discharging_factor is BatteryModel.discharging_factor:
+            return float(self.price_array[self._hour_idx[i]])
+        return float(self.discharging_factor(self._data.index[i], dt_h))
+
+    def discharging_factors(self, hours, hm, dt_h):
+        """Entladefaktor je Zeitschritt; price_array wird um 0 und täglich um 13 Uhr neu gesetzt.
+
+        hours/hm: Stunde bzw. Minute des Tages je Zeitschritt von self.data (int-Arrays).
+        """
+        n = len(hours)
+        factors = np.empty(n)
+        starts = [0] + list(np.flatnonzero(hm == 13*60))
+        for k, start in enumerate(starts):
+            self.setup_discharging_factor(start, dt_h)
+            end = starts[k+1] if k+1 < len(starts) else n
+            factors[start:end] = self.price_array[hours[start:end]]
+        return factors
+
     @property
     def exporting(self):
         return self._exporting
@@ -88,6 +708,9 @@ class BatteryModel:
     @data.setter
     def data(self, value):
         self._data = value
+        # Stunde je Zeitschritt einmalig als int8-Tabelle (statt Timestamp.hour pro Schritt)
+        index = getattr(value, "index", None)
+        self._hour_idx = np.asarray(index.hour, dtype=np.int8) if hasattr(index, "hour") else None
 
     # def battery_cond_load(self,energy_balance):
     #     return energy_balance > 0
@@ -100,126 +723,174 @@ class BatteryModel:
         dt_h = kwargs.get("dt_h", 1.0)
         i = kwargs.get("i", 0)
         strategy = kwargs.get("strategy", Balance.NONE)
-        inflow = outflow = residual = exflow = _exflow = loss = 0.0
-        self._exporting[i] = False
+        discharing_factor = self._step_factor(i, dt_h)
+        consts = self._step_consts
+        if i == 0 or consts[0] != dt_h:
+            consts = self._update_step_consts(dt_h)
 
-        energy_balance = renew - demand   # positiv = Überschuss, negativ = Bedarf
-        discharing_factor = self.discharging_factor(self._data.index[i], dt_h)
-
-        # Default actuals
-        actual_charge = 0.0
-        actual_discharge = 0.0
-
-        # value to discharge 
-        def f(x, df, df_min,sub):
-            """
-            Konkave Sättigungskurve
-            - f(df_min) = 0
-            - f(1) = 1
-            - f'(df_min) = hoch (steil am Anfang)
-            - f'(1) = 0 (flach am Ende)
-            """
-            if sub > 0:
-                return sub
-            u = (x - df_min) / (1 - df_min)
-            return 1 - (1 - u) ** df
+        # Rechenkern siehe _loading_step (mit numba kompiliert, falls vorhanden)
+        result = _loading_step(strategy.value, float(renew), float(demand),
+                               float(current_storage), float(capacity),
+                               float(power_per_step), float(dt_h),
+                               self.efficiency_charge, self.efficiency_discharge,
+                               self.min_soc, self.max_soc, consts[1], consts[2], discharing_factor)
+        self._exporting[i] = result[4] > 0
 
-        # good for all 20 MWh, best for >> 20 MWh
-        df, df_min, sub = 3, 0.7, 0.0
-        #  best for capacity <= 20 MWh, ok vor >> 20 MWh
-        # _, df_min, sub = 1.3, 0.8, 1.0
+        # Rückgabe: jetzt konsistent 6 Werte (inkl. loss)
+        return result
 
-        # if self.battery_cond_load(energy_balance):
-        if strategy == Balance.LOAD:
-            # Laden aus Überschuss
-            allowed_energy = min(power_per_step * dt_h, (self.max_soc * capacity) - current_storage)
-            actual_charge = min(energy_balance, allowed_energy)  # kWh aus Überschuss, bevor Verluste
-            if actual_charge > 0:
-                loss = self._r0_losses(actual_charge / dt_h, dt_h)
-                stored_energy = max(0.0, (actual_charge - loss)) * self.efficiency_charge
-                inflow = stored_energy
-                current_storage += stored_energy
-            # exflow = überschüssige Energie, die nicht geladen wurde (immer setzen)
-            _exflow = energy_balance - actual_charge
-
-        # elif self.battery_cond_discharge(energy_balance):
-        elif strategy == Balance.UNLOAD:
-            # Entladen zur Bedarfsdeckung (oder Verkauf wenn gewünscht)
-            needed = abs(energy_balance)
-            if needed != - energy_balance:
-                raise ValueError("Something strange with model")
-            # Obergrenze der entnehmbaren Energie in einem Zeitschritt Δt fest — 
-            # also die maximale Energiemenge, die die Batterie in dieser Stunde
-            #  (oder Zeitschrittlänge dt_h) abgeben darf, ohne physikalische oder
-            #  betriebliche Grenzen zu verletzen.
-            # allowed_energy = min(power_per_step * dt_h, max(0.0, current_storage - self.min_soc * capacity))
-            allowed_energy = f(discharing_factor, df, df_min, sub)*min(power_per_step * dt_h, current_storage - self.min_soc * capacity)
-            # Wähle candidate so, dass netto möglichst den Bedarf trifft (einfacher Ansatz)
-            # candidate ist Energie, die aus dem Speicher entnommen wird (kWh)
-            candidate = min(allowed_energy, needed / max(self.efficiency_discharge, 1e-9))
-            if candidate > 0:
-                loss = self._r0_losses(candidate / dt_h, dt_h)
-                # Nettolieferung an Netz / Last:
-                outflow = max(0.0, (candidate - loss) * self.efficiency_discharge)
-                actual_discharge = candidate
-                current_storage -= actual_discharge
-            residual = needed - outflow
-        elif strategy == Balance.EXPORT:
-            _exflow = max(0,energy_balance)
-
-        if _exflow > 0:
-            exflow = _exflow
-            self.exporting[i] = True
-
-        # Selbstentladung und clamp
-        current_storage *= (1.0 - self.battery_discharge * dt_h)
-        current_storage = max(self.min_soc * capacity, min(self.max_soc * capacity, current_storage))
+    def can_scan(self):
+        """True, wenn scan() dieselben Werte liefert wie loading_strategie Schritt für Schritt."""
+        cls = type(self)
+        return (cls.loading_strategie is BatteryModel.loading_strategie
+                and cls.discharging_factor is BatteryModel.discharging_factor)
+
+    def scan(self, renew, demand, price, storage, capacity, power, dt_h, hours, hm):
+        """Ganze Zeitreihe in einem kompilierten Durchlauf (_simulate_scan).
+
+        Strategie wie BatteryManagementSystem.run_step (Überschuss → laden,
+        Bedarf → entladen). hours/hm: Stunde bzw. Minute des Tages je Schritt.
+        Rückgabe: (storage, inflow, outflow, residual, exflow, loss, exporting)
+        """
+        strategy = _balance_strategy(renew, demand)
+        return _simulate_scan(strategy, renew, demand, self.discharging_factors(hours, hm, dt_h),
+                              storage, capacity, power, dt_h,
+                              self.efficiency_charge, self.efficiency_discharge,
+                              self.min_soc, self.max_soc, self.battery_discharge,
+                              self.r0_ohm, self.u_nom)
+
+    def scan_totals(self, renew, demand, price, storage, capacity, power, dt_h, hours, hm):
+        """Wie scan(), aber nur Summen (siehe _simulate_totals) statt Zeitreihen.
+
+        Unterklassen mit eigenem scan() werden über dessen Arrays summiert.
+        """
+        if type(self).scan is not BatteryModel.scan:
+            storage_levels, inflow, outflow, residual, exflow, loss, exporting = self.scan(
+                renew, demand, price, storage, capacity, power, dt_h, hours, hm)
+            return (storage_levels[-1] if len(storage_levels) else storage,
+                    inflow.sum(), outflow.sum(), residual.sum(), exflow.sum(), loss.sum(),
+                    float(exflow @ price), np.count_nonzero(exporting))
+        strategy = _balance_strategy(renew, demand)
+        return _simulate_totals(strategy, renew, demand, self.discharging_factors(hours, hm, dt_h),
+                                price, storage, capacity, power, dt_h,
+                                self.efficiency_charge, self.efficiency_discharge,
+                                self.min_soc, self.max_soc, self.battery_discharge,
+                                self.r0_ohm, self.u_nom)
+
+    def scan_sweep(self, renew, demand, price, capacities, powers, dt_h, hours, hm):
+        """scan() für mehrere Kapazitäten, jeweils ab 50 % Ladestand.
+
+        BatteryModel rechnet alle Läufe in einem parallelen Kern (_sweep_scan);
+        Unterklassen mit eigenem scan() laufen nacheinander, in der Reihenfolge
+        von capacities (z.B. trägt BatterySourceModel last_cycle weiter).
+        Rückgabe: Liste der scan()-Tupel je Kapazität
+        """
+        if type(self).scan is not BatteryModel.scan:
+            return [self.scan(renew, demand, price, 0.5 * cap, float(cap), float(power),
+                              dt_h, hours, hm)
+                    for cap, power in zip(capacities, powers)]
+        strategy = _balance_strategy(renew, demand)
+        runs = _sweep_scan(strategy, renew, demand, self.discharging_factors(hours, hm, dt_h),
+                           np.asarray(capacities, dtype=float), np.asarray(powers, dtype=float),
+                           dt_h, self.efficiency_charge, self.efficiency_discharge,
+                           self.min_soc, self.max_soc, self.battery_discharge,
+                           self.r0_ohm, self.u_nom)
+        return list(zip(*runs))
+
+    def run_batch(self, renew, demand, price, avrgprice, dt_h=1.0, power_per_step=None,
+                  collect="history", dtype=np.float64):
+        """Ganze Zeitreihe ab current_storage mit scan() auf self.data.
+
+        collect:
+            "history": Ergebnisse spaltenweise in history (siehe allocate_history),
+                       zurück kommt history_df
+            "arrays":  wie "history", zurück kommt das dict history (ohne DataFrame)
+            "none":    keine Zeitreihen, nur Summen aus scan_totals als dict;
+                       history bleibt unverändert
+        dtype: Datentyp der Eingangs- und Ergebnis-Arrays (np.float32 halbiert den
+            Speicher; der Ladestand läuft in den Kernen weiter in float64)
+        """
+        if collect not in ("history", "arrays", "none"):
+            raise ValueError(f"collect must be 'history', 'arrays' or 'none', not {collect!r}")
+        renew = np.asarray(renew, dtype=dtype)
+        demand = np.asarray(demand, dtype=dtype)
+        price = np.asarray(price, dtype=dtype)
+        power_per_step = power_per_step or self.p_max_kw
+        idx = self._data.index
+        hours = idx.hour.to_numpy().astype(np.int32)
+        hm = hours*60 + idx.minute.to_numpy().astype(np.int32)
+        args = (renew, demand, price, float(self.current_storage), self.capacity_kwh,
+                float(power_per_step), float(dt_h), hours, hm)
+
+        if collect == "none":
+            (self.current_storage, inflow, outflow, residual, exflow, loss,
+             revenue, export_steps) = self.scan_totals(*args)
+            return {"inflow_kwh": inflow, "outflow_kwh": outflow, "residual_kwh": residual,
+                    "exflow_kwh": exflow, "loss_kwh": loss, "revenue": revenue,
+                    "export_steps": int(export_steps)}
+
+        storage, inflow, outflow, residual, exflow, loss, self._exporting = self.scan(*args)
+        if len(storage):
+            self.current_storage = storage[-1]
+        self.allocate_history(len(storage), dtype=storage.dtype)
+        history = self._history
+        history["storage_kwh"][:] = storage
+        history["soc"][:] = storage / self.capacity_kwh
+        history["inflow_kwh"][:] = inflow
+        history["outflow_kwh"][:] = outflow
+        history["residual_kwh"][:] = residual
+        history["exflow_kwh"][:] = exflow
+        history["loss_kwh"][:] = loss
+        history["price"][:] = price
+        history["avrgprice"][:] = avrgprice
+        self._history_len = len(storage)
+        return self.history if collect == "arrays" else self.history_df
 
-        # Rückgabe: jetzt konsistent 6 Werte (inkl. loss)
-        return [current_storage, inflow, outflow, residual, exflow, loss]
-
-    # def step(self, renew, demand, price, avrgprice, power_per_step=None, dt_h=1.0):
-    #     power_per_step = power_per_step or self.p_max_kw
-    #     # unpack 6 Werte (inkl. loss)
-    #     new_storage, inflow, outflow, residual, exflow, loss = self.loading_strategie(
-    #         renew, demand, self.current_storage, self.capacity_kwh,
-    #         avrgprice, price, power_per_step, dt_h=dt_h
-    #     )
-    #     self.current_storage = new_storage
-    #     rec = dict(
-    #         storage_kwh=self.current_storage,
-    #         soc=self.soc(),
-    #         inflow_kwh=inflow,
-    #         outflow_kwh=outflow,
-    #         residual_kwh=residual,
-    #         exflow_kwh=exflow,
-    #         loss_kwh=loss,
-    #         price=price,
-    #         avrgprice=avrgprice
-    #     )
-    #     self.history.append(rec)
-    #     return rec
 
 class BatterySourceModel(BatteryModel):
+    __slots__ = ("load_threshold", "load_threshold_high", "load_threshold_hytheresis",
+                 "exflow_stop_limit", "last_cycle", "_decisions")
+
     def __init__(self, basic_data_set=None, capacity_kwh=2000.0, p_max_kw=None, 
                  init_storage_kwh=None, i=None, **kwargs):
-        self.basic_data_set = basic_data_set.copy() if basic_data_set else {}
-        super().__init__(basic_data_set=self.basic_data_set, capacity_kwh=capacity_kwh, p_max_kw=p_max_kw, init_storage_kwh=init_storage_kwh, i=i)
-        defaults = {
-            "load_threshold": 0.9,
-            "load_threshold_high": 1.2,
-            "load_threshold_hytheresis": 0.05,
-            "exflow_stop_limit": 0.0,
-        }
-        for k, v in defaults.items():
-            self.basic_data_set.setdefault(k, v)
-            setattr(self, k, self.basic_data_set[k])
+        super().__init__(basic_data_set=basic_data_set, capacity_kwh=capacity_kwh, p_max_kw=p_max_kw, init_storage_kwh=init_storage_kwh, i=i)
+        _apply_defaults(self, _SOURCE_DEFAULTS)
 
         # self.load_threshold = self.basic_data_set["load_threshold"]
         # self.load_threshold_high = self.basic_data_set["load_threshold_high"]
         # self.load_threshold_hytheresis = self.basic_data_set["load_threshold_hytheresis"]
         # self.exflow_stop_limit = self.basic_data_set["exflow_stop_limit"]
         self.last_cycle = False
+        self._decisions = None
+
+    def setup_decisions(self, price=None, avrgprice=None):
+        """Hysterese-Entscheidungen (is_loading/is_unloading) einmal pro Lauf vorberechnen.
+
+        Ohne Argumente aus price_per_kwh und avrgprice von self._data.
+        """
+        if price is None:
+            price = self._data["price_per_kwh"]
+        if avrgprice is None:
+            avrgprice = self._data["avrgprice"]
+        price = np.asarray(price, dtype=float)
+        limit = self.load_threshold * np.asarray(avrgprice, dtype=float)
+        self._decisions, self.last_cycle = _source_decisions(
+            price, limit, float(self.load_threshold_hytheresis), float(self.last_cycle))
+
+    def can_scan(self):
+        cls = type(self)
+        return (cls.loading_strategie is BatterySourceModel.loading_strategie
+                and cls.setup_decisions is BatterySourceModel.setup_decisions
+                and cls.is_loading is BatterySourceModel.is_loading
+                and cls.is_unloading is BatterySourceModel.is_unloading)
+
+    def scan(self, renew, demand, price, storage, capacity, power, dt_h, hours, hm):
+        """Wie BatteryModel.scan, mit den Hysterese-Entscheidungen aus setup_decisions."""
+        self.setup_decisions(price)
+        return _simulate_source_scan(self._decisions, renew, storage, capacity, power, dt_h,
+                                     self.efficiency_charge, self.efficiency_discharge,
+                                     self.min_soc, self.max_soc, self.battery_discharge,
+                                     self.r0_ohm, self.u_nom)
 
     def is_loading(self, price, avrgprice):
         if price < self.load_threshold*avrgprice:
@@ -245,61 +916,55 @@ class BatterySourceModel(BatteryModel):
     def loading_strategie(self, renew, demand, current_storage, capacity, avrgprice, price, power_per_step, **kwargs):
         dt_h = kwargs.get("dt_h", 1.0)
         i = kwargs.get("i", 0)
-        inflow = outflow = residual = exflow = loss = 0.0
-        self._exporting[i] = False
-
+        # Schritt für Schritt mit den übergebenen Preisen; die vorberechneten
+        # Entscheidungen (setup_decisions) nutzt nur scan()
         if self.is_loading(price, avrgprice):
-            # Laden
-            # see comment above
-            allowed_energy = min(power_per_step * dt_h, (self.max_soc * capacity) - current_storage)
-            actual_charge = min(renew, allowed_energy)
-            if actual_charge > 0:
-                loss = self._r0_losses(actual_charge / dt_h, dt_h)
-                stored_energy = (actual_charge - loss) * self.efficiency_charge
-                inflow = stored_energy
-                current_storage += stored_energy
-            exflow = max(0,renew - actual_charge)
-            if exflow > 0:
-                self._exporting[i] = True
+            decision = Balance.LOAD.value
         elif self.is_unloading(price, avrgprice):
-            # Entladen
-            # see comment above
-            allowed_energy = min(power_per_step * dt_h, current_storage - self.min_soc * capacity)
-            actual_discharge = min(renew, allowed_energy)
-            if actual_discharge > 0:
-                loss = self._r0_losses(actual_discharge / dt_h, dt_h)
-                outflow = (actual_discharge - loss) * self.efficiency_discharge
-                current_storage -= (actual_discharge / self.efficiency_discharge)
-            exflow = max(0,renew + outflow)
-            if exflow > 0:
-                self._exporting[i] = True
+            decision = Balance.UNLOAD.value
         elif price > 0.0:
-            exflow = renew
-            self._exporting[i] = True
-
-        # Selbstentladung
-        current_storage *= (1.0 - self.battery_discharge * dt_h)
-        current_storage = max(self.min_soc * capacity, min(self.max_soc * capacity, current_storage))
+            decision = Balance.EXPORT.value
+        else:
+            decision = Balance.NONE.value
+        consts = self._step_consts
+        if i == 0 or consts[0] != dt_h:
+            consts = self._update_step_consts(dt_h)
 
-        return [current_storage, inflow, outflow, residual, exflow, loss]
+        # Rechenkern siehe _source_step (mit numba kompiliert, falls vorhanden)
+        result = _source_step(decision, float(renew), float(current_storage),
+                              float(capacity), float(power_per_step), float(dt_h),
+                              self.efficiency_charge, self.efficiency_discharge,
+                              self.min_soc, self.max_soc, consts[1], consts[2])
+        self._exporting[i] = result[6]
+        return result[:6]
 
 class BatterySolBatModel(BatteryModel):
+    __slots__ = ("limit_soc_threshold", "control_exflow")
 
     def __init__(self, basic_data_set=None, capacity_kwh=2000.0, p_max_kw=None, 
                  init_storage_kwh=None, i=None, **kwargs):
-        self.basic_data_set = basic_data_set.copy() if basic_data_set else {}
-        super().__init__(basic_data_set=self.basic_data_set, capacity_kwh=capacity_kwh, p_max_kw=p_max_kw, init_storage_kwh=init_storage_kwh, i=i)
-        defaults = {
-            # "load_threshold": 0.9,
-            # "load_threshold_high": 1.2,
-            # "load_threshold_hytheresis": 0.05,
-            # "exflow_stop_limit": 0.0,
-            "limit_soc_threshold": 0.05,
-            "control_exflow": 3,
-        }
-        for k, v in defaults.items():
-            self.basic_data_set.setdefault(k, v)
-            setattr(self, k, self.basic_data_set[k])
+        super().__init__(basic_data_set=basic_data_set, capacity_kwh=capacity_kwh, p_max_kw=p_max_kw, init_storage_kwh=init_storage_kwh, i=i)
+        _apply_defaults(self, _SOLBAT_DEFAULTS)
+
+    def can_scan(self):
+        cls = type(self)
+        return (cls.loading_strategie is BatterySolBatModel.loading_strategie
+                and cls.discharging_factor is BatteryModel.discharging_factor
+                and cls.battery_cond_load is BatterySolBatModel.battery_cond_load
+                and cls.battery_cond_export_a is BatterySolBatModel.battery_cond_export_a
+                and cls.battery_cond_export_b is BatterySolBatModel.battery_cond_export_b)
+
+    def scan(self, renew, demand, price, storage, capacity, power, dt_h, hours, hm):
+        """Wie BatteryModel.scan, mit den battery_cond_*-Standardbedingungen im Kern."""
+        factors = self.discharging_factors(hours, hm, dt_h)
+        df_min = 0.7
+        may_export = price >= 0 if self.control_exflow > 1 else np.zeros(len(price), dtype=bool)
+        return _simulate_solbat_scan(renew, price, factors, factors > df_min, factors < 0, may_export,
+                                     storage, capacity, power, dt_h,
+                                     float(self.limit_soc_threshold), float(self.control_exflow),
+                                     self.efficiency_charge, self.efficiency_discharge,
+                                     self.min_soc, self.max_soc, self.battery_discharge,
+                                     self.r0_ohm, self.u_nom)
 
     def battery_cond_load(self, energy_balance, discharing_factor, current_storage, max_soc, limit_soc_threshold, capacity):
         return discharing_factor < 0 and current_storage <= (max_soc - limit_soc_threshold) * capacity and current_storage >= limit_soc_threshold
@@ -313,113 +978,144 @@ class BatterySolBatModel(BatteryModel):
     def loading_strategie(self, renew, demand, current_storage, capacity, avrgprice, price, power_per_step, **kwargs):
         dt_h = kwargs.get("dt_h", 1.0)
         i = kwargs.get("i", 0)
-        if i > 175:
-            pass
-        inflow = outflow = residual = exflow = loss = 0.0
-        self._exporting[i] = False
 
         energy_balance = renew - demand   # positiv = Überschuss, negativ = Bedarf
-        discharing_factor = self.discharging_factor(self._data.index[i], dt_h)
+        discharing_factor = self._step_factor(i, dt_h)
 
         # revenue: (603.80 T\N{euro sign}, 651.74 T\N{euro sign}) for (True,price >= 0)
         # time: (8904.0 h, 8176.0 h) for (True, price >= 0)
         # exflow: (13449.55 MWh, 10055.49 MWh) for (True, price >= 0)
 
-        # value to discharge 
-        def f(x, df, df_min,sub):
-            """
-            Konkave Sättigungskurve
-            - f(df_min) = 0
-            - f(1) = 1
-            - f'(df_min) = hoch (steil am Anfang)
-            - f'(1) = 0 (flach am Ende)
-            """
-            if sub > 0:
-                return sub
-            u = (x - df_min) / (1 - df_min)
-            return 1 - (1 - u) ** df
-        # good for all 20 MWh, best for >> 20 MWh
-        df, df_min, sub = 3, 0.7, 0.0
+        # good for all 20 MWh, best for >> 20 MWh (Sättigungskurve in _solbat_step)
+        df_min = 0.7
         #  best for capacity <= 20 MWh, ok vor >> 20 MWh
         # _, df_min, sub = 1.3, 0.8, 1.0
         if self.battery_cond_export_a(energy_balance, discharing_factor=discharing_factor, df_min=df_min, current_storage=current_storage, min_soc=self.min_soc, limit_soc_threshold=self.limit_soc_threshold, capacity=capacity):
             # org: price > 1.3 * np.abs(avrgprice) and current_storage >= (self.min_soc + self.limit_soc_threshold) * capacity and current_storage >= -self.limit_soc_threshold:
-            # Entladen
-            # see comment above
-            allowed_energy = f(discharing_factor, df, df_min, sub)*min(power_per_step * dt_h, current_storage - self.min_soc * capacity)
-            actual_discharge = allowed_energy # min(renew, allowed_energy)
-            if actual_discharge > 0:
-                loss = self._r0_losses(actual_discharge / dt_h, dt_h)
-                outflow = (actual_discharge - loss) * self.efficiency_discharge
-                current_storage -= (actual_discharge / self.efficiency_discharge)
-            exflow = renew + outflow
-            self._exporting[i] = True
-            if exflow < 0:
-                raise(ValueError(f"exflow < 0: {exflow}"))
-        # elif discharing_factor < 0 and current_storage <= (self.max_soc - self.limit_soc_threshold) * capacity and current_storage >= self.limit_soc_threshold: 
+            branch = 1  # Entladen
         elif self.battery_cond_load(energy_balance,discharing_factor=discharing_factor, current_storage=current_storage, max_soc=self.max_soc, limit_soc_threshold=self.limit_soc_threshold, capacity=capacity):
             # org: price < avrgprice: # and current_storage <= (self.max_soc - self.limit_soc_threshold) * capacity and current_storage >= self.limit_soc_threshold:
-            # Laden
-            # see comment above
-            allowed_energy = min(power_per_step * dt_h, (self.max_soc * capacity) - current_storage)
-            actual_charge = min(renew, allowed_energy)
-            if actual_charge > 0:
-                loss = self._r0_losses(actual_charge / dt_h, dt_h)
-                stored_energy = (actual_charge - loss) * self.efficiency_charge
-                inflow = stored_energy
-                current_storage += stored_energy
-            if renew > actual_charge and price > 0.0 and self.control_exflow > 0:
-                exflow = renew - actual_charge
-                self._exporting[i] = True
+            branch = 2  # Laden
         elif self.battery_cond_export_b(energy_balance, price=price, control_exflow=self.control_exflow):
-            exflow = max(0,renew)
-            if exflow > 0:  
-                self.exporting[i] = True           
+            branch = 3  # Export
+        else:
+            branch = 0
 
-        # Selbstentladung
-        current_storage *= (1.0 - self.battery_discharge * dt_h)
-        current_storage = max(self.min_soc * capacity, min(self.max_soc * capacity, current_storage))
+        consts = self._step_consts
+        if i == 0 or consts[0] != dt_h:
+            consts = self._update_step_consts(dt_h)
+
+        # Rechenkern siehe _solbat_step (mit numba kompiliert, falls vorhanden)
+        result = _solbat_step(branch, float(renew), float(current_storage), float(capacity),
+                              float(power_per_step), float(dt_h), float(price),
+                              discharing_factor, float(self.control_exflow),
+                              self.efficiency_charge, self.efficiency_discharge,
+                              self.min_soc, self.max_soc, consts[1], consts[2])
+        self._exporting[i] = result[6]
+        return result[:6]
+
+class BatteryLPModel(BatteryModel):
+    """
+    Lade-/Entladeplan je Zeitfenster (Standard 24 h) als lineares Programm
+    (scipy.optimize.linprog, HiGHS) statt Entscheidung pro Schritt.
+
+    Je Schritt t: c_t = Laden aus Überschuss, d_t = Entnahme aus dem Speicher [kWh].
+    Ziel: Σ price_t·(eff_d·d_t − c_t) plus Restwert des Speichers am Fensterende
+    (eff_d · mittlerer Fensterpreis) maximieren; Speicher
+    S_{t+1} = (1 − Selbstentladung·dt)·(S_t + eff_c·c_t − d_t) innerhalb [min_soc, max_soc].
+    R0-Verluste stehen nicht im LP, sie kommen bei der Umsetzung (_plan_step) dazu.
+    Benötigt scipy (``pip install -e .[lp]``); zum Vergleich bleibt BatteryModel
+    die schrittweise Heuristik.
+    """
+    __slots__ = ("lp_horizon_h",)
+    # Kein Schritt-für-Schritt-Weg: BatterySimulation lehnt die Schleife vorab ab
+    scan_only = True
+
+    def __init__(self, basic_data_set=None, capacity_kwh=2000.0, p_max_kw=None,
+                 init_storage_kwh=None, i=None, **kwargs):
+        super().__init__(basic_data_set=basic_data_set, capacity_kwh=capacity_kwh, p_max_kw=p_max_kw, init_storage_kwh=init_storage_kwh, i=i)
+        _apply_defaults(self, _LP_DEFAULTS)
+
+    def can_scan(self):
+        return type(self).scan is BatteryLPModel.scan
+
+    def plan_window(self, renew, demand, price, storage, capacity, power, dt_h):
+        """LP für ein Zeitfenster ab Ladestand storage; Rückgabe (charge, discharge) [kWh]."""
+        h = len(price)
+        eff_c, eff_d = self.efficiency_charge, self.efficiency_discharge
+        decay = 1.0 - self.battery_discharge * dt_h
+        lo, hi = self.min_soc * capacity, self.max_soc * capacity
+        max_energy = power * dt_h
+        # S_{k+1} = decay^(k+1)·S_0 + Σ_{j≤k} decay^(k+1-j)·(eff_c·c_j − d_j)
+        k = np.arange(h)
+        weights = np.tril(decay ** (k[:, None] - k[None, :] + 1.0))
+        a = np.hstack([weights * eff_c, -weights])
+        s_free = decay ** (k + 1.0) * storage
+        # untere Grenze höchstens s_free: Selbstentladung allein darf nicht unzulässig sein
+        a_ub = np.vstack([a, -a])
+        b_ub = np.concatenate([hi - s_free, s_free - np.minimum(lo, s_free)])
+
+        terminal_value = eff_d * max(float(price.mean()), 0.0)
+        cost = np.concatenate([price, -eff_d * price]) - terminal_value * a[-1]
+        charge_max = np.clip(renew - demand, 0.0, max_energy)
+        bounds = [(0.0, c) for c in charge_max] + [(0.0, max_energy)] * h
+
+        res = linprog(cost, A_ub=a_ub, b_ub=b_ub, bounds=bounds, method="highs")
+        if not res.success:
+            return np.zeros(h), np.zeros(h)
+        return res.x[:h], res.x[h:]
+
+    def scan(self, renew, demand, price, storage, capacity, power, dt_h, hours, hm):
+        """Ganze Zeitreihe fensterweise: plan_window, dann _simulate_plan ab dem realen Ladestand."""
+        if linprog is None:
+            raise ImportError("BatteryLPModel benötigt scipy (pip install -e .[lp])")
+        n = len(renew)
+        window = max(1, int(round(self.lp_horizon_h / dt_h)))
+        runs = []
+        for start in range(0, n, window):
+            end = min(start + window, n)
+            charge, discharge = self.plan_window(renew[start:end], demand[start:end],
+                                                 price[start:end], storage, capacity, power, dt_h)
+            run = _simulate_plan(charge, discharge, renew[start:end], demand[start:end],
+                                 storage, capacity, power, dt_h,
+                                 self.efficiency_charge, self.efficiency_discharge,
+                                 self.min_soc, self.max_soc, self.battery_discharge,
+                                 self.r0_ohm, self.u_nom)
+            storage = float(run[0][-1])
+            runs.append(run)
+        if not runs:
+            empty = np.empty(0, dtype=renew.dtype)
+            return (empty,) * 6 + (np.zeros(0, dtype=np.bool_),)
+        return tuple(np.concatenate(col) for col in zip(*runs))
 
-        return [current_storage, inflow, outflow, residual, exflow, loss]
 
 class BatteryRawBatModel:
+    __slots__ = ("basic_data_set",
+                 "battery_discharge", "efficiency_charge", "efficiency_discharge",
+                 "min_soc", "max_soc", "max_c_rate", "fix_contract", "r0_ohm", "u_nom",
+                 "limit_soc_threshold", "control_exflow",
+                 "capacity_kwh", "p_max_kw", "current_storage", "history", "_exporting",
+                 "_step_consts")
+
 
     def __init__(self, basic_data_set=None, capacity_kwh=2000.0, p_max_kw=None, 
                  init_storage_kwh=None, i=None, **kwargs):
-        self.basic_data_set = basic_data_set.copy() if basic_data_set else {}
-        defaults = {
-            "battery_discharge": 0.0005,      # Selbstentladung [Fraktion pro Stunde], typ. 0.01–0.001 %/h
-            "efficiency_charge": 0.96,        # Wirkungsgrad beim Laden (Energie → Speicher)
-            "efficiency_discharge": 0.96,     # Wirkungsgrad beim Entladen (Speicher → Energieabgabe)
-            "min_soc": 0.05,                  # Untere Ladegrenze [5 % vom Speicher] → verhindert Tiefentladung
-            "max_soc": 0.95,                  # Obere Ladegrenze [95 % vom Speicher] → schützt vor Überladung
-            "max_c_rate": 0.5,                # Maximale C-Rate (0.5 C = Vollladung/Entladung in 2 h)
-            "fix_contract": False,            # True = fester Strompreisvertrag, False = Spotmarktpreis aktiv
-            "r0_ohm": 0.006,                  # Interner Widerstand (Ω) → ohmsche Verluste I²·R
-            "u_nom": 800.0,                    # Nominale Systemspannung [V] → typisch für 1 MW Batterie
-            "limit_soc_threshold": 0.05,
-            "control_exflow": 3,
-        }
-        for k, v in defaults.items():
-            self.basic_data_set.setdefault(k, v)
-            setattr(self, k, self.basic_data_set[k])
+        # Eigene Änderungen landen in maps[0], die Übergabe wird nur gelesen (keine Kopie)
+        self.basic_data_set = ChainMap({}, basic_data_set if basic_data_set is not None else {})
+        _apply_defaults(self, _RAW_DEFAULTS)
 
         self.capacity_kwh = float(capacity_kwh)
         self.p_max_kw = float(p_max_kw or (self.basic_data_set["max_c_rate"] * self.capacity_kwh))
         self.current_storage = init_storage_kwh or 0.5 * self.capacity_kwh
+        self._step_consts = (None, 1.0, 0.0)
         self.history = []
-        for k, v in defaults.items():
-            self.basic_data_set.setdefault(k, v)
-            setattr(self, k, self.basic_data_set[k])
 
     def _r0_losses(self, power_kw, dt_h):
-        """Berechne I²R₀-Verlust (kWh) für gegebene Leistung und Dauer."""
-        if self.r0_ohm <= 0 or self.u_nom <= 0 or power_kw == 0:
-            return 0.0
-        p_w = abs(power_kw) * 1000.0
-        i = p_w / self.u_nom               # A
-        p_loss_w = (i ** 2) * self.r0_ohm  # W
-        return (p_loss_w * dt_h) / 1000.0  # in kWh
+        """Berechne I²R₀-Verlust (kWh) für gegebene Leistung und Dauer (Skalar oder Array)."""
+        return battery_r0_losses(power_kw, dt_h, self.r0_ohm, self.u_nom)
+
+    # wie BatteryModel: Selbstentladefaktor und R0-Koeffizient je Lauf einmal
+    _update_step_consts = BatteryModel._update_step_consts
 
     def init_inport_export_modelling(self, **kwargs):
         if "exporting" in kwargs:
@@ -430,52 +1126,50 @@ class BatteryRawBatModel:
     def balancing(self, current_storage, capacity, requested_charge, power_per_step, **kwargs):
         dt_h = kwargs.get("dt_h", 1.0)
         i = kwargs.get("i", 0)
-        if i > 175:
-            pass
+        # Attribute einmal als lokale Variablen (statt self.* je Zweig)
+        min_soc, max_soc = self.min_soc, self.max_soc
+        eff_c, eff_d = self.efficiency_charge, self.efficiency_discharge
+        # I²R₀-Verlust als r0_coef · P² (P in kW), 0 wenn r0/u_nom abgeschaltet
+        consts = self._step_consts
+        if i == 0 or consts[0] != dt_h:
+            consts = self._update_step_consts(dt_h)
+        _, decay, r0_coef = consts
         inflow = outflow = residual = exflow = loss = 0.0
         self._exporting[i] = False
 
-        def f(requested, limit):
-            """
-            Konkave Sättigungskurve
-            - f(df_min) = 0
-            - f(1) = 1
-            - f'(df_min) = hoch (steil am Anfang)
-            - f'(1) = 0 (flach am Ende)
-            """
-            # if sub > 0:
-            #     return sub
-            # return 1 - (1 - u) ** df
-            return min(abs(requested), limit)
-        
         # good for all 20 MWh, best for >> 20 MWh
         # df, df_min, sub = 3, 0.7, 0.0
         #  best for capacity <= 20 MWh, ok vor >> 20 MWh
         # _, df_min, sub = 1.3, 0.8, 1.0
+        max_energy = power_per_step * dt_h
         if requested_charge < 0: # discharge
             # org: price > 1.3 * np.abs(avrgprice) and current_storage >= (self.min_soc + self.limit_soc_threshold) * capacity and current_storage >= -self.limit_soc_threshold:
-            # Entladen
-            # see comment above
-            allowed_energy = f(requested_charge, min(power_per_step * dt_h, current_storage - self.min_soc * capacity))
-            actual_discharge = allowed_energy # min(renew, allowed_energy)
+            # Entladen: min(|requested|, verfügbar, Leistungsgrenze)
+            available = current_storage - min_soc * capacity
+            limit = available if available < max_energy else max_energy
+            requested = -requested_charge
+            actual_discharge = limit if limit < requested else requested
             if actual_discharge > 0:
-                loss = self._r0_losses(actual_discharge / dt_h, dt_h)
-                outflow = (actual_discharge - loss) * self.efficiency_discharge
-                current_storage -= (actual_discharge / self.efficiency_discharge)
+                p_kw = actual_discharge / dt_h
+                loss = r0_coef * p_kw * p_kw
+                outflow = (actual_discharge - loss) * eff_d
+                current_storage -= (actual_discharge / eff_d)
             exflow = outflow
         # load: requested_charge > 0
         else:
-            allowed_energy = min(power_per_step * dt_h, (self.max_soc * capacity) - current_storage)
-            actual_charge = min(requested_charge, allowed_energy)
+            room = (max_soc * capacity) - current_storage
+            allowed_energy = room if room < max_energy else max_energy
+            actual_charge = allowed_energy if allowed_energy < requested_charge else requested_charge
             if actual_charge > 0:
-                loss = self._r0_losses(actual_charge / dt_h, dt_h)
-                stored_energy = (actual_charge - loss) * self.efficiency_charge
+                p_kw = actual_charge / dt_h
+                loss = r0_coef * p_kw * p_kw
+                stored_energy = (actual_charge - loss) * eff_c
                 inflow = stored_energy
                 current_storage += stored_energy
 
         # Selbstentladung
-        current_storage *= (1.0 - self.battery_discharge * dt_h)
-        current_storage = max(self.min_soc * capacity, min(self.max_soc * capacity, current_storage))
+        current_storage *= decay
+        lo, hi = min_soc * capacity, max_soc * capacity
+        current_storage = lo if current_storage < lo else (hi if current_storage > hi else current_storage)
         #stor, inf, outf, resi, exf, los
-        return [current_storage, inflow, outflow, exflow, loss]
-    
\ No newline at end of file
+        return (current_storage, inflow, outflow, exflow, loss)
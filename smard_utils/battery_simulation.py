@@ -4,10 +4,50 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from smard_utils.battery_model import BatteryModel, Balance
+from smard_utils.utils.jit import NUMBA_AVAILABLE, limit_threads, njit
 
 battery_simulation_version = "1.0"
 
+
+@njit(cache=True)
+def _py_aggregate(demand, residuals, exflows, losses, price, marketing_costs):
+    """
+    Kennzahlen-Summen in einem Durchlauf über die Zeitreihen (ohne Temporärarrays).
+
+    Rückgabe: (Σ demand, Σ residual, Σ exflow, Σ loss, Σ residual·price,
+    Σ exflow·(price - marketing_costs))
+    """
+    demand_total = residual_total = exflow_total = loss_total = spot = revenue = 0.0
+    for i in range(residuals.shape[0]):
+        demand_total += demand[i]
+        residual_total += residuals[i]
+        exflow_total += exflows[i]
+        loss_total += losses[i]
+        spot += residuals[i] * price[i]
+        revenue += exflows[i] * (price[i] - marketing_costs)
+    return demand_total, residual_total, exflow_total, loss_total, spot, revenue
+
+
+try:
+    from smard_utils._battery_kernel import aggregate as _cy_aggregate
+except ImportError:
+    _cy_aggregate = None
+
+# ohne numba die vorkompilierte Cython-Fassung, falls gebaut (_battery_kernel.pyx)
+if not NUMBA_AVAILABLE and _cy_aggregate is not None:
+    _aggregate = _cy_aggregate
+else:
+    _aggregate = _py_aggregate
+
+
+def _simulate_capacity(sim, capacity, power):
+    """Worker für run_battery_comparison(n_jobs>1): eine Simulation auf einer Kopie von sim."""
+    return sim._run_simulation(capacity=capacity, power=power)
+
+
 #class BatteryManagmentSystem
 class BatteryManagementSystem:
 
@@ -45,102 +85,236 @@ class BatteryManagementSystem:
             power_per_step=power_per_step,
             **kwargs)
 
+# Zeitreihen aus self.data, die die Simulation liest
+SIM_COLUMNS = ("my_renew", "my_demand", "price_per_kwh", "avrgprice")
+
+# Spalten von battery_results, eine Zeile je Simulation
+RESULT_COLUMNS = [
+    "capacity kWh", "residual kWh", "exflow kWh",
+    "autarky rate", "spot price [\N{euro sign}]",
+    "fix price [\N{euro sign}]", "revenue [\N{euro sign}]", "loss kWh"
+]
+
+
+def _results_frame(rows):
+    """Kennzahl-Zeilen (Tupel in RESULT_COLUMNS) als DataFrame, spaltenweise aus ndarrays gebaut."""
+    columns = zip(*rows) if rows else [()] * len(RESULT_COLUMNS)
+    return pd.DataFrame({name: np.asarray(column) for name, column in zip(RESULT_COLUMNS, columns)})
+
+
 class BatterySimulation:
 
     def __init__(self, data=None, basic_data_set=None, battery_model=BatteryModel, 
                  battery_management_system = BatteryManagementSystem, **kwargs):
         self.data = data if data is not None else pd.DataFrame()
         self.basic_data_set = basic_data_set if basic_data_set is not None else {}
-        self.costs_per_kwh = self.basic_data_set.get("fix_costs_per_kwh", 0.1)
+        self.costs_per_kwh = float(self.basic_data_set.get("fix_costs_per_kwh", 0.1))
         self.battery_results = None
 
         self.battery = battery_model(basic_data_set=self.basic_data_set,
                                 capacity_kwh=self.basic_data_set.get("capacity_kwh", 2000.0),
                                 p_max_kw=self.basic_data_set.get("p_max_kw", 1000.0))
-        defaults = {
-            "marketing_costs": 0.0,
-        }
-        for k, v in defaults.items():
-            self.basic_data_set.setdefault(k, v)
-            setattr(self, k, self.basic_data_set[k])
+        # Parameter einmal als typisierte Attribute; setdefault, weil Unterklassen
+        # (z.B. Analyse.prepare_price) basic_data_set["marketing_costs"] direkt lesen
+        self.marketing_costs = float(self.basic_data_set.setdefault("marketing_costs", 0.0))
+        # "float32": halbe Datenmenge, Kennzahlen ~1e-4 genau
+        self.sim_dtype = self.basic_data_set.setdefault("sim_dtype", "float64")
+        self.fix_contract = bool(self.basic_data_set.get("fix_contract", False))
+        # (nicht exportiert, exportiert) Zeitschritte je Simulation
+        self.exporting_l = []
         self.bms = battery_management_system(battery=self.battery)
 
+    @property
+    def battery_results(self):
+        """Kennzahlen aller Simulationen; neue Zeilen werden erst beim Lesen (spaltenweise) angehängt."""
+        if self._result_rows:
+            frame = _results_frame(self._result_rows)
+            if self._results_frame is not None:
+                frame = pd.concat([self._results_frame, frame], ignore_index=True)
+            self._results_frame = frame
+            self._result_rows = []
+        return self._results_frame
+
+    @battery_results.setter
+    def battery_results(self, value):
+        self._results_frame = value
+        self._result_rows = []
+
+    def _add_results(self, rows):
+        """Kennzahl-Zeilen vormerken (kein DataFrame/concat pro Lauf)."""
+        self._result_rows.extend(rows)
+
     def simulate_battery(self, capacity=2000, power=1000):
         """Simulation mit internem battery-Objekt"""
-        if not hasattr(self, "data"):
+        row = self._run_simulation(capacity, power)
+        self._add_results([row])
+        return _results_frame([row])
+
+    def simulate_batteries(self, capacities, powers):
+        """Wie simulate_battery für mehrere Kapazitäten, in deren Reihenfolge.
+
+        Mit numba und Standard-BMS laufen alle Kapazitäten in einem parallelen
+        Kern (battery.scan_sweep, prange über die Kapazitäten), sonst nacheinander.
+        self.data enthält danach wie bei der Schleife die Zeitreihen der letzten.
+        """
+        if NUMBA_AVAILABLE and len(capacities) > 1 and self._can_vectorize():
+            results = self._run_sweep(capacities, powers)
+        else:
+            results = [self._run_simulation(capacity, power)
+                       for capacity, power in zip(capacities, powers)]
+        self._add_results(results)
+        return _results_frame(results)
+
+    def cast_sim_columns(self):
+        """Zeitreihen der Simulation in self.data einmal in den sim_dtype wandeln.
+
+        Mit "float32" liegen sie danach nur noch in halber Breite vor und
+        _columns gibt sie ohne Kopie an die Kerne weiter.
+        """
+        dtype = np.dtype(self.sim_dtype)
+        self.data = self.data.astype({name: dtype for name in SIM_COLUMNS
+                                      if name in self.data.columns})
+
+    def _columns(self, *names):
+        """Spalten von self.data als ndarrays im sim_dtype; ohne Kopie, wenn der dtype schon passt."""
+        dtype = np.dtype(self.sim_dtype)
+        return [self.data[name].to_numpy(dtype=dtype, copy=False) for name in names]
+
+    def _run_simulation(self, capacity, power):
+        """Eine Simulation; Kennzahlen als Zeile (Tupel in RESULT_COLUMNS, ohne battery_results)."""
+        if self.data.empty:
             raise ValueError("Keine Datenquelle vorhanden")
+        if getattr(self.battery, "scan_only", False) and not self._can_vectorize():
+            raise ValueError(f"{type(self.battery).__name__} rechnet nur über scan(), "
+                             "nicht mit einem eigenen BMS (run_step)")
 
-        renew = np.array(self.data["my_renew"], dtype=float)
-        demand = np.array(self.data["my_demand"], dtype=float)
-        price = np.array(self.data["price_per_kwh"], dtype=float)
-        avrgprice = np.array(self.data["avrgprice"], dtype=float)
+        dtype = np.dtype(self.sim_dtype)
+        renew, demand, price, avrgprice = self._columns("my_renew", "my_demand",
+                                                        "price_per_kwh", "avrgprice")
 
-        storage_levels, inflows, outflows, residuals, exflows, losses = [], [], [], [], [], []
         current_storage = 0.5 * capacity
 
         self.battery.exporting = np.full(self.data.shape[0], False, dtype=bool)
         self.battery.data = self.data
+        # Stunde und Minute des Tages einmal als int-Arrays statt Timestamp pro Schritt
+        hours, hm = self._time_of_day()
 
-        if hasattr(self.battery, "setup_discharging_factor"):
+        if self._can_vectorize():
+            (storage_levels, inflows, outflows, residuals, exflows, losses,
+             self.battery.exporting) = self._simulate_vectorized(renew, demand, price, capacity,
+                                                                  power, hours, hm)
+            return self._collect_results(capacity, demand, price, storage_levels, inflows,
+                                         outflows, residuals, exflows, losses)
+
+        # hasattr und Uhrzeit-Test einmal vorab statt pro Schritt
+        has_sdf = hasattr(self.battery, "setup_discharging_factor")
+        if has_sdf:
             self.battery.setup_discharging_factor(0, self.resolution)
+            trigger = hm == 13*60 # 13 Uhr
+
+        # Ergebnis-Puffer vorab anlegen statt list.append pro Schritt
+        n = len(renew)
+        storage_levels = np.empty(n, dtype=dtype)
+        inflows = np.empty(n, dtype=dtype)
+        outflows = np.empty(n, dtype=dtype)
+        residuals = np.empty(n, dtype=dtype)
+        exflows = np.empty(n, dtype=dtype)
+        losses = np.empty(n, dtype=dtype)
+
+        # Schleifeninvarianten einmal binden
+        run_step = self.bms.run_step
+        dt_h = self.resolution
+        capacity_kwh = float(capacity)
+        power_kw = float(power)
 
-        for i, (r, d, p, ap) in enumerate(zip(renew, demand, price, avrgprice)):
-            if hasattr(self.battery, "setup_discharging_factor"):
-                tact = self.data.index[i]
-                if 60*tact.hour + tact.minute == 13*60: # 13 Uhr:
-                    self.battery.setup_discharging_factor(i, self.resolution)
-            new_storage, inflow, outflow, residual, exflow, loss = self.bms.run_step(
+        # tolist(): Python-floats statt NumPy-Skalare im Schritt (schnellere Skalar-Arithmetik)
+        for i, (r, d, p, ap) in enumerate(zip(renew.tolist(), demand.tolist(),
+                                              price.tolist(), avrgprice.tolist())):
+            if has_sdf and trigger[i]:
+                self.battery.setup_discharging_factor(i, dt_h)
+            new_storage, inflow, outflow, residual, exflow, loss = run_step(
                 renew=r,
                 demand=d,
                 current_storage=current_storage,
-                capacity=capacity,
+                capacity=capacity_kwh,
                 avrgprice=ap,
                 price=p,
-                power_per_step=power,
-                dt_h=self.resolution,
+                power_per_step=power_kw,
+                dt_h=dt_h,
                 i=i
             )
             current_storage = new_storage
-            storage_levels.append(current_storage)
-            inflows.append(inflow)
-            outflows.append(outflow)
-            residuals.append(residual)
-            exflows.append(exflow)
-            losses.append(loss)
+            storage_levels[i] = current_storage
+            inflows[i] = inflow
+            outflows[i] = outflow
+            residuals[i] = residual
+            exflows[i] = exflow
+            losses[i] = loss
             # self.logger.debug(f"{(new_storage, inflow, outflow, residual, exflow, loss)}")
 
-        if not hasattr(self, "exporting_l"):
-            self.exporting_l = []
-        self.exporting_l.append((np.size(self.battery.exporting) - np.count_nonzero(self.battery.exporting),self.battery.exporting.sum()))
+        return self._collect_results(capacity, demand, price, storage_levels, inflows,
+                                     outflows, residuals, exflows, losses)
+
+    def _can_vectorize(self):
+        """Standard-BMS und Batteriemodell mit unveränderter Strategie → battery.scan."""
+        return (type(self.bms).run_step is BatteryManagementSystem.run_step
+                and hasattr(self.battery, "can_scan") and self.battery.can_scan())
+
+    def _time_of_day(self):
+        """Stunde und Minuten seit Mitternacht je Zeitschritt (int32)."""
+        idx = self.data.index
+        hours = idx.hour.to_numpy().astype(np.int32)
+        return hours, hours*60 + idx.minute.to_numpy().astype(np.int32)
 
-        # Ergebnisse in DataFrame schreiben
-        self.data["battery_storage"] = storage_levels
-        self.data["battery_inflow"] = inflows
-        self.data["battery_outflow"] = outflows
-        self.data["residual"] = residuals
-        self.data["exflow"] = exflows
-        self.data["loss"] = losses
+    def _simulate_vectorized(self, renew, demand, price, capacity, power, hours, hm):
+        """Simulation über die ganze Zeitreihe ohne Python-Schleife pro Schritt."""
+        return self.battery.scan(renew, demand, price, 0.5 * capacity, float(capacity),
+                                 float(power), float(self.resolution), hours, hm)
 
-        if sum(demand) == 0:
+    def _run_sweep(self, capacities, powers):
+        """Alle Kapazitäten über battery.scan_sweep (numba-Threads statt Prozesse)."""
+        renew, demand, price = self._columns("my_renew", "my_demand", "price_per_kwh")
+
+        self.battery.data = self.data
+        hours, hm = self._time_of_day()
+        runs = self.battery.scan_sweep(renew, demand, price, capacities, powers,
+                                       float(self.resolution), hours, hm)
+        results = []
+        for capacity, (storage_levels, inflows, outflows, residuals, exflows, losses,
+                       exporting) in zip(capacities, runs):
+            self.battery.exporting = exporting
+            results.append(self._collect_results(capacity, demand, price, storage_levels,
+                                                 inflows, outflows, residuals, exflows, losses))
+        return results
+
+    def _collect_results(self, capacity, demand, price, storage_levels, inflows,
+                         outflows, residuals, exflows, losses):
+        """Zeitreihen in self.data schreiben und Kennzahlen berechnen."""
+        exported = np.count_nonzero(self.battery.exporting)
+        self.exporting_l.append((self.battery.exporting.size - exported, exported))
+
+        # Ergebnisse in DataFrame schreiben (ein assign statt sechs Einzel-Inserts)
+        self.data = self.data.assign(battery_storage=storage_levels,
+                                     battery_inflow=inflows,
+                                     battery_outflow=outflows,
+                                     residual=residuals,
+                                     exflow=exflows,
+                                     loss=losses)
+        self.battery.data = self.data
+
+        # alle Summen in einem Durchlauf (_aggregate)
+        (demand_total, residual_total, exflow_total, loss_total,
+         spot_total_eur, revenue_total) = _aggregate(demand, residuals, exflows, losses, price,
+                                                     float(self.marketing_costs))
+        if demand_total == 0:
             autarky_rate = 1.0
         else:
-            autarky_rate = 1.0 - (sum(residuals) / sum(demand))
-        spot_total_eur = float(np.sum(np.array(residuals) * price))
-        fix_total_eur = float(sum(residuals) * self.costs_per_kwh)
-        revenue_total = float(np.sum(np.array(exflows) * (price-self.marketing_costs)))
-
-        result = pd.DataFrame([[
-            capacity, sum(residuals), sum(exflows), autarky_rate,
-            spot_total_eur, fix_total_eur, revenue_total, sum(losses)
-        ]],
-            columns=[
-                "capacity kWh", "residual kWh", "exflow kWh",
-                "autarky rate", "spot price [\N{euro sign}]",
-                "fix price [\N{euro sign}]", "revenue [\N{euro sign}]", "loss kWh"
-            ])
-        self.battery_results = pd.concat([self.battery_results, result], ignore_index=True) if self.battery_results is not None else result
+            autarky_rate = 1.0 - (residual_total / demand_total)
+        fix_total_eur = float(residual_total * self.costs_per_kwh)
+
         # l = self.give_dark_time(1200.0, capacity)
-        return result
+        return (capacity, residual_total, exflow_total, autarky_rate,
+                spot_total_eur, fix_total_eur, revenue_total, loss_total)
 
     def give_dark_time(self, level = 1200.0, capacity = 1000.0):
         pass
@@ -173,14 +347,34 @@ class BatterySimulation:
         return sorted(l)
 
 
-    def run_battery_comparison(self, capacities=[2000], power_factor=0.5):
-        """Mehrere Batteriekapazitäten vergleichen"""
-        self.battery_results = pd.DataFrame()
-        for cap in capacities:
-            power = cap * power_factor
+    def run_battery_comparison(self, capacities=[2000], power_factor=0.5, n_jobs=1):
+        """Mehrere Batteriekapazitäten vergleichen
+
+        n_jobs > 1 (None = alle Kerne) rechnet die Kapazitäten parallel: mit
+        numba und Standard-BMS in einem Kern über höchstens n_jobs Threads
+        (battery.scan_sweep), sonst in n_jobs eigenen (spawn-)Prozessen; ein
+        aufrufendes Skript braucht dann den ``if __name__ == "__main__":``-Schutz.
+        Im Prozess-Fall enthalten self.data und exporting_l nicht die
+        Zeitreihen der letzten Simulation; battery_results ist identisch.
+        """
+        powers = [cap * power_factor for cap in capacities]
+        for cap, power in zip(capacities, powers):
             print(f"Simulation: {cap/1000:.2f} MWh, Power: {power/1000:.2f} MW")
-            res = self.simulate_battery(capacity=cap, power=power)
-            print(res.round(2))
+        if n_jobs == 1 or len(capacities) < 2:
+            results = [self._run_simulation(capacity=cap, power=power)
+                       for cap, power in zip(capacities, powers)]
+        elif NUMBA_AVAILABLE and self._can_vectorize():
+            with limit_threads(n_jobs):
+                results = self._run_sweep(capacities, powers)
+        else:
+            # spawn wie core.bms.run_capacities: fork nach gestarteten
+            # numba-Threads kann die Kindprozesse blockieren
+            with ProcessPoolExecutor(max_workers=n_jobs,
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                results = list(executor.map(_simulate_capacity, [self] * len(capacities),
+                                            capacities, powers))
+        # einmal aus allen Zeilen bauen statt concat pro Kapazität
+        self.battery_results = _results_frame(results)
         print("\nGesamtergebnisse:")
         print(self.battery_results.round(2))
         return self.battery_results
@@ -11,8 +11,7 @@ import sys
 import logging
 
 from smard_utils.core.driver import EnergyDriver
-from smard_utils.core.battery import Battery
-from smard_utils.core.bms import BatteryManagementSystem
+from smard_utils.core.bms import run_capacities
 from smard_utils.core.analytics import BatteryAnalytics
 from smard_utils.drivers.biogas_driver import BiogasDriver
 from smard_utils.bms_strategies.price_threshold import PriceThresholdStrategy
@@ -62,13 +61,15 @@ class BioBatSys:
         self.data = self.driver.data
 
     def run_analysis(self, capacity_list=[1.0, 5, 10, 20, 100],
-                     power_list=[0.5, 2.5, 5, 10, 50]):
+                     power_list=[0.5, 2.5, 5, 10, 50],
+                     n_jobs=1):
         """
         Run battery analysis for multiple capacities.
 
         Args:
             capacity_list: List of battery capacities (MWh)
             power_list: List of battery powers (MW)
+            n_jobs: Worker processes for the capacities (1 = serial, None = all cores)
         """
         print("\nStarting biogas battery analysis...")
 
@@ -76,29 +77,24 @@ class BioBatSys:
         full_capacity_list = [0.0] + list(capacity_list)
         full_power_list = [0.0] + list(power_list)
 
-        for capacity, power in zip(full_capacity_list, full_power_list):
-            battery = Battery(self.basic_data_set, capacity * 1000, power * 1000)
-            bms = BatteryManagementSystem(self.strategy, battery, self.driver)
-            bms.initialize()
+        price_arr = self.driver.data['price_per_kwh'].to_numpy(dtype=np.float64, copy=False)
+        avg_arr = self.driver.data['avrgprice'].to_numpy(dtype=np.float64, copy=False)
 
-            # Simulation loop
-            results = []
-            for i in range(len(self.driver)):
-                price = self.driver.data['price_per_kwh'].iloc[i]
-                avg_price = self.driver.data['avrgprice'].iloc[i]
-                step_result = bms.step(i, price, avg_price)
-                results.append(step_result)
+        # One simulation per capacity, in worker processes if n_jobs > 1
+        runs = run_capacities(self.strategy, self.driver, self.basic_data_set,
+                              [capacity * 1000 for capacity in full_capacity_list],
+                              [power * 1000 for power in full_power_list],
+                              price_arr, avg_arr, n_jobs=n_jobs)
 
+        for capacity, power, (bms, results) in zip(full_capacity_list, full_power_list, runs):
             # Record results
             result_dict = self.analytics.add_simulation_result(
                 capacity * 1000, power * 1000, bms, results
             )
 
             # Track export flags for print method
-            self.exporting_l.append((
-                np.size(bms.export_flags) - np.count_nonzero(bms.export_flags),
-                bms.export_flags.sum()
-            ))
+            exported = np.count_nonzero(bms.export_flags)
+            self.exporting_l.append((bms.export_flags.size - exported, exported))
 
         # Get results DataFrame (standard format)
         self.battery_results = self.analytics.get_results_dataframe()
@@ -117,8 +113,6 @@ class BioBatSys:
         - Row 0: "no rule" marker baseline (capacity = -1)
         - Row 1+: Actual simulations (including 0.0 MWh no-battery)
         """
-        df = self.battery_results
-
         # Row 0: "no rule" marker baseline
         marker_baseline = {
             'capacity kWh': -1.0,
@@ -130,23 +124,9 @@ class BioBatSys:
             'revenue [€]': 0.0
         }
 
-        # Start with marker baseline, then add actual simulation results
-        # (including the 0.0 MWh no-battery simulation which is now in df)
-        legacy_df = pd.DataFrame([marker_baseline])
-
-        for _, row in df.iterrows():
-            result_row = {
-                'capacity kWh': row['capacity_kwh'],
-                'residual kWh': row['residual_kwh'],
-                'exflow kWh': row['export_kwh'],
-                'autarky rate': row['autarky_rate'],
-                'spot price [€]': row['spot_cost_eur'],
-                'fix price [€]': row['fix_cost_eur'],
-                'revenue [€]': row['revenue_eur']
-            }
-            legacy_df = pd.concat([legacy_df, pd.DataFrame([result_row])], ignore_index=True)
-
-        self.battery_results = legacy_df
+        # Marker baseline, then the actual simulation results
+        # (including the 0.0 MWh no-battery simulation)
+        self.battery_results = self.analytics.get_legacy_results_dataframe(marker_baseline)
 
     def print_battery_results(self):
         """
@@ -159,17 +139,21 @@ class BioBatSys:
                         self.basic_data_set.get("flex_add_per_kwh", 0))
         min_flex_hours = self.basic_data_set.get("min_flex_hours", 4380)
 
-        # Compute export hours per simulation
-        export_hours = [e[1] * self.resolution for e in self.exporting_l]
+        # Result columns as ndarrays once instead of slicing the Series per list
+        res = self.battery_results
+        capacity = res["capacity kWh"].to_numpy()
+        exflow = res["exflow kWh"].to_numpy()
+        revenue = res["revenue [€]"].to_numpy()
+
+        # Export hours per simulation
+        export_hours = np.array([e[1] for e in self.exporting_l], dtype=np.float64) * self.resolution
 
         # Flex premium per simulation: only if export hours < threshold
         # (flexible operation = NOT running at full capacity all the time)
         # exporting_l[0] corresponds to 0.0 MWh (no battery), [1] to first capacity, etc.
-        flex_per_sim = []
-        for eh in export_hours:
-            flex_per_sim.append(flex_add_full if eh < min_flex_hours else 0)
+        flex_per_sim = np.where(export_hours < min_flex_hours, flex_add_full, 0)
 
-        rev1 = self.battery_results["revenue [€]"].iloc[1] if len(self.battery_results) > 1 else 0
+        rev1 = revenue[1] if len(revenue) > 1 else 0
 
         # Auto-scale based on data magnitude
         if abs(self.data["my_renew"].sum()) / 1000 > 1000:
@@ -185,31 +169,16 @@ class BioBatSys:
                   f" (flex premium applies if export < {min_flex_hours} h)")
 
         # Format results (matches original: skip marker row 0, start from row 1)
-        capacity_l = ["no rule"] + [f"{(c / scaler)}" for c in self.battery_results["capacity kWh"][2:]]
-
-        exflowl = [f"{(e / scaler):.1f}" for e in self.battery_results["exflow kWh"][1:]]
-
         # Row 1 (0.0 MWh) gets no flex premium, rows 2+ get conditional flex premium
         # flex_per_sim[0] = 0.0 MWh baseline, flex_per_sim[1] = first capacity, etc.
-        val = self.battery_results['revenue [€]'][1] if len(self.battery_results) > 1 else 0
-        revenue_l = [f"{(val / scaler):.1f}"] + [
-            f"{((rev + flex) / scaler):.1f}"
-            for rev, flex in zip(self.battery_results["revenue [€]"][2:], flex_per_sim[1:])
-        ]
-
-        revenue_gain = ["nn"] + [
-            f"{((rev - rev1 + flex) / scaler):.2f}"
-            for rev, flex in zip(self.battery_results["revenue [€]"][2:], flex_per_sim[1:])
-        ]
-
-        capacity_costs = [f"{0:.2f}"] + [f"{0:.2f}"] + [
-            f"{((rev - rev1 + flex) / max(1e-10, c)):.2f}"
-            for rev, c, flex in zip(
-                self.battery_results["revenue [€]"][3:],
-                self.battery_results["capacity kWh"][3:],
-                flex_per_sim[2:]
-            )
-        ]
+        gain = revenue[2:] - rev1 + flex_per_sim[1:]
+        cost_per_kwh = (revenue[3:] - rev1 + flex_per_sim[2:]) / np.maximum(1e-10, capacity[3:])
+
+        capacity_l = ["no rule"] + [f"{(c / scaler)}" for c in capacity[2:].tolist()]
+        exflowl = [f"{v:.1f}" for v in exflow[1:] / scaler]
+        revenue_l = [f"{(rev1 / scaler):.1f}"] + [f"{v:.1f}" for v in (revenue[2:] + flex_per_sim[1:]) / scaler]
+        revenue_gain = ["nn"] + [f"{v:.2f}" for v in gain / scaler]
+        capacity_costs = [f"{0:.2f}"] + [f"{0:.2f}"] + [f"{v:.2f}" for v in cost_per_kwh]
 
         # Export hours per simulation
         expo_l = [f"{int(eh)}" for eh in export_hours]
@@ -41,6 +41,7 @@ class DayAheadStrategy(BMSStrategy):
         # Planning state
         self.data = None
         self.dt_h = None
+        self._prices = None  # price_per_kwh as ndarray (built in setup_price_array)
 
         # Hour-by-hour schedule: 'charge', 'discharge', or 'idle'
         # Indexed by (date, hour) -> action
@@ -65,6 +66,9 @@ class DayAheadStrategy(BMSStrategy):
         """
         self.data = data
         self.dt_h = dt_h
+        # Plan updates read up to 48 prices each; index an ndarray instead of .iloc
+        self._prices = (data["price_per_kwh"].to_numpy(dtype=float)
+                        if "price_per_kwh" in data.columns else None)
 
     def _update_day_ahead_plan(self, current_index: int):
         """
@@ -78,7 +82,7 @@ class DayAheadStrategy(BMSStrategy):
         Args:
             current_index: Current timestep index in the simulation
         """
-        if self.data is None or "price_per_kwh" not in self.data.columns:
+        if self.data is None or self._prices is None:
             return
 
         timestamp = self.data.index[current_index]
@@ -95,7 +99,7 @@ class DayAheadStrategy(BMSStrategy):
             for h in range(current_hour, 24):
                 idx = self._find_index_for_hour(current_date, h)
                 if idx is not None:
-                    price = self.data["price_per_kwh"].iloc[idx]
+                    price = self._prices[idx]
                     known_prices.append((current_date, h, price, idx))
 
             # Collect tomorrow's 24 hours (just received from day-ahead auction)
@@ -103,7 +107,7 @@ class DayAheadStrategy(BMSStrategy):
             for h in range(24):
                 idx = self._find_index_for_hour(tomorrow, h)
                 if idx is not None:
-                    price = self.data["price_per_kwh"].iloc[idx]
+                    price = self._prices[idx]
                     known_prices.append((tomorrow, h, price, idx))
 
             self.known_until_date = tomorrow
@@ -112,7 +116,7 @@ class DayAheadStrategy(BMSStrategy):
             for h in range(24):
                 idx = self._find_index_for_hour(current_date, h)
                 if idx is not None:
-                    price = self.data["price_per_kwh"].iloc[idx]
+                    price = self._prices[idx]
                     known_prices.append((current_date, h, price, idx))
 
             self.known_until_date = current_date
@@ -29,6 +29,10 @@ class DynamicDischargeStrategy(BMSStrategy):
         self.data = None  # Full dataset for rolling window
         self.dt_h = None  # Time resolution
         self.last_update_day = None  # Track when price array was last updated
+        # Per-step lookup tables built in setup_price_array (None until then)
+        self._hours = None  # Hour of day per timestep (int8)
+        self._update_at = None  # True at 13:00 timesteps
+        self._prices = None  # price_per_kwh as ndarray
 
     def setup_price_array(self, data: pd.DataFrame, dt_h: float):
         """
@@ -40,6 +44,11 @@ class DynamicDischargeStrategy(BMSStrategy):
         """
         self.data = data
         self.dt_h = dt_h
+        index = data.index
+        self._hours = index.hour.to_numpy(dtype=np.int8)
+        self._update_at = (self._hours == 13) & (index.minute.to_numpy() == 0)
+        self._prices = (data["price_per_kwh"].to_numpy(dtype=float)
+                        if "price_per_kwh" in data.columns else None)
 
     def _update_price_array(self, current_index: int):
         """
@@ -55,21 +64,19 @@ class DynamicDischargeStrategy(BMSStrategy):
             self.price_array = np.zeros(24)
             return
 
-        price_per_kwh = self.data["price_per_kwh"]
+        prices = self._prices
+        if prices is None:
+            prices = self.data["price_per_kwh"].to_numpy(dtype=float)
+            self._hours = self.data.index.hour.to_numpy(dtype=np.int8)
 
         # Rolling 24-hour window from current position
-        rest_len = min(int(24 / self.dt_h), len(price_per_kwh) - current_index)
+        rest_len = min(int(24 / self.dt_h), len(prices) - current_index)
+        hours = self._hours[current_index:current_index + rest_len]
+        window = prices[current_index:current_index + rest_len]
 
-        vals = [(price_per_kwh.index[j].hour, price_per_kwh.iloc[j])
-                for j in range(current_index, current_index + rest_len)]
-
-        # Deduplicate by hour (keep first occurrence)
-        vals_set = []
-        vals_indices = []
-        for val in vals:
-            if val[0] not in vals_indices:
-                vals_set.append(val)
-                vals_indices.append(val[0])
+        # Deduplicate by hour (keep first occurrence, in time order)
+        first = np.sort(np.unique(hours, return_index=True)[1])
+        vals_set = list(zip(hours[first].tolist(), window[first].tolist()))
 
         if len(vals_set) == 0:
             self.price_array = np.zeros(24)
@@ -89,6 +96,24 @@ class DynamicDischargeStrategy(BMSStrategy):
         else:
             self.price_array = np.zeros(24)
 
+    def _context_factor(self, context: dict) -> float:
+        """
+        Discharge factor for the timestep in context.
+
+        Reads the hour from the precomputed table when the context carries
+        the timestep index, instead of the Timestamp's hour attribute.
+
+        Args:
+            context: Decision context
+
+        Returns:
+            Discharge factor in range [-1, 1]
+        """
+        index = context.get('index')
+        if self._hours is not None and index is not None:
+            return float(self.price_array[self._hours[index]])
+        return self._discharging_factor(context['timestamp'])
+
     def _discharging_factor(self, timestamp) -> float:
         """
         Get discharge factor for current hour.
@@ -99,7 +124,8 @@ class DynamicDischargeStrategy(BMSStrategy):
         Returns:
             Discharge factor in range [-1, 1]
         """
-        return self.price_array[timestamp.hour]
+        # Python float, so the per-step strategy arithmetic stays off NumPy scalars
+        return float(self.price_array[timestamp.hour])
 
     def _saturation_curve(self, x: float, df: float, df_min: float, sub: float) -> float:
         """
@@ -133,7 +159,7 @@ class DynamicDischargeStrategy(BMSStrategy):
         Returns:
             True if should charge
         """
-        df = self._discharging_factor(context['timestamp'])
+        df = self._context_factor(context)
         max_soc = self.basic_data_set.get("max_soc", 0.95)
 
         return (df < 0 and
@@ -153,14 +179,19 @@ class DynamicDischargeStrategy(BMSStrategy):
             True if should discharge
         """
         # Update price array daily at 13:00
-        timestamp = context['timestamp']
-        current_day = timestamp.date()
-        if (self.last_update_day != current_day and
-            timestamp.hour == 13 and timestamp.minute == 0):
-            self._update_price_array(context['index'])
-            self.last_update_day = current_day
-
-        df = self._discharging_factor(timestamp)
+        index = context.get('index')
+        if self._update_at is not None and index is not None:
+            at_update = self._update_at[index]
+        else:
+            timestamp = context['timestamp']
+            at_update = timestamp.hour == 13 and timestamp.minute == 0
+        if at_update:
+            current_day = context['timestamp'].date()
+            if self.last_update_day != current_day:
+                self._update_price_array(context['index'])
+                self.last_update_day = current_day
+
+        df = self._context_factor(context)
         df_min = 0.7  # Discharge only in top ~30% of daily prices
         min_soc = self.basic_data_set.get("min_soc", 0.05)
 
@@ -212,7 +243,7 @@ class DynamicDischargeStrategy(BMSStrategy):
         Returns:
             Energy to discharge (kWh)
         """
-        df = self._discharging_factor(context['timestamp'])
+        df = self._context_factor(context)
         min_soc = self.basic_data_set.get("min_soc", 0.05)
 
         # Saturation curve parameters (optimized for >= 20 MWh)
@@ -4,6 +4,8 @@ Price threshold strategy with hysteresis.
 Used by biogas systems: charge at low prices, discharge at high prices.
 """
 
+import numpy as np
+
 from smard_utils.core.bms import BMSStrategy
 
 
@@ -24,14 +26,6 @@ class PriceThresholdStrategy(BMSStrategy):
         self.load_threshold = basic_data_set.get("load_threshold", 1.0)
         self.load_threshold_high = basic_data_set.get("load_threshold_high", 1.2)
         self.export_threshold = basic_data_set.get("export_threshold", 0.9)
-        self.meanprice = None  # Set during simulation
-
-    def setup_meanprice(self, data):
-        """Calculate mean price for export threshold."""
-        if 'price_per_kwh' in data.columns:
-            self.meanprice = data['price_per_kwh'].mean()
-        else:
-            self.meanprice = 0.0
 
     def should_charge(self, context: dict) -> bool:
         """
@@ -110,3 +104,31 @@ class PriceThresholdStrategy(BMSStrategy):
             context['current_storage'] - (min_soc * context['capacity'])
         )
         return allowed_energy
+
+    def scan_decisions(self, prices, avg_prices):
+        """
+        Charge/discharge masks for the compiled scan of BatteryManagementSystem.run().
+
+        Decisions only depend on the prices and the amounts are the plain
+        power/SOC limits, so the whole series can be simulated at once.
+
+        Args:
+            prices: Electricity price per timestep (€/kWh)
+            avg_prices: Average/reference price per timestep (€/kWh)
+
+        Returns:
+            (discharge, charge, export) boolean arrays, or None if a subclass
+            overrides one of the per-step methods
+        """
+        cls = type(self)
+        if any(getattr(cls, name) is not getattr(PriceThresholdStrategy, name)
+               for name in _SCAN_METHODS):
+            return None
+        discharge = prices >= self.load_threshold * np.abs(avg_prices)
+        charge = prices < self.load_threshold * avg_prices
+        return discharge, charge, np.zeros(prices.size, dtype=bool)
+
+
+# Methods the masks of scan_decisions stand for
+_SCAN_METHODS = ('should_charge', 'should_discharge', 'should_export',
+                 'calculate_charge_amount', 'calculate_discharge_amount')
@@ -11,8 +11,7 @@ import os
 import sys
 import logging
 
-from smard_utils.core.battery import Battery
-from smard_utils.core.bms import BatteryManagementSystem
+from smard_utils.core.bms import run_capacities
 from smard_utils.core.analytics import BatteryAnalytics
 from smard_utils.drivers.community_driver import CommunityDriver
 from smard_utils.bms_strategies.dynamic_discharge import DynamicDischargeStrategy
@@ -62,13 +61,15 @@ class SmardAnalyseSys:
         self.data = self.driver.data
 
     def run_analysis(self, capacity_list=[0.1, 1.0, 5, 10, 20],
-                     power_list=[0.05, 0.5, 2.5, 5, 10]):
+                     power_list=[0.05, 0.5, 2.5, 5, 10],
+                     n_jobs=1):
         """
         Run battery analysis for multiple capacities.
 
         Args:
             capacity_list: List of battery capacities (MWh)
             power_list: List of battery powers (MW)
+            n_jobs: Worker processes for the capacities (1 = serial, None = all cores)
         """
         print("\nStarting community energy analysis...")
 
@@ -79,29 +80,24 @@ class SmardAnalyseSys:
         full_capacity_list = [0.0] + list(capacity_list)
         full_power_list = [0.0] + list(power_list)
 
-        for capacity, power in zip(full_capacity_list, full_power_list):
-            battery = Battery(self.basic_data_set, capacity * 1000, power * 1000)
-            bms = BatteryManagementSystem(self.strategy, battery, self.driver)
-            bms.initialize()
+        price_arr = self.driver.data['price_per_kwh'].to_numpy(dtype=np.float64, copy=False)
+        avg_arr = self.driver.data['avrgprice'].to_numpy(dtype=np.float64, copy=False)
 
-            # Simulation loop
-            results = []
-            for i in range(len(self.driver)):
-                price = self.driver.data['price_per_kwh'].iloc[i]
-                avg_price = self.driver.data['avrgprice'].iloc[i]
-                step_result = bms.step(i, price, avg_price)
-                results.append(step_result)
+        # One simulation per capacity, in worker processes if n_jobs > 1
+        runs = run_capacities(self.strategy, self.driver, self.basic_data_set,
+                              [capacity * 1000 for capacity in full_capacity_list],
+                              [power * 1000 for power in full_power_list],
+                              price_arr, avg_arr, n_jobs=n_jobs)
 
+        for capacity, power, (bms, results) in zip(full_capacity_list, full_power_list, runs):
             # Record results
             self.analytics.add_simulation_result(
                 capacity * 1000, power * 1000, bms, results
             )
 
             # Track export flags
-            self.exporting_l.append((
-                np.size(bms.export_flags) - np.count_nonzero(bms.export_flags),
-                bms.export_flags.sum()
-            ))
+            exported = np.count_nonzero(bms.export_flags)
+            self.exporting_l.append((bms.export_flags.size - exported, exported))
 
         # Get results
         self.battery_results = self.analytics.get_results_dataframe()
@@ -124,8 +120,6 @@ class SmardAnalyseSys:
 
     def _convert_to_legacy_format(self):
         """Convert new results format to legacy community format."""
-        df = self.battery_results
-
         # Row 0: "no renew" baseline (all demand at market price)
         total_demand = self.data["my_demand"].sum()
         spot_price_no = (self.data["my_demand"] * self.data["price_per_kwh"]).sum()
@@ -141,41 +135,23 @@ class SmardAnalyseSys:
             f'revenue [{euro_sign}]': 0.0
         }
 
-        legacy_df = pd.DataFrame([no_renew])
-
-        for _, row in df.iterrows():
-            result_row = {
-                'capacity kWh': row['capacity_kwh'],
-                'residual kWh': row['residual_kwh'],
-                'exflow kWh': row['export_kwh'],
-                'autarky rate': row['autarky_rate'],
-                f'spot price [{euro_sign}]': row['spot_cost_eur'],
-                f'fix price [{euro_sign}]': row['fix_cost_eur'],
-                f'revenue [{euro_sign}]': row['revenue_eur']
-            }
-            legacy_df = pd.concat([legacy_df, pd.DataFrame([result_row])], ignore_index=True)
-
-        self.battery_results = legacy_df
+        self.battery_results = self.analytics.get_legacy_results_dataframe(no_renew)
 
     def print_battery_results(self):
         """Print community-specific results with spot/fix price analysis."""
-        sp0 = self.battery_results[f"spot price [{euro_sign}]"].iloc[1]
-        fp0 = self.battery_results[f"fix price [{euro_sign}]"].iloc[1]
+        # Result columns as ndarrays once instead of slicing the Series per list
+        res = self.battery_results
+        capacity = res["capacity kWh"].to_numpy()
+        spot_price = res[f"spot price [{euro_sign}]"].to_numpy()
+        fix_price = res[f"fix price [{euro_sign}]"].to_numpy()
 
         # 2 zeros for "no renew" (row 0) and "no bat" (row 1), gains from row 2+
+        divisor = np.maximum(1e-10, capacity[2:])
         spotprice_gain = [f"{0:.2f}", f"{0:.2f}"] + [
-            f"{((sp0 - s) / max(1e-10, c)):.2f}"
-            for s, c in zip(
-                self.battery_results[f"spot price [{euro_sign}]"][2:],
-                self.battery_results["capacity kWh"][2:]
-            )
+            f"{v:.2f}" for v in (spot_price[1] - spot_price[2:]) / divisor
         ]
         fixprice_gain = [f"{0:.2f}", f"{0:.2f}"] + [
-            f"{((fp0 - f) / max(1e-10, c)):.2f}"
-            for f, c in zip(
-                self.battery_results[f"fix price [{euro_sign}]"][2:],
-                self.battery_results["capacity kWh"][2:]
-            )
+            f"{v:.2f}" for v in (fix_price[1] - fix_price[2:]) / divisor
         ]
 
         # Auto-scale
@@ -194,24 +170,12 @@ class SmardAnalyseSys:
                 f"sp {euro_sign}/kWh", f"fp {euro_sign}/kWh"
             ]
 
-        capacity_l = ["no renew", "no bat"] + [
-            f"{(c / scaler)}" for c in self.battery_results["capacity kWh"][2:]
-        ]
-        residual_l = [
-            f"{(r / scaler):.1f}" for r in self.battery_results['residual kWh']
-        ]
-        exflowl = [
-            f"{(e / scaler):.1f}" for e in self.battery_results["exflow kWh"]
-        ]
-        autarky_rate_l = [
-            f"{a:.2f}" for a in self.battery_results["autarky rate"]
-        ]
-        spot_price_l = [
-            f"{(s / scaler):.1f}" for s in self.battery_results[f"spot price [{euro_sign}]"]
-        ]
-        fix_price_l = [
-            f"{(f / scaler):.1f}" for f in self.battery_results[f"fix price [{euro_sign}]"]
-        ]
+        capacity_l = ["no renew", "no bat"] + [f"{(c / scaler)}" for c in capacity[2:].tolist()]
+        residual_l = [f"{v:.1f}" for v in res["residual kWh"].to_numpy() / scaler]
+        exflowl = [f"{v:.1f}" for v in res["exflow kWh"].to_numpy() / scaler]
+        autarky_rate_l = [f"{v:.2f}" for v in res["autarky rate"].to_numpy()]
+        spot_price_l = [f"{v:.1f}" for v in spot_price / scaler]
+        fix_price_l = [f"{v:.1f}" for v in fix_price / scaler]
 
         values = np.array([
             capacity_l, residual_l, exflowl, autarky_rate_l,
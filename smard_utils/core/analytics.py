@@ -11,6 +11,17 @@ import os
 
 root_dir = f"{os.path.abspath(os.path.dirname(__file__))}/../.."
 
+# Result columns -> legacy column names (in legacy order), see get_legacy_results_dataframe
+LEGACY_COLUMNS = {
+    'capacity_kwh': 'capacity kWh',
+    'residual_kwh': 'residual kWh',
+    'export_kwh': 'exflow kWh',
+    'autarky_rate': 'autarky rate',
+    'spot_cost_eur': 'spot price [\N{euro sign}]',
+    'fix_cost_eur': 'fix price [\N{euro sign}]',
+    'revenue_eur': 'revenue [\N{euro sign}]',
+}
+
 
 class BatteryAnalytics:
     """Collect simulation data and calculate profits."""
@@ -93,29 +104,31 @@ class BatteryAnalytics:
             capacity: Battery capacity (kWh)
             power: Battery power (kW)
             bms: BatteryManagementSystem instance
-            step_results: List of dicts from bms.step()
+            step_results: Structured array from bms.run(), or list of dicts
+                from bms.step()
 
         Returns:
             Dict with calculated metrics
         """
-        df = pd.DataFrame(step_results)
+        # Structured arrays are summed field by field without building a DataFrame
+        steps = step_results if isinstance(step_results, np.ndarray) else pd.DataFrame(step_results)
 
         # Calculate totals
-        total_residual = df['residual_kwh'].sum()
-        total_export = df['export_kwh'].sum()
+        total_residual = steps['residual_kwh'].sum()
+        total_export = steps['export_kwh'].sum()
         total_demand = self.driver.data['my_demand'].sum()
-        total_loss = df['loss_kwh'].sum()
+        total_loss = steps['loss_kwh'].sum()
 
         # Autarky rate (self-sufficiency)
         autarky_rate = 1.0 - (total_residual / total_demand) if total_demand > 0 else 1.0
 
         # Cost calculations
-        spot_cost = (df['residual_kwh'] * df['price']).sum()
+        spot_cost = (steps['residual_kwh'] * steps['price']).sum()
         fix_cost = total_residual * self.costs_per_kwh
 
         # Revenue from exports
         marketing_cost = self.basic_data_set.get("marketing_costs", 0.0)
-        revenue = (df['export_kwh'] * (df['price'] - marketing_cost)).sum()
+        revenue = (steps['export_kwh'] * (steps['price'] - marketing_cost)).sum()
 
         # Export time
         export_hours = bms.export_flags.sum() * self.driver.resolution
@@ -142,6 +155,21 @@ class BatteryAnalytics:
         """Return all results as DataFrame."""
         return pd.DataFrame(self.simulation_results)
 
+    def get_legacy_results_dataframe(self, baseline: dict, columns=tuple(LEGACY_COLUMNS)) -> pd.DataFrame:
+        """
+        Return the results with legacy column names, after a baseline row.
+
+        Args:
+            baseline: First row, keyed by legacy column names (missing ones become NaN)
+            columns: Result columns to keep, in this order (default: all of LEGACY_COLUMNS)
+
+        Returns:
+            DataFrame with the baseline row and one row per simulation
+        """
+        names = {col: LEGACY_COLUMNS[col] for col in columns}
+        renamed = self.get_results_dataframe().rename(columns=names)[list(names.values())]
+        return pd.concat([pd.DataFrame([baseline]), renamed], ignore_index=True)
+
     def calculate_capacity_roi(self) -> pd.DataFrame:
         """
         Calculate ROI per capacity unit.
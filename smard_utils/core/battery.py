@@ -7,6 +7,10 @@ Based on BatterySolBatModel from battery_model.py with complete physics simulati
 import numpy as np
 
 
+# Columns of Battery.history (struct-of-arrays, one float64 array per field)
+HISTORY_FIELDS = ('storage_kwh', 'soc', 'stored_kwh', 'net_discharge', 'loss_kwh')
+
+
 class Battery:
     """Physical battery model with I²R losses, efficiency, and SOC limits."""
 
@@ -42,7 +46,46 @@ class Battery:
         self.capacity_kwh = float(capacity_kwh)
         self.p_max_kw = float(p_max_kw or (self.max_c_rate * self.capacity_kwh))
         self.current_storage = init_storage_kwh or (0.5 * self.capacity_kwh)
-        self.history = []
+        self._dt_h = None  # timestep of prepare(), None = not prepared
+        self._step_consts = None
+        self.reserve_history(0)
+
+    @property
+    def history(self) -> dict:
+        """
+        Recorded timesteps as columns.
+
+        Returns:
+            Dict mapping each name in HISTORY_FIELDS to a float64 array
+            with one entry per executed timestep
+        """
+        n = self._history_len
+        return {k: v[:n] for k, v in self._history.items()}
+
+    def reserve_history(self, n: int):
+        """
+        Preallocate history buffers for n timesteps and clear the history.
+
+        Args:
+            n: Expected number of execute() calls
+        """
+        self._history = {k: np.empty(n) for k in HISTORY_FIELDS}
+        self._history_len = 0
+
+    def set_history(self, columns: dict):
+        """
+        Replace the history by a whole simulated series.
+
+        Used by full-series simulations that bypass execute(); the last
+        storage value becomes current_storage.
+
+        Args:
+            columns: Dict with one array per name in HISTORY_FIELDS
+        """
+        self._history = {k: np.array(columns[k], dtype=np.float64) for k in HISTORY_FIELDS}
+        self._history_len = self._history['storage_kwh'].size
+        if self._history_len:
+            self.current_storage = float(self._history['storage_kwh'][-1])
 
     def soc(self) -> float:
         """
@@ -74,6 +117,39 @@ class Battery:
         p_loss_w = (i ** 2) * self.r0_ohm  # Power loss (W)
         return (p_loss_w * dt_h) / 1000.0  # Energy loss (kWh)
 
+    def step_constants(self, dt_h: float) -> tuple:
+        """
+        Per-step constants from the current parameters.
+
+        Args:
+            dt_h: Timestep duration (hours)
+
+        Returns:
+            Tuple (max_energy, min_cap, max_cap, decay, r0_coef); the I²R
+            loss of a step is r0_coef * P² (P in kW), see _calculate_i2r_loss
+        """
+        if self.r0_ohm <= 0 or self.u_nom <= 0:
+            r0_coef = 0.0
+        else:
+            r0_coef = (1000.0 / self.u_nom) ** 2 * self.r0_ohm * dt_h / 1000.0
+        return (self.p_max_kw * dt_h, self.min_soc * self.capacity_kwh,
+                self.max_soc * self.capacity_kwh, 1.0 - self.battery_discharge * dt_h, r0_coef)
+
+    def prepare(self, dt_h: float):
+        """
+        Fix the per-step constants for one simulation run.
+
+        Called by BatteryManagementSystem.initialize(). Until the next
+        prepare() or reset(), execute() with this dt_h uses these constants,
+        so parameter changes in between take effect with the next run.
+        Without prepare(), execute() computes them on every call.
+
+        Args:
+            dt_h: Timestep duration (hours)
+        """
+        self._dt_h = dt_h
+        self._step_consts = self.step_constants(dt_h)
+
     def execute(self, charge_kwh: float = 0.0, discharge_kwh: float = 0.0,
                 dt_h: float = 1.0) -> dict:
         """
@@ -91,31 +167,37 @@ class Battery:
         delivered_energy = 0.0
         loss = 0.0
 
-        # Clamp to power limit
-        max_energy = self.p_max_kw * dt_h
-        charge_kwh = min(charge_kwh, max_energy)
-        discharge_kwh = min(discharge_kwh, max_energy)
+        if dt_h == self._dt_h:
+            max_energy, lo, hi, decay, r0_coef = self._step_consts
+        else:
+            max_energy, lo, hi, decay, r0_coef = self.step_constants(dt_h)
+
+        # Clamp to power limit (conditional expressions instead of min()/max() calls)
+        charge_kwh = max_energy if charge_kwh > max_energy else charge_kwh
+        discharge_kwh = max_energy if discharge_kwh > max_energy else discharge_kwh
+        storage = self.current_storage
 
         if charge_kwh > 0:
             # Charging
-            loss = self._calculate_i2r_loss(charge_kwh / dt_h, dt_h)
-            stored_energy = max(0.0, (charge_kwh - loss)) * self.efficiency_charge
-            self.current_storage += stored_energy
+            power_kw = charge_kwh / dt_h
+            loss = r0_coef * power_kw * power_kw
+            net = charge_kwh - loss
+            stored_energy = (net if net > 0.0 else 0.0) * self.efficiency_charge
+            storage += stored_energy
 
         elif discharge_kwh > 0:
             # Discharging
-            loss = self._calculate_i2r_loss(discharge_kwh / dt_h, dt_h)
-            delivered_energy = max(0.0, (discharge_kwh - loss)) * self.efficiency_discharge
-            self.current_storage -= discharge_kwh / self.efficiency_discharge
+            power_kw = discharge_kwh / dt_h
+            loss = r0_coef * power_kw * power_kw
+            net = discharge_kwh - loss
+            delivered_energy = (net if net > 0.0 else 0.0) * self.efficiency_discharge
+            storage -= discharge_kwh / self.efficiency_discharge
 
         # Self-discharge
-        self.current_storage *= (1.0 - self.battery_discharge * dt_h)
+        storage *= decay
 
         # Clamp to SOC limits
-        self.current_storage = max(
-            self.min_soc * self.capacity_kwh,
-            min(self.max_soc * self.capacity_kwh, self.current_storage)
-        )
+        self.current_storage = lo if storage < lo else (hi if storage > hi else storage)
 
         record = {
             'storage_kwh': self.current_storage,
@@ -124,9 +206,23 @@ class Battery:
             'net_discharge': delivered_energy,
             'loss_kwh': loss
         }
-        self.history.append(record)
+        self._record_history(record)
         return record
 
+    def _record_history(self, record: dict):
+        """Write one timestep into the history buffers, growing them if full."""
+        i = self._history_len
+        history = self._history
+        if i == history['storage_kwh'].size:
+            size = max(16, 2 * i)
+            for k, v in history.items():
+                grown = np.empty(size)
+                grown[:i] = v
+                history[k] = grown
+        for k in HISTORY_FIELDS:
+            history[k][i] = record[k]
+        self._history_len = i + 1
+
     def reset(self, init_storage_kwh: float = None):
         """
         Reset battery to initial state.
@@ -135,4 +231,5 @@ class Battery:
             init_storage_kwh: Initial storage, defaults to 50% SOC
         """
         self.current_storage = init_storage_kwh or (0.5 * self.capacity_kwh)
-        self.history = []
+        self._history_len = 0
+        self._dt_h = None
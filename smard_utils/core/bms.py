@@ -5,8 +5,90 @@ Orchestrates battery control using pluggable strategies for profit optimization.
 """
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import numpy as np
 
+from smard_utils.utils.jit import njit
+from .battery import Battery, HISTORY_FIELDS
+from .driver import EnergyDriver
+
+# Fields of one step() result; run() stores them in a structured array of this dtype
+STEP_FIELDS = HISTORY_FIELDS + ('export_kwh', 'residual_kwh', 'price', 'avg_price')
+STEP_DTYPE = np.dtype([(name, np.float64) for name in STEP_FIELDS])
+
+
+@njit(cache=True)
+def _scan_steps(discharge, charge, export, renew, demand, storage, capacity, max_energy,
+                dt_h, eff_c, eff_d, lo, hi, decay, r0_coef, charge_hi, discharge_lo):
+    """
+    step() and Battery.execute() over the whole series in one pass.
+
+    The decisions come as masks (BMSStrategy.scan_decisions); the amounts
+    are the power/SOC-limited ones of PriceThresholdStrategy, with the
+    strategy's own SOC bounds charge_hi/discharge_lo (kWh). Same operations
+    in the same order as the per-step path.
+
+    Returns:
+        (storage, soc, stored, net_discharge, loss, export, residual,
+        export_flags), one entry per timestep
+    """
+    n = renew.shape[0]
+    storage_kwh = np.empty(n)
+    soc = np.empty(n)
+    stored_kwh = np.empty(n)
+    net_discharge = np.empty(n)
+    loss_kwh = np.empty(n)
+    export_kwh = np.empty(n)
+    residual_kwh = np.empty(n)
+    export_flags = np.empty(n, dtype=np.bool_)
+    for i in range(n):
+        r = renew[i]
+        d = abs(demand[i])
+        stored = delivered = loss = exported = 0.0
+        if discharge[i]:
+            room = storage - discharge_lo
+            amount = room if room < max_energy else max_energy
+            amount = max_energy if amount > max_energy else amount
+            if amount > 0:
+                power_kw = amount / dt_h
+                loss = r0_coef * power_kw * power_kw
+                net = amount - loss
+                delivered = (net if net > 0.0 else 0.0) * eff_d
+                storage -= amount / eff_d
+            exported = r + delivered - d
+        elif charge[i]:
+            room = charge_hi - storage
+            amount = room if room < max_energy else max_energy
+            amount = amount if amount < r else r
+            remaining = r - amount
+            amount = max_energy if amount > max_energy else amount
+            if amount > 0:
+                power_kw = amount / dt_h
+                loss = r0_coef * power_kw * power_kw
+                net = amount - loss
+                stored = (net if net > 0.0 else 0.0) * eff_c
+                storage += stored
+            if remaining > 0 and export[i]:
+                exported = remaining - d
+        elif export[i]:
+            exported = r - d
+        storage *= decay
+        storage = lo if storage < lo else (hi if storage > hi else storage)
+        exported = exported if exported > 0.0 else 0.0
+        residual = d - r - delivered
+
+        storage_kwh[i] = storage
+        soc[i] = storage / capacity if capacity != 0 else 0.0
+        stored_kwh[i] = stored
+        net_discharge[i] = delivered
+        loss_kwh[i] = loss
+        export_kwh[i] = exported
+        residual_kwh[i] = residual if residual > 0.0 else 0.0
+        export_flags[i] = exported > 0
+    return (storage_kwh, soc, stored_kwh, net_discharge, loss_kwh, export_kwh, residual_kwh,
+            export_flags)
+
 
 class BMSStrategy(ABC):
     """Abstract strategy for battery management control decisions."""
@@ -86,6 +168,23 @@ class BMSStrategy(ABC):
         """
         pass
 
+    def scan_decisions(self, prices, avg_prices):
+        """
+        Decisions for the whole series, if they depend on the prices only.
+
+        Strategies whose decisions and amounts fit the compiled scan of
+        BatteryManagementSystem.run() return the masks of the three cases;
+        the default (None) keeps the per-step path through should_*().
+
+        Args:
+            prices: Electricity price per timestep (€/kWh)
+            avg_prices: Average/reference price per timestep (€/kWh)
+
+        Returns:
+            (discharge, charge, export) boolean arrays or None
+        """
+        return None
+
 
 class BatteryManagementSystem:
     """Core BMS - orchestrates battery control using a strategy."""
@@ -106,12 +205,78 @@ class BatteryManagementSystem:
 
     def initialize(self):
         """Setup before simulation (called once before loop)."""
+        if hasattr(self.driver, 'cache_timesteps'):
+            self.driver.cache_timesteps()
+        if hasattr(self.battery, 'reserve_history'):
+            self.battery.reserve_history(len(self.driver))
+        if hasattr(self.battery, 'prepare'):
+            self.battery.prepare(self.driver.resolution)
         if hasattr(self.strategy, 'setup_price_array'):
             self.strategy.setup_price_array(self.driver.data, self.driver.resolution)
         # Initialize price array with first 24 hours (for DynamicDischargeStrategy)
         if hasattr(self.strategy, '_update_price_array'):
             self.strategy._update_price_array(0)
 
+    def run(self, prices, avg_prices) -> np.ndarray:
+        """
+        Execute step() for every timestep of the driver.
+
+        Args:
+            prices: Electricity price per timestep (€/kWh)
+            avg_prices: Average/reference price per timestep (€/kWh)
+
+        Returns:
+            Structured array of dtype STEP_DTYPE with one row per timestep
+            (the step() dicts, field by field in one contiguous buffer)
+        """
+        results = np.empty(len(self.driver), dtype=STEP_DTYPE)
+        decisions = self._scan_decisions(prices, avg_prices)
+        if decisions is not None:
+            self._run_scan(decisions, results)
+            results['price'] = prices
+            results['avg_price'] = avg_prices
+            return results
+        for i in range(results.size):
+            step_result = self.step(i, prices[i], avg_prices[i])
+            results[i] = tuple([step_result[name] for name in STEP_FIELDS])
+        return results
+
+    def _scan_decisions(self, prices, avg_prices):
+        """Strategy masks for the compiled scan, or None if run() has to step."""
+        # A driver with its own get_timestep may not serve the data columns
+        if type(self.driver).get_timestep is not EnergyDriver.get_timestep:
+            return None
+        return self.strategy.scan_decisions(np.asarray(prices, dtype=np.float64),
+                                            np.asarray(avg_prices, dtype=np.float64))
+
+    def _run_scan(self, decisions, results):
+        """
+        Simulate all timesteps with _scan_steps and fill results in place.
+
+        Leaves battery (current_storage, history) and export_flags as the
+        per-step path would.
+        """
+        battery = self.battery
+        dt_h = self.driver.resolution
+        max_energy, min_cap, max_cap, decay, r0_coef = battery.step_constants(dt_h)
+        data = self.driver.data
+        discharge, charge, export = decisions
+        strategy_data = self.strategy.basic_data_set
+        columns = _scan_steps(
+            discharge, charge, export,
+            data['my_renew'].to_numpy(dtype=np.float64),
+            data['my_demand'].to_numpy(dtype=np.float64),
+            float(battery.current_storage), battery.capacity_kwh, max_energy, dt_h,
+            battery.efficiency_charge, battery.efficiency_discharge,
+            min_cap, max_cap, decay, r0_coef,
+            strategy_data.get("max_soc", 0.95) * battery.capacity_kwh,
+            strategy_data.get("min_soc", 0.05) * battery.capacity_kwh)
+        names = HISTORY_FIELDS + ('export_kwh', 'residual_kwh')
+        for name, column in zip(names, columns):
+            results[name] = column
+        self.export_flags = columns[-1]
+        battery.set_history(dict(zip(HISTORY_FIELDS, columns)))
+
     def step(self, index: int, price: float, avg_price: float) -> dict:
         """
         Execute one simulation timestep.
@@ -195,3 +360,68 @@ class BatteryManagementSystem:
             'price': price,
             'avg_price': avg_price
         }
+
+
+def simulate_capacity(strategy: BMSStrategy, driver, basic_data_set: dict,
+                      capacity: float, power: float, prices, avg_prices):
+    """
+    Run one complete simulation for a battery of the given size.
+
+    Module level so that run_capacities can hand it to worker processes.
+
+    Args:
+        strategy: BMSStrategy instance for control decisions
+        driver: EnergyDriver with loaded data
+        basic_data_set: Configuration dictionary for the Battery
+        capacity: Battery capacity (kWh)
+        power: Battery power (kW)
+        prices: Electricity price per timestep (€/kWh)
+        avg_prices: Average/reference price per timestep (€/kWh)
+
+    Returns:
+        Tuple of (bms, results) with the finished BatteryManagementSystem
+        and the structured array from bms.run()
+    """
+    battery = Battery(basic_data_set, capacity, power)
+    bms = BatteryManagementSystem(strategy, battery, driver)
+    bms.initialize()
+    return bms, bms.run(prices, avg_prices)
+
+
+def run_capacities(strategy: BMSStrategy, driver, basic_data_set: dict,
+                   capacities, powers, prices, avg_prices, n_jobs: int = 1) -> list:
+    """
+    simulate_capacity for several battery sizes, in their order.
+
+    The simulations are independent of each other. With n_jobs > 1
+    (None = all cores) they run in separate (spawned) processes, each on
+    its own copy of strategy and driver; the returned BMS objects then
+    refer to those copies. As with any spawned pool, a calling script
+    needs the ``if __name__ == "__main__":`` guard.
+
+    Args:
+        strategy: BMSStrategy instance for control decisions
+        driver: EnergyDriver with loaded data
+        basic_data_set: Configuration dictionary for the Battery
+        capacities: Battery capacities (kWh)
+        powers: Battery powers (kW), one per capacity
+        prices: Electricity price per timestep (€/kWh), as a float64 ndarray
+            (the step loop indexes it by position)
+        avg_prices: Average/reference price per timestep (€/kWh), likewise
+        n_jobs: Number of worker processes (1 = run in this process)
+
+    Returns:
+        List of (bms, results) tuples, one per capacity
+    """
+    n = len(capacities)
+    if n_jobs == 1 or n < 2:
+        return [simulate_capacity(strategy, driver, basic_data_set, capacity, power,
+                                  prices, avg_prices)
+                for capacity, power in zip(capacities, powers)]
+    # spawn: forking after numba has started its worker threads (parallel
+    # kernels) can deadlock the children
+    with ProcessPoolExecutor(max_workers=n_jobs,
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        return list(executor.map(simulate_capacity, [strategy] * n, [driver] * n,
+                                 [basic_data_set] * n, capacities, powers,
+                                 [prices] * n, [avg_prices] * n))
@@ -5,13 +5,148 @@ Provides abstract interface for loading and preparing time-series energy data.
 """
 
 from abc import ABC, abstractmethod
+import logging
+import os
+import re
+import zlib
 import pandas as pd
 import numpy as np
 
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# (substring of the SMARD column name, internal name); first match wins
+SMARD_COLUMNS = (
+    ("Wind Onshore", "wind_onshore"),
+    ("Wind Offshore", "wind_offshore"),
+    ("Photovoltaik", "solar"),
+    ("Wasserkraft", "hydro"),
+    ("Biomasse", "biomass"),
+    ("Erdgas [MWh]", "oel"),
+    ("Gesamtverbrauch", "total_demand"),
+    ("Netzlast", "total_demand"),
+)
+
+
+def _to_float(column: pd.Series) -> pd.Series:
+    """Column as float64; text such as '-' becomes NaN, ',' decimals are accepted."""
+    if not pd.api.types.is_numeric_dtype(column):
+        column = column.str.replace(',', '.', regex=False)
+    return pd.to_numeric(column, errors='coerce').astype(np.float64)
+
+
+def read_smard_csv(csv_file_path: str) -> pd.DataFrame:
+    """
+    Read the date, time and known energy columns of a SMARD CSV file.
+
+    The header is read first and resolved against SMARD_COLUMNS, so the
+    other columns are never parsed. Energy columns are renamed to their
+    internal names and converted to float64; entries that are not numbers
+    (e.g. '-') become NaN. With polars installed (``pip install -e .[fast]``)
+    its multi-threaded parser is used, otherwise pandas.
+
+    Args:
+        csv_file_path: Path to SMARD CSV file
+
+    Returns:
+        DataFrame with Datum, Uhrzeit and the renamed energy columns
+    """
+    with open(csv_file_path, encoding='utf-8') as f:
+        header = f.readline().rstrip('\r\n').split(';')
+    column_mapping = {}
+    for col in header:
+        if '[MWh]' not in col:
+            continue
+        name = next((name for sub, name in SMARD_COLUMNS if sub in col), None)
+        if name is not None:
+            column_mapping[col] = name
+
+    usecols = ['Datum', 'Uhrzeit', *column_mapping]
+    if pl is None:
+        df = pd.read_csv(csv_file_path, sep=';', decimal=',', usecols=usecols,
+                         dtype={'Datum': str, 'Uhrzeit': str})
+    else:
+        # All columns as text, converted below; to_pandas() would need pyarrow
+        frame = pl.read_csv(csv_file_path, separator=';', columns=usecols, infer_schema_length=0)
+        df = pd.DataFrame({c: frame[c].to_numpy() for c in frame.columns})
+    df = df.rename(columns=column_mapping)
+    for col in column_mapping.values():
+        df[col] = _to_float(df[col])
+    return df
+
+
+def _parquet_cache_path(csv_file_path: str) -> str:
+    """Parquet cache beside the CSV, keyed by the CSV's mtime and size and SMARD_COLUMNS."""
+    st = os.stat(csv_file_path)
+    directory, name = os.path.split(os.path.abspath(csv_file_path))
+    key = zlib.crc32(repr(SMARD_COLUMNS).encode())
+    return os.path.join(directory, f".{name}.{st.st_mtime_ns}.{st.st_size}.{key:08x}.parquet")
+
+
+def _remove_stale_caches(csv_file_path: str, cache_path: str) -> None:
+    """Delete the CSV's Parquet caches other than cache_path (older mtime, size or columns)."""
+    directory, cache_name = os.path.split(cache_path)
+    name = os.path.basename(csv_file_path)
+    pattern = re.compile(rf"\.{re.escape(name)}\.\d+\.\d+\.[0-9a-f]{{8}}\.parquet")
+    for entry in os.scandir(directory):
+        if entry.name != cache_name and pattern.fullmatch(entry.name):
+            try:
+                os.remove(entry.path)
+            except OSError as e:
+                logger.warning(f"Stale Parquet cache {entry.path} not removed: {e}")
+
+
+def load_smard_frame(csv_file_path: str) -> pd.DataFrame:
+    """
+    read_smard_csv with a DateTime index instead of Datum and Uhrzeit, cached as Parquet.
+
+    With pyarrow installed the result is written beside the CSV on the
+    first load and read from there as long as the CSV (mtime, size) and
+    SMARD_COLUMNS are unchanged; caches of older versions are removed then.
+
+    Args:
+        csv_file_path: Path to SMARD CSV file
+
+    Returns:
+        DataFrame with DateTime index and the renamed energy columns
+    """
+    cache_path = _parquet_cache_path(csv_file_path) if pyarrow is not None else None
+    if cache_path is not None and os.path.exists(cache_path):
+        return pd.read_parquet(cache_path)
+
+    df = read_smard_csv(csv_file_path)
+    # Format fixed once from the first row: SMARD export (01.01.2024)
+    # or smard_downloader_quaterly (2024-01-01)
+    date_format = '%d.%m.%Y %H:%M' if '.' in df['Datum'].iloc[0] else '%Y-%m-%d %H:%M'
+    df['DateTime'] = pd.to_datetime(df['Datum'] + ' ' + df['Uhrzeit'], format=date_format)
+    df = df.drop(columns=['Datum', 'Uhrzeit']).set_index('DateTime')
+
+    if cache_path is not None:
+        try:
+            df.to_parquet(cache_path, compression='zstd')
+        except OSError as e:
+            logger.warning(f"Parquet cache {cache_path} not written: {e}")
+        else:
+            _remove_stale_caches(csv_file_path, cache_path)
+    return df
+
 
 class EnergyDriver(ABC):
     """Abstract base class for energy data providers."""
 
+    # Columns used by simulation and reporting; only these get NaN -> 0
+    FILL_COLUMNS = ("my_demand", "my_renew", "solar", "wind_onshore",
+                    "biomass", "total_demand", "oel")
+
     def __init__(self, basic_data_set: dict):
         """
         Initialize driver with configuration.
@@ -21,6 +156,7 @@ class EnergyDriver(ABC):
         """
         self.basic_data_set = basic_data_set.copy() if basic_data_set else {}
         self.resolution = None  # Time resolution in hours
+        self._timesteps = None  # (renew, demand) ndarrays, see cache_timesteps()
         self._data = None
 
     @abstractmethod
@@ -43,6 +179,17 @@ class EnergyDriver(ABC):
         """
         pass
 
+    @property
+    def _data(self) -> pd.DataFrame:
+        """Prepared DataFrame (None before load_data)."""
+        return self._frame
+
+    @_data.setter
+    def _data(self, df: pd.DataFrame):
+        # A new frame invalidates the get_timestep snapshot
+        self._frame = df
+        self._timesteps = None
+
     @property
     def data(self) -> pd.DataFrame:
         """Returns DataFrame with my_renew and my_demand columns."""
@@ -60,11 +207,46 @@ class EnergyDriver(ABC):
         Returns:
             Tuple of (renew, demand) in kWh
         """
+        if self._timesteps is not None:
+            if index == 0:
+                # Each run starts at 0: pick up columns replaced since the snapshot
+                self.cache_timesteps()
+            renew, demand = self._timesteps
+            return float(renew[index]), float(demand[index])
         return (
             float(self._data['my_renew'].iloc[index]),
             float(self._data['my_demand'].iloc[index])
         )
 
+    def fill_missing(self, df: pd.DataFrame, extra_columns=()) -> pd.DataFrame:
+        """
+        Replace NaN by 0 in the simulation columns only.
+
+        Args:
+            df: Prepared driver DataFrame
+            extra_columns: Additional driver-specific columns to fill
+
+        Returns:
+            The same DataFrame, filled in place
+        """
+        cols = [c for c in (*self.FILL_COLUMNS, *extra_columns) if c in df.columns]
+        df.fillna({c: 0 for c in cols}, inplace=True)
+        return df
+
+    def cache_timesteps(self):
+        """
+        Snapshot my_renew and my_demand as NumPy arrays for get_timestep.
+
+        Avoids pandas .iloc dispatch on every simulation step. Called by
+        BatteryManagementSystem.initialize() and again by get_timestep(0), so
+        the snapshot is refreshed at the start of each simulation run.
+        Assigning _data drops it.
+        """
+        self._timesteps = (
+            self.data['my_renew'].to_numpy(dtype=float),
+            self.data['my_demand'].to_numpy(dtype=float)
+        )
+
     def __len__(self) -> int:
         """Return number of timesteps."""
         return len(self._data) if self._data is not None else 0
@@ -6,7 +6,7 @@ Loads SMARD data and provides constant biogas injection.
 
 import pandas as pd
 import numpy as np
-from smard_utils.core.driver import EnergyDriver
+from smard_utils.core.driver import EnergyDriver, load_smard_frame
 
 
 def remove_holes_from_data(data):
@@ -19,8 +19,10 @@ def remove_holes_from_data(data):
     Returns:
         DataFrame with interpolated DateTime column
     """
-    avrgdiff = (data["DateTime_x"].iloc[-1] - data["DateTime_x"].iloc[0]) / (len(data) - 1)
-    data["DateTime"] = [data["DateTime_x"].iloc[0] + i * avrgdiff for i, e in enumerate(data["DateTime_x"])]
+    start = data["DateTime_x"].iloc[0]
+    avrgdiff = (data["DateTime_x"].iloc[-1] - start) / (len(data) - 1)
+    # start + i * avrgdiff for all rows at once (same integer steps as per element)
+    data["DateTime"] = start + pd.to_timedelta(np.arange(len(data)) * avrgdiff)
     return data
 
 
@@ -39,51 +41,24 @@ class BiogasDriver(EnergyDriver):
         """
         print("Loading SMARD data for biogas analysis...")
 
-        df = pd.read_csv(csv_file_path, sep=';', decimal=',')
-
-        # Create datetime column
-        df['DateTime_x'] = pd.to_datetime(df['Datum'] + ' ' + df['Uhrzeit'], dayfirst=True, format='mixed')
+        # Renamed numeric energy columns and parsed timestamps (cached)
+        df = load_smard_frame(csv_file_path).reset_index(names='DateTime_x')
 
         # Remove holes from data
         df = remove_holes_from_data(df)
         df = df.set_index('DateTime')
 
-        # Remove non-energy columns
-        energy_cols = [col for col in df.columns if '[MWh]' in col]
-        df = df[energy_cols]
-
-        # Rename columns for easier handling
-        column_mapping = {}
-        for col in df.columns:
-            if 'Wind Onshore' in col:
-                column_mapping[col] = 'wind_onshore'
-            elif 'Wind Offshore' in col:
-                column_mapping[col] = 'wind_offshore'
-            elif 'Photovoltaik' in col:
-                column_mapping[col] = 'solar'
-            elif 'Wasserkraft' in col:
-                column_mapping[col] = 'hydro'
-            elif 'Biomasse' in col:
-                column_mapping[col] = 'biomass'
-            elif 'Erdgas [MWh]' in col:
-                column_mapping[col] = 'oel'
-            elif 'Gesamtverbrauch' in col or 'Netzlast' in col:
-                column_mapping[col] = 'total_demand'
-
-        df = df.rename(columns=column_mapping)
-
-        # Ensure energy columns are numeric (handles both '.' and ',' decimals)
-        for col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+        # Keep the energy columns only
+        df = df.drop(columns=['DateTime_x'])
 
         # Calculate resolution
         self.resolution = ((df.index[1] - df.index[0]).seconds) / 3600
 
         # Constant biogas injection (production only, no demand)
         df["my_renew"] = self.basic_data_set.get("constant_biogas_kw", 0) * self.resolution
-        df["my_demand"] = df["total_demand"] * 0  # No demand scenario
+        df["my_demand"] = np.zeros(len(df))  # No demand scenario
 
-        df = df.fillna(0)
+        df = self.fill_missing(df)
 
         print(f"✓ Loaded {len(df)} {(df.index[1]-df.index[0]).seconds/60} minutes records")
         print(f"Date range: {df.index.min()} to {df.index.max()}")
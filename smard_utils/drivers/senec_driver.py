@@ -78,7 +78,7 @@ class SenecDriver(EnergyDriver):
         df["act_battery_inflow"] = df["act_battery_inflow_kw"] * self.resolution
         df["act_battery_exflow"] = df["act_battery_exflow_kw"] * self.resolution
 
-        df = df.fillna(0)
+        df = self.fill_missing(df, extra_columns=("act_battery_inflow", "act_battery_exflow"))
 
         print(f"✓ Loaded {len(df)} records")
         print(f"Date range: {df.index.min()} to {df.index.max()}")
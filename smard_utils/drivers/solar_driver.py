@@ -6,7 +6,7 @@ Loads SMARD data and scales proportionally based on installed capacity.
 
 import pandas as pd
 import numpy as np
-from smard_utils.core.driver import EnergyDriver
+from smard_utils.core.driver import EnergyDriver, load_smard_frame
 
 
 class SolarDriver(EnergyDriver):
@@ -35,39 +35,8 @@ class SolarDriver(EnergyDriver):
         """
         print("Loading SMARD data for solar analysis...")
 
-        df = pd.read_csv(csv_file_path, sep=';', decimal=',')
-
-        # Create datetime column
-        df['DateTime'] = pd.to_datetime(df['Datum'] + ' ' + df['Uhrzeit'], dayfirst=True, format='mixed')
-        df = df.set_index('DateTime')
-
-        # Remove non-energy columns
-        energy_cols = [col for col in df.columns if '[MWh]' in col]
-        df = df[energy_cols]
-
-        # Rename columns for easier handling
-        column_mapping = {}
-        for col in df.columns:
-            if 'Wind Onshore' in col:
-                column_mapping[col] = 'wind_onshore'
-            elif 'Wind Offshore' in col:
-                column_mapping[col] = 'wind_offshore'
-            elif 'Photovoltaik' in col:
-                column_mapping[col] = 'solar'
-            elif 'Wasserkraft' in col:
-                column_mapping[col] = 'hydro'
-            elif 'Biomasse' in col:
-                column_mapping[col] = 'biomass'
-            elif 'Erdgas [MWh]' in col:
-                column_mapping[col] = 'oel'
-            elif 'Gesamtverbrauch' in col or 'Netzlast' in col:
-                column_mapping[col] = 'total_demand'
-
-        df = df.rename(columns=column_mapping)
-
-        # Ensure energy columns are numeric (handles both '.' and ',' decimals)
-        for col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+        # Renamed numeric energy columns and parsed timestamps (cached)
+        df = load_smard_frame(csv_file_path)
 
         # Calculate resolution
         self.resolution = ((df.index[1] - df.index[0]).seconds) / 3600
@@ -81,21 +50,22 @@ class SolarDriver(EnergyDriver):
         total_installed_solar = df["solar"].max()  # MWp
         total_installed_wind = df["wind_onshore"].max()  # MW
 
-        # Proportional scaling
-        df["my_demand"] = df["total_demand"] * year_demand / total_demand * self.resolution
+        # Proportional scaling, computed on the raw arrays and assigned once
+        df["my_demand"] = df["total_demand"].to_numpy() * year_demand / total_demand * self.resolution
 
-        df["my_renew"] = (
-            df["wind_onshore"] *
+        renew = (
+            df["wind_onshore"].to_numpy() *
             self.basic_data_set.get("wind_nominal_power", 0) /
             max(total_installed_wind, 1) * self.resolution
         )
-        df["my_renew"] += (
-            df["solar"] *
+        renew += (
+            df["solar"].to_numpy() *
             self.basic_data_set.get("solar_max_power", 0) /
             max(total_installed_solar, 1) * self.resolution
         )
+        df["my_renew"] = renew
 
-        df = df.fillna(0)
+        df = self.fill_missing(df)
 
         print(f"✓ Loaded {len(df)} {(df.index[1]-df.index[0]).seconds/60} minutes records")
         print(f"Date range: {df.index.min()} to {df.index.max()}")
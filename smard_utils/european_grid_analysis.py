@@ -101,7 +101,7 @@ class EuropeanGridAnalyzer:
                 # Keep other columns with original names for now
             
             df = df.rename(columns=column_mapping)
-            df = df.fillna(0)
+            df.fillna(0, inplace=True)
             
             print(f"✓ Loaded {len(df)} hourly records")
             print(f"Date range: {df.index.min()} to {df.index.max()}")
@@ -222,7 +222,8 @@ class EuropeanGridAnalyzer:
             battery_capacity_mwh = german_battery_gwh * 1000
             battery_power_mw = battery_capacity_mwh  # 1C rate
             
-            battery_level = np.zeros(len(df))
+            # battery_level is set every step, battery_charge only on surplus/deficit
+            battery_level = np.empty(len(df))
             battery_charge = np.zeros(len(df))
             
             for i in range(len(df)):
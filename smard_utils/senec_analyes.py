@@ -4,9 +4,19 @@ import os
 import sys
 import pandas as pd
 import numpy as np
-from datetime import datetime
 import matplotlib.pyplot as plt
 from smard_utils.smard_analyse import Analyse, logger, root_dir
+from smard_utils.utils.jit import njit
+
+
+@njit(cache=True)
+def _sim_act(current, capacity, resolution, factor):
+    """Füllstand aus gemessenem Akkustrom, begrenzt auf [0, capacity]."""
+    level = np.empty(current.size)
+    level[0] = 0.0
+    for i in range(1, current.size):
+        level[i] = max(0.0, min(capacity, level[i-1] + current[i]*resolution*resolution*factor))
+    return level
 
 class Senec(Analyse):
 
@@ -55,35 +65,27 @@ class Senec(Analyse):
                 column_mapping[col] = 'act_battery_current'
 
         df = df.rename(columns=column_mapping)
-        dtl,diff = [], []
-        for i,st in enumerate(df["stime"]):
-            t = datetime.strptime(st,"%d.%m.%Y %H:%M:%S")
-            if i > 0:
-                diff.append((t-dtl[-1]).seconds)
-            dtl.append(t)
-        df["time"] = dtl
-        self.resolution = sum(diff)/len(diff)/3600
-        df = df.set_index("time")        
+        t = pd.to_datetime(df["stime"], format="%d.%m.%Y %H:%M:%S")
+        # .dt.seconds wie timedelta.seconds (Sekundenanteil ohne Tage)
+        self.resolution = t.diff().dt.seconds.mean()/3600
+        df = df.assign(time=t).set_index("time")
         df["solar"] = df["act_solar_kw"]*self.resolution
         df["act_battery_inflow"] = df["act_battery_inflow_kw"]*self.resolution
         df["act_battery_exflow"] = df["act_battery_exflow_kw"]*self.resolution
         df["total_demand"] = df["act_total_demand_kw"] * self.resolution
-        df["my_demand"] = df["total_demand"][:].values
-        df["my_renew"] = df["solar"][:].values
-        df["wind_onshore"] = df["solar"][:].values*0
-        df["my_renew"] += df["wind_onshore"][:].values
+        df["my_demand"] = df["total_demand"].to_numpy()
+        # kein Wind bei Senec: my_renew ist die reine Solarerzeugung
+        df["my_renew"] = df["solar"].to_numpy()
+        df["wind_onshore"] = np.zeros(len(df))
     
         self.total_demand = df["total_demand"].sum()
         return df
 
     def act_simulate_battery(self,capacity=5,factor=1.0, min_cur=-100, max_cur=100):
-        level = [0]
         current = np.minimum(max_cur,np.maximum(min_cur,self.data["act_battery_current"]))
-        for i in range(1,self.data.shape[0]):
-            # newlevel = max(0,min(capacity,level[-1]+(self.data["act_battery_inflow"][i]-self.data["act_battery_exflow"][i])*self.resolution))
-            newlevel = max(0,min(capacity,level[-1]+current.iloc[i]*self.resolution*self.resolution*factor))
-            level.append(newlevel)
-        self.data["act_battery"] = level
+        # newlevel = max(0,min(capacity,level[-1]+(self.data["act_battery_inflow"][i]-self.data["act_battery_exflow"][i])*self.resolution))
+        self.data["act_battery"] = _sim_act(current.to_numpy(dtype=float), float(capacity),
+                                            float(self.resolution), float(factor))
         pass
 
     def details(self,start=0, end=None):
@@ -68,12 +68,12 @@ class BatteryManagementSystem:
         requested_charge = renew - demand   # positiv = Überschuss, negativ = Bedarf
 
         # Assuming battery_model has a step method that takes these arguments
-        [current_storage, inflow, outflow, batexflow, loss] = self.battery.balancing( 
+        current_storage, inflow, outflow, batexflow, loss = self.battery.balancing( 
                             current_storage, capacity,
                             requested_charge, power_per_step)
         residual = max(0, -requested_charge + batexflow)
         exflow = max(0, requested_charge - inflow)
-        return [current_storage, inflow, outflow, residual, exflow, loss]
+        return (current_storage, inflow, outflow, residual, exflow, loss)
 
 class BatterySimuation:
 
@@ -112,19 +112,17 @@ class BatterySimuation:
                                                                  logger = logger)
         raw_costs = self.basic_costs()
         self.costs = self.setup_costs(raw_costs)
+        # (nicht exportiert, exportiert) Zeitschritte je Simulation
+        self.exporting_l = []
 
     def basic_costs(self):
         if self.basic_data_set.get("fix_contract", False) or self.year is None:
-            self.costs["price"] = self.data["my_demand"]*0+self.fix_costs_per_kwh
+            self.costs["price"] = np.full(len(self.data), self.fix_costs_per_kwh, dtype=float)
         else:
             path = f"{root_dir}/costs"
             costs = pd.read_csv(f"{path}/{self.year}-hour-price.csv")
             costs["price"] /= 100
-            total_average = costs["price"].mean()
-                                    
-            # Fülle Randwerte mit total_average
-            costs.fillna({"":total_average}, inplace=True)
-            
+
             costs["dtime"] = pd.to_datetime(costs["time"])
             costs = costs.set_index("dtime")
             
@@ -238,16 +236,18 @@ class BatterySimuation:
         # if hasattr(self.batt, "setup_discharging_factor"):
         #     self.batt.setup_discharging_factor(0, self.resolution)
 
-        self.battery_management_system.init_inport_export_modelling(exporting=np.zeros(len(self.data["my_demand"])))
+        self.battery_management_system.init_inport_export_modelling(exporting=np.zeros(len(self.data["my_demand"]), dtype=np.bool_))
 
         def f(costs, start,end):
             return costs.loc[start:end]
         
+        # hasattr einmal vorab statt pro Schritt
+        has_sdf = hasattr(self.battery, "setup_discharging_factor")
         for i, (r, d) in enumerate(zip(self.data["my_renew"], self.data["my_demand"])):
             local_cost_frame = f(self.costs,
                                  self.data.index[i]-pd.Timedelta(hours=24), 
                                  self.data.index[i]+pd.Timedelta(hours=24))
-            if hasattr(self.battery, "setup_discharging_factor"):
+            if has_sdf:
                 tact = self.data.index[i]
                 if 60*tact.hour + tact.minute == 13*60: # 13 Uhr:
                     self.battery.setup_discharging_factor(i, self.resolution)
@@ -271,11 +271,14 @@ class BatterySimuation:
             losses.append(los)
             self.logger.debug(f"{(stor, inf, outf, resi, exf, los)}")
 
-        if not hasattr(self, "exporting_l"):
-            self.exporting_l = []
-        self.exporting_l.append((np.size(self.battery_management_system.exporting()) -
-                                 np.count_nonzero(self.battery_management_system.exporting()),
-                                self.battery_management_system.exporting().sum()))
+        exporting = self.battery_management_system.exporting()
+        exported = np.count_nonzero(exporting)
+        self.exporting_l.append((exporting.size - exported, exported))
+
+        # Listen einmal in Arrays, Summen als ndarray-Reduktionen statt builtin sum()
+        residuals = np.asarray(residuals, dtype=float)
+        exflows = np.asarray(exflows, dtype=float)
+        losses = np.asarray(losses, dtype=float)
 
         # Ergebnisse in DataFrame schreiben
         self.data["battery_storage"] = storage_levels
@@ -285,17 +288,19 @@ class BatterySimuation:
         self.data["exflow"] = exflows
         self.data["loss"] = losses
 
-        if sum(demand) == 0:
+        demand_total = demand.sum()
+        residual_total = residuals.sum()
+        if demand_total == 0:
             autarky_rate = 1.0
         else:
-            autarky_rate = 1.0 - (sum(residuals) / sum(demand))
-        spot_total_eur = float(np.sum(np.array(residuals) * price))
-        fix_total_eur = float(sum(residuals) * self.fix_costs_per_kwh)
-        revenue_total = float(np.sum(np.array(exflows) * (price-self.marketing_costs)))
+            autarky_rate = 1.0 - (residual_total / demand_total)
+        spot_total_eur = float(residuals @ price)
+        fix_total_eur = float(residual_total * self.fix_costs_per_kwh)
+        revenue_total = float(exflows @ (price-self.marketing_costs))
 
         result = pd.DataFrame([[
-            capacity, sum(residuals), sum(exflows), autarky_rate,
-            spot_total_eur, fix_total_eur, revenue_total, sum(losses)
+            capacity, residual_total, exflows.sum(), autarky_rate,
+            spot_total_eur, fix_total_eur, revenue_total, losses.sum()
         ]],
             columns=[
                 "capacity kWh", "residual kWh", "exflow kWh",
@@ -396,14 +401,17 @@ class Analyse:
             total_installed_wind = 208 # MW norm
 
         ### this an extimate (for the time being seems better ...)
-        total_installed_solar = max(df["solar"]) # MWp
-        total_installed_wind = max(df["wind_onshore"])
-        df["my_demand"] = df["total_demand"] * my_total_demand / total_demand * self.resolution
-        df["my_renew"] = df["wind_onshore"] * self.basic_data_set["wind_nominal_power"] / total_installed_wind * self.resolution
-        df["my_renew"] += df["solar"] * self.basic_data_set["solar_max_power"] / total_installed_solar * self.resolution
+        total_installed_solar = df["solar"].max() # MWp
+        total_installed_wind = df["wind_onshore"].max()
+        # Auf den ndarrays rechnen und je Spalte einmal zuweisen
+        # (keine Series-Zwischenergebnisse)
+        df["my_demand"] = df["total_demand"].to_numpy() * my_total_demand / total_demand * self.resolution
+        renew = df["wind_onshore"].to_numpy() * self.basic_data_set["wind_nominal_power"] / total_installed_wind * self.resolution
+        renew += df["solar"].to_numpy() * self.basic_data_set["solar_max_power"] / total_installed_solar * self.resolution
+        df["my_renew"] = renew
 
         # print(my_total_demand, sum(df["my_demand"]), sum(pos)+sum(neg))
-        df = df.fillna(0)
+        df.fillna(0, inplace=True)
         
         print(f"✓ Loaded {len(df)} {(df.index[1]-df.index[0]).seconds/60} minutes records")
         print(f"Date range: {df.index.min()} to {df.index.max()}")
@@ -435,13 +443,14 @@ class Analyse:
             results = self.battery_simulation.do_simulation(capacity=5*1000, 
                                                   power=2.5*1000)
             pass
-        battery_results = None
+        # Ergebnisse sammeln und einmal zusammenfügen statt concat pro Kapazität
+        battery_results = []
         for capacity, power in zip(capacity_list, power_list):
             results = self.battery_simulation.do_simulation(capacity=capacity*1000, 
                                                   power=power*1000)
             logger.info(f"battery results for {capacity}: {results}")
-            battery_results = pd.concat([battery_results, results])
-        self.battery_results = battery_results
+            battery_results.append(results)
+        self.battery_results = pd.concat(battery_results)
         self.print_battery_results()
         pass
 
@@ -472,14 +481,14 @@ class Analyse:
         pass
 
     def print_results_with_battery(self):
-        res = -sum(self.data["residual"])
+        res = -self.data["residual"].sum()
         if self.my_total_demand/1000 > 1000:
             scaler=1000
             unit = "MWh"
         else:
             scaler=1
             unit = "kWh"
-        print(f"total renewalbes: {(sum(self.pos)/scaler):.2f} {unit}, residual: {(res/scaler):.2f} {unit}, export: {(sum(self.data["exflow"])/scaler):.2f} {unit}")
+        print(f"total renewalbes: {(self.pos.sum()/scaler):.2f} {unit}, residual: {(res/scaler):.2f} {unit}, export: {(self.data['exflow'].sum()/scaler):.2f} {unit}")
         print(f"share with battery: {((self.my_total_demand - res)/self.my_total_demand):.2f}")
         pass
 
@@ -509,7 +518,7 @@ basic_data_set = {
 def main(argv = {}):
     """Main function"""
     if "region" in argv:
-        region = f"_{argv["region"]}"
+        region = f"_{argv['region']}"
     else:
         region = "_de"
     data_file = f"{root_dir}/quarterly/smard_data{region}/smard_2024_complete.csv"
@@ -8,8 +8,15 @@ from datetime import datetime
 import os
 import sys
 import logging
+import functools
 from smard_utils.battery_simulation import BatterySimulation, battery_simulation_version, BatteryManagementSystem
 from smard_utils.battery_model import BatterySolBatModel, BatteryModel
+from smard_utils.core.driver import load_smard_frame
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 
 
 logging.basicConfig(level=logging.WARN)
@@ -19,6 +26,40 @@ DEBUG = False
 
 root_dir = f"{os.path.abspath(os.path.dirname(__file__))}/.."
 
+
+def _load_costs(year, path):
+    """Stundenpreise eines Jahres (price, avrgprice, Index dtime) einlesen.
+
+    Der Index ist ein stündliches Raster ab dem ersten Zeitstempel; wie in
+    prepare_price zählt nur die Position (Zeile i = Stunde i). Geparst wird
+    nur einmal je (year, path, mtime der Datei); jeder Aufrufer bekommt eine
+    eigene Kopie.
+    """
+    file_path = f"{path}/{year}-hour-price.csv"
+    return _read_costs(file_path, os.stat(file_path).st_mtime_ns).copy()
+
+
+@functools.lru_cache(maxsize=8)
+def _read_costs(file_path, mtime_ns):
+    """Preisdatei parsen (für _load_costs); mtime_ns nur als Cache-Schlüssel."""
+    costs = pd.read_csv(file_path,
+                        engine="pyarrow" if pyarrow is not None else "c")
+    costs["price"] /= 100
+    # ✓ OPTIMIERT: Verwende pandas rolling() statt Schleife
+    window_size = 25  # 12 vor + 12 nach + aktueller Wert
+    costs["avrgprice"] = costs["price"].rolling(
+        window=window_size, 
+        center=True, 
+        min_periods=1
+    ).mean()
+    # min_periods=1: auch die Randwerte sind gefüllt, kein fillna nötig
+    
+    # nur den ersten Zeitstempel parsen statt der ganzen Spalte
+    costs.index = pd.date_range(pd.Timestamp(costs["time"].iloc[0]), periods=len(costs),
+                                freq="h", name="dtime")
+    return costs
+
+
 class Analyse(BatterySimulation):
 
     def __init__(self, data=None, basic_data_set={}, logger=logger, **kwargs):
@@ -42,38 +83,13 @@ class Analyse(BatterySimulation):
         
         if "basic_data_set" in kwargs:
             self.basic_data_set = kwargs["basic_data_set"]
-        df = pd.read_csv(csv_file_path, sep=';', decimal=',')
-        
-        # Create datetime column
-        df['DateTime'] = pd.to_datetime(df['Datum'] + ' ' + df['Uhrzeit'])
-        df = df.set_index('DateTime')
-        
-        # Remove non-energy columns
-        energy_cols = [col for col in df.columns if '[MWh]' in col]
-        df = df[energy_cols]
-        
-        # Rename columns for easier handling
-        column_mapping = {}
-        for col in df.columns:
-            if 'Wind Onshore' in col:
-                column_mapping[col] = 'wind_onshore'
-            elif 'Wind Offshore' in col:
-                column_mapping[col] = 'wind_offshore'
-            elif 'Photovoltaik' in col:
-                column_mapping[col] = 'solar'
-            elif 'Wasserkraft' in col:
-                column_mapping[col] = 'hydro'
-            elif 'Biomasse' in col:
-                column_mapping[col] = 'biomass'
-            elif 'Erdgas [MWh]' in col:
-                column_mapping[col] = 'oel'
-            elif 'Gesamtverbrauch' in col or 'Netzlast' in col:
-                column_mapping[col] = 'total_demand'
-            # Keep other columns with original names for now
-
-        df = df.rename(columns=column_mapping)
-
-        self.resolution = ((df.index[1]-df.index[0]).seconds)/3600
+        df = load_smard_frame(csv_file_path)
+
+        # Schrittweite einmal aus den ersten beiden Zeitstempeln (total_seconds
+        # statt .seconds, das ganze Tage abschneidet)
+        step_seconds = (df.index[1]-df.index[0]).total_seconds()
+        self.resolution = step_seconds/3600
+        self._resolution_min = step_seconds/60
 
         total_demand = df["total_demand"].sum()*self.resolution
         my_total_demand = self.basic_data_set["year_demand"]
@@ -100,16 +116,19 @@ class Analyse(BatterySimulation):
             total_installed_wind = 208 # MW norm
 
         ### this an extimate (for the time being seems better ...)
-        total_installed_solar = max(df["solar"]) # MWp
-        total_installed_wind = max(df["wind_onshore"])
-        df["my_demand"] = df["total_demand"] * my_total_demand / total_demand * self.resolution
-        df["my_renew"] = df["wind_onshore"] * self.basic_data_set["wind_nominal_power"] / total_installed_wind * self.resolution
-        df["my_renew"] += df["solar"] * self.basic_data_set["solar_max_power"] / total_installed_solar * self.resolution
+        total_installed_solar = df["solar"].max() # MWp
+        total_installed_wind = df["wind_onshore"].max()
+        # Auf den ndarrays rechnen und je Spalte einmal zuweisen
+        # (keine Series-Zwischenergebnisse)
+        df["my_demand"] = df["total_demand"].to_numpy() * my_total_demand / total_demand * self.resolution
+        renew = df["wind_onshore"].to_numpy() * self.basic_data_set["wind_nominal_power"] / total_installed_wind * self.resolution
+        renew += df["solar"].to_numpy() * self.basic_data_set["solar_max_power"] / total_installed_solar * self.resolution
+        df["my_renew"] = renew
 
         # print(my_total_demand, sum(df["my_demand"]), sum(pos)+sum(neg))
-        df = df.fillna(0)
+        df.fillna(0, inplace=True)
         
-        print(f"✓ Loaded {len(df)} {(df.index[1]-df.index[0]).seconds/60} minutes records")
+        print(f"✓ Loaded {len(df)} {self._resolution_min} minutes records")
         print(f"Date range: {df.index.min()} to {df.index.max()}")
 
         if DEBUG:
@@ -123,26 +142,9 @@ class Analyse(BatterySimulation):
 
     def prepare_price(self):
         if self.year == None:
-            self.data["price_per_kwh"] = self.data["my_demand"]*0+self.costs_per_kwh
+            self.data["price_per_kwh"] = np.full(len(self.data), self.costs_per_kwh, dtype=float)
         else:
-            path = f"{root_dir}/costs"
-            costs = pd.read_csv(f"{path}/{self.year}-hour-price.csv")
-            costs["price"] /= 100
-            total_average = costs["price"].mean()
-            
-            # ✓ OPTIMIERT: Verwende pandas rolling() statt Schleife
-            window_size = 25  # 12 vor + 12 nach + aktueller Wert
-            costs["avrgprice"] = costs["price"].rolling(
-                window=window_size, 
-                center=True, 
-                min_periods=1
-            ).mean()
-            
-            # Fülle Randwerte mit total_average
-            costs.fillna({"":total_average}, inplace=True)
-            
-            costs["dtime"] = pd.to_datetime(costs["time"])
-            costs = costs.set_index("dtime")
+            costs = _load_costs(self.year, f"{root_dir}/costs")
             
             if costs.index[0].year != self.year:
                 raise Exception("Year mismatch")
@@ -150,52 +152,55 @@ class Analyse(BatterySimulation):
             # ✓ OPTIMIERT: Verwende vectorized Operations
             # Berechne die Stunden-Differenz einmal
             start_time = costs.index[0]
-            hours_diff = ((self.data.index - start_time).total_seconds() / 3600).astype(int)
+            hours_diff = ((self.data.index - start_time).total_seconds() / 3600).astype(int).to_numpy()
             hours_diff = np.clip(hours_diff, 0, len(costs)-1)
             
-            # Nutze iloc mit Array-Indexing (viel schneller!)
-            self.data["price_per_kwh"] = costs["price"].iloc[hours_diff].values + self.basic_data_set["marketing_costs"]
-            self.data["avrgprice"] = costs["avrgprice"].iloc[hours_diff].values + self.basic_data_set["marketing_costs"]
+            # Direktes ndarray-Indexing, ohne pandas-Indexing-Overhead
+            marketing_costs = self.basic_data_set["marketing_costs"]
+            self.data["price_per_kwh"] = costs["price"].to_numpy()[hours_diff] + marketing_costs
+            self.data["avrgprice"] = costs["avrgprice"].to_numpy()[hours_diff] + marketing_costs
 
     def prepare_data(self):
         if "battery_discharge" in self.basic_data_set:
             self.battery_discharge = max(0,min(1,self.basic_data_set["battery_discharge"]))*self.resolution
         else:
             self.battery_discharge = 0
-        pos, neg, exflow = [], [], []
-        for w,d in zip(self.data['my_renew'],self.data['my_demand']):
-            if w > d:
-                pos.append(d)
-                neg.append(0)
-                exflow.append(w-d)
-            else:
-                pos.append(w)
-                neg.append(d-w)
-                exflow.append(0)
-        self.pos = pos
-        self.neg = neg
-        self.exflow = exflow
-        share = sum(self.pos)/sum(self.data["my_demand"]) if sum(self.data["my_demand"]) > 0 else 0
-        spot_price = sum(self.neg*self.data["price_per_kwh"])
-        fix_price = sum(self.neg)*self.costs_per_kwh
-        spot_price_no = sum(self.data["my_demand"]*self.data["price_per_kwh"])
-        fix_price_no = self.data["my_demand"].sum()*self.costs_per_kwh
-        revenue = (self.exflow * self.data["price_per_kwh"]).sum()
+        # Aufteilung in Eigenverbrauch, Residuallast und Export (elementweise)
+        w = self.data['my_renew'].to_numpy(dtype=np.float64)
+        d = self.data['my_demand'].to_numpy(dtype=np.float64)
+        diff = w - d
+        self._renew_minus_demand = diff
+        self.pos = np.where(diff > 0, d, w)
+        self.neg = np.maximum(-diff, 0.0)
+        self.exflow = np.maximum(diff, 0.0)
+        # Summen einmal bilden, print_results & Co. greifen darauf zurück
+        self._sum_demand = float(d.sum())
+        self._sum_renew = float(w.sum())
+        self._sum_pos = float(self.pos.sum())
+        self._sum_neg = float(self.neg.sum())
+        self._sum_exflow = float(self.exflow.sum())
+        price = self.data["price_per_kwh"].to_numpy()
+        share = self._sum_pos/self._sum_demand if self._sum_demand > 0 else 0
+        spot_price = np.dot(self.neg, price)
+        fix_price = self._sum_neg*self.costs_per_kwh
+        spot_price_no = np.dot(d, price)
+        fix_price_no = self._sum_demand*self.costs_per_kwh
+        revenue = np.dot(self.exflow, price)
 
         savings_no = "NN"
         savings = f"0.00 \N{euro sign}/MWh"
         if self.battery_results_pattern is not None:
             no_ren = [-1,0,0,0,0,0,0]
-            no_bat = [-1,0.0,(self.data["my_renew"].sum()),0.0,0.0,0.0,(self.data["my_renew"]*self.data["price_per_kwh"]).sum()]
+            no_bat = [-1,0.0,self._sum_renew,0.0,0.0,0.0,np.dot(w, price)]
         else:
-            no_ren = [-1,self.data["my_demand"].sum(),0,0,spot_price_no,fix_price_no, 0]
-            no_bat = [0,sum(self.neg),sum(self.exflow),share,spot_price,fix_price, revenue]
+            no_ren = [-1,self._sum_demand,0,0,spot_price_no,fix_price_no, 0]
+            no_bat = [0,self._sum_neg,self._sum_exflow,share,spot_price,fix_price, revenue]
         self.battery_results = pd.DataFrame([no_ren, no_bat],
                                         columns=["capacity kWh","residual kWh","exflow kWh", "autarky rate", "spot price [\N{euro sign}]", "fix price [\N{euro sign}]", "revenue [\N{euro sign}]"])
         # print(f"wqithout renewables fix_price: {(sum(self.data["my_demand"])*self.costs_per_kwh/100000):.2f} T\N{euro sign}, " +
         #       f"spot_price: {((sum(self.data["my_demand"]*self.data["price_per_kwh"])/100000)):.2f} T\N{euro sign}")
 
-        self.my_total_demand = self.data["my_demand"].sum()
+        self.my_total_demand = self._sum_demand
 
     def run_analysis(self, capacity_list=[5000, 10000, 20000], 
                      power_list=[2500,5000,10000]):
@@ -214,61 +219,71 @@ class Analyse(BatterySimulation):
         self.year = self.basic_data_set["year"]
         self.costs_per_kwh = self.basic_data_set["fix_costs_per_kwh"]/100
         self.prepare_price()
+        # bei sim_dtype "float32" Zeitreihen einmal schmal ablegen statt je Lauf zu wandeln
+        self.cast_sim_columns()
         self.prepare_data()
         self.print_results()
-        for capacity, power in zip(capacity_list, power_list):
-            self.simulate_battery(capacity=capacity*1000, power=power*1000)
-            # self.print_results_with_battery()
+        # alle Kapazitäten in einem Aufruf (mit numba parallel über die Kapazitäten)
+        self.simulate_batteries([capacity*1000 for capacity in capacity_list],
+                                [power*1000 for power in power_list])
         self.print_battery_results()
         # self.visualise()
         pass
 
 
     def print_results(self):
-        print(f"reference region: {self.region}, demand: {(sum(self.data['total_demand'])/1000):.2f} GWh, solar: {(sum(self.data['solar'])/1000):.2f} GWh, wind {(sum(self.data['wind_onshore'])/1000):.2f} GWh")
-        print(f"total demand: {(sum(self.data['my_demand'])/1e3):.2f} MWh " +
-              f"total Renewable_Source: {(sum(self.data['my_renew'])/1e3):.2f} MWh")
-        print(f"total renewalbes: {(sum(self.pos)/1000):.2f} MWh, residual: {(sum(self.neg)/1000):.2f} MWh")
+        print(f"reference region: {self.region}, demand: {(self.data['total_demand'].sum()/1000):.2f} GWh, solar: {(self.data['solar'].sum()/1000):.2f} GWh, wind {(self.data['wind_onshore'].sum()/1000):.2f} GWh")
+        print(f"total demand: {(self._sum_demand/1e3):.2f} MWh " +
+              f"total Renewable_Source: {(self._sum_renew/1e3):.2f} MWh")
+        print(f"total renewalbes: {(self._sum_pos/1000):.2f} MWh, residual: {(self._sum_neg/1000):.2f} MWh")
         if self.my_total_demand == 0.0:
             print(f"share without battery 0.0")
         else:   
-            print(f"share without battery {(sum(self.pos)/self.my_total_demand):.2f}")
+            print(f"share without battery {(self._sum_pos/self.my_total_demand):.2f}")
 
     def print_battery_results(self):
         # print(self.battery_results)
-        sp0 = self.battery_results["spot price [\N{euro sign}]"].iloc[1]
-        fp0 = self.battery_results["fix price [\N{euro sign}]"].iloc[1]
-        spotprice_gain = [f"{0:.2f}",f"{0:.2f}",f"{0:.2f}"] + [f"{((sp0-s)/max(1e-10,c)):.2f}" for s,c in zip(self.battery_results["spot price [\N{euro sign}]"][3:],self.battery_results["capacity kWh"][3:])]
-        fixprice_gain = [f"{0:.2f}",f"{0:.2f}",f"{0:.2f}"] + [f"{((fp0-f)/max(1e-10,c)):.2f}" for f,c in zip(self.battery_results["fix price [\N{euro sign}]"][3:],self.battery_results["capacity kWh"][3:])]
-        if max(self.data["my_renew"].sum(),self.data["my_demand"].sum())/1000 > 1000:
+        res = self.battery_results
+        capacity = res["capacity kWh"].to_numpy()
+        residual = res["residual kWh"].to_numpy()
+        exflow = res["exflow kWh"].to_numpy()
+        autarky = res["autarky rate"].to_numpy()
+        spot_price = res["spot price [\N{euro sign}]"].to_numpy()
+        fix_price = res["fix price [\N{euro sign}]"].to_numpy()
+        # Ersparnis je kWh Batteriekapazität gegenüber "no bat"
+        divisor = np.maximum(1e-10, capacity[3:])
+        spotprice_gain = np.concatenate([np.zeros(3), (spot_price[1] - spot_price[3:]) / divisor])
+        fixprice_gain = np.concatenate([np.zeros(3), (fix_price[1] - fix_price[3:]) / divisor])
+        if max(self._sum_renew,self._sum_demand)/1000 > 1000:
             scaler=1000
             cols = ["cap MWh","resi MWh","exfl MWh", "autarky", "spp [T\N{euro sign}]", "fixp [T\N{euro sign}]", "sp \N{euro sign}/kWh", "fp \N{euro sign}/kWh"]
         else:
             scaler=1
             cols = ["cap kWh","resi kWh","exfl kWh", "autarky", "spp [\N{euro sign}]", "fixp [\N{euro sign}]", "sp \N{euro sign}/kWh", "fp \N{euro sign}/kWh"]
-        capacity_l = ["no renew","no bat"] + [f"{(c/scaler)}" for c in self.battery_results["capacity kWh"][2:]]
-        residual_l = [f"{(r/scaler):.1f}" for r in self.battery_results['residual kWh']]
-        exflowl = [f"{(e/scaler):.1f}" for e in self.battery_results["exflow kWh"]]
-        autarky_rate_l = [f"{a:.2f}" for a in self.battery_results["autarky rate"]]
-        spot_price_l = [f"{(s/scaler):.1f}" for s in self.battery_results["spot price [\N{euro sign}]"]]
-        fix_price_l = [f"{(f/scaler):.1f}" for f in self.battery_results["fix price [\N{euro sign}]"]]
-        values = np.array([capacity_l, residual_l, exflowl, autarky_rate_l, spot_price_l, fix_price_l, spotprice_gain, fixprice_gain]).T
-
-        battery_results_norm = pd.DataFrame(values,
-                                            columns=cols)
+        capacity_l = ["no renew","no bat"] + [f"{(c/scaler)}" for c in capacity[2:].tolist()]
+        values = [capacity_l,
+                  np.char.mod("%.1f", residual/scaler),
+                  np.char.mod("%.1f", exflow/scaler),
+                  np.char.mod("%.2f", autarky),
+                  np.char.mod("%.1f", spot_price/scaler),
+                  np.char.mod("%.1f", fix_price/scaler),
+                  np.char.mod("%.2f", spotprice_gain),
+                  np.char.mod("%.2f", fixprice_gain)]
+
+        battery_results_norm = pd.DataFrame(dict(zip(cols, values)))
         with pd.option_context('display.max_columns', None):
             print(battery_results_norm)
         pass
 
     def print_results_with_battery(self):
-        res = -sum(self.data["residual"])
+        res = -self.data["residual"].sum()
         if self.my_total_demand/1000 > 1000:
             scaler=1000
             unit = "MWh"
         else:
             scaler=1
             unit = "kWh"
-        print(f"total renewalbes: {(sum(self.pos)/scaler):.2f} {unit}, residual: {(res/scaler):.2f} {unit}, export: {(sum(self.data['exflow'])/scaler):.2f} {unit}")
+        print(f"total renewalbes: {(self._sum_pos/scaler):.2f} {unit}, residual: {(res/scaler):.2f} {unit}, export: {(self.data['exflow'].sum()/scaler):.2f} {unit}")
         print(f"share with battery: {((self.my_total_demand - res)/self.my_total_demand):.2f}")
         pass
 
@@ -281,28 +296,29 @@ class Analyse(BatterySimulation):
                 f.writelines(f"not pytest log: {str(datetime.now())[:19]}"+"\n")
         if end is None:
             end = len(self.data)        
+        # x-Achse und Spalten einmal als ndarray-Ausschnitt statt Series-Kopie pro Plot;
+        # rasterized: die dichten Linien (35k Punkte) als Bild statt als Vektorpfad
+        idx = self.data.index.to_numpy()[start:end]
+        def column(name):
+            return self.data[name].to_numpy()[start:end]
         fig, [ax1, ax2, ax3, ax4] = plt.subplots(4, 1, sharex=True)
-        ax1.plot(self.data.index[start:end], self.data["my_renew"][start:end], color="green")
-        ax1.plot(self.data.index[start:end], self.data["my_demand"][start:end], color="red")
-        ax1.set_ylabel("[kWh]")
-        ax1.set_title(f"Renewable_Source and Demand ({self.region})")
+        ax1.plot(idx, column("my_renew"), color="green", rasterized=True)
+        ax1.plot(idx, column("my_demand"), color="red", rasterized=True)
+        ax1.set(title=f"Renewable_Source and Demand ({self.region})", ylabel="[kWh]")
         ax1.legend(["Renewable_Source", "Demand"])
         ax1.grid(True)
-        ax2.plot(self.data.index[start:end], np.maximum(0,self.data["my_renew"][start:end]-self.data["my_demand"])[start:end], color="green")
-        ax2.plot(self.data.index[start:end], np.minimum(0,self.data["my_renew"][start:end]-self.data["my_demand"][start:end]), color="red")
+        diff = self._renew_minus_demand[start:end]
+        ax2.plot(idx, np.maximum(0, diff, out=np.empty_like(diff)), color="green", rasterized=True)
+        ax2.plot(idx, np.minimum(0, diff, out=np.empty_like(diff)), color="red", rasterized=True)
         ax2.legend(["Renewable_Source-Demand", "Residual"])
-        ax2.set_title("Renewable_Source-Demand")
-        ax2.set_ylabel("[kWh]")
+        ax2.set(title="Renewable_Source-Demand", ylabel="[kWh]")
         ax2.grid(True)
-        ax3.plot(self.data.index[start:end], self.data["battery_storage"][start:end], color = "blue")
+        ax3.plot(idx, column("battery_storage"), color = "blue", rasterized=True)
         # ax3.legend(["battery_storage"])
-        ax3.set_title("battery fillstand")
-        ax3.set_ylabel("[kWh]")
-        ax4.plot(self.data.index[start:end], self.data["residual"][start:end], color="red")
+        ax3.set(title="battery fillstand", ylabel="[kWh]")
+        ax4.plot(idx, column("residual"), color="red", rasterized=True)
         #ax4.legend(["-Demand"])
-        ax4.set_title("Residual")
-        ax4.set_xlabel("Date")
-        ax4.set_ylabel("[kWh]")
+        ax4.set(title="Residual", xlabel="Date", ylabel="[kWh]")
         ax4.grid(True)
         if hasattr(self,"pytest_path"):
             plt.savefig(f"{self.pytest_path}/fig_visualize.svg")
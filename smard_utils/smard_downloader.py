@@ -14,29 +14,112 @@ import requests
 import json
 from datetime import datetime, timedelta
 import time
+import random
 import os
+import shutil
 import zipfile
-import io
+import tempfile
 import logging
+import threading
 import argparse
 from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # --- Setup Logging ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def get_smard_data(start_date, end_date, module_ids, output_dir="smard_data"):
+def _download_window(get_session, base_url, headers, request_template, window_start, window_end, output_dir,
+                     retries=3):
+    """
+    Downloads and extracts one time window (worker for get_smard_data).
+
+    Args:
+        get_session (callable): Returns the calling thread's requests.Session.
+        base_url (str): Download endpoint.
+        headers (dict): Request headers.
+        request_template (str): JSON request form with "__FROM__"/"__TO__" placeholders.
+        window_start (datetime): First day of the window.
+        window_end (datetime): Last day of the window.
+        output_dir (str): The directory where the CSV files will be saved.
+        retries (int): Attempts before the request error is raised.
+
+    Returns:
+        list: Paths of the saved CSV files.
+
+    Raises:
+        requests.exceptions.RequestException: If the last attempt fails.
+        zipfile.BadZipFile: If the response is not a zip archive.
+    """
+    from_timestamp = int(window_start.timestamp() * 1000)
+    to_timestamp = int(window_end.timestamp() * 1000) + (24 * 60 * 60 * 1000 - 1) # end of day
+
+    # Only the timestamps differ between windows: fill them into the pre-serialized form
+    request_form = request_template.replace('"__FROM__"', str(from_timestamp)).replace('"__TO__"', str(to_timestamp))
+    payload = urlencode({'request_form': request_form})
+
+    logging.info(f"Requesting data from {window_start.strftime('%Y-%m-%d')} to {window_end.strftime('%Y-%m-%d')}...")
+
+    saved = []
+    # Stream the zip into a spooled buffer (kept in memory up to 16 MB) instead of
+    # materializing response.content and copying it into a BytesIO
+    with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as buf:
+        for attempt in range(retries):
+            # Be polite to the server: small random delay per request, backing off on errors
+            time.sleep(random.uniform(0.2, 0.6) * 2 ** attempt)
+            try:
+                with get_session().post(base_url, headers=headers, data=payload, timeout=30, stream=True) as response:
+                    response.raise_for_status()
+                    response.raw.decode_content = True
+                    buf.seek(0)
+                    buf.truncate()
+                    shutil.copyfileobj(response.raw, buf)
+                break
+            except requests.exceptions.RequestException as e:
+                if attempt == retries - 1:
+                    raise
+                logging.warning(f"Request for {window_start.strftime('%Y-%m-%d')} failed ({e}), retrying...")
+
+        buf.seek(0)
+        try:
+            with zipfile.ZipFile(buf) as z:
+                for file_info in z.infolist():
+                    if file_info.filename.endswith('.csv'):
+                        # Create a unique filename to avoid overwriting
+                        output_filename = f"Stromerzeugung_{window_start.strftime('%Y%m%d')}_{window_end.strftime('%Y%m%d')}.csv"
+                        output_path = os.path.join(output_dir, output_filename)
+                        # Write under the final name directly: extracting under the archive
+                        # name and renaming could collide between concurrent windows
+                        with z.open(file_info) as src, open(output_path, 'wb') as dst:
+                            shutil.copyfileobj(src, dst)
+                        saved.append(output_path)
+        except zipfile.BadZipFile:
+            buf.seek(0)
+            logging.error("Downloaded file is not a valid zip file. Response text: %s",
+                          buf.read(200).decode(errors='replace'))
+            raise
+    return saved
+
+
+def get_smard_data(start_date, end_date, module_ids, output_dir="smard_data", max_workers=6):
     """
     Downloads electricity generation data from smard.de for a given period.
 
     The data is downloaded in chunks of up to 14 days, as the API seems to have a limit.
-    The downloaded zip files are extracted, and the contained CSV files are saved.
+    The chunks are requested concurrently, each worker thread over its own pooled
+    session (requests.Session is not thread-safe), the downloaded zip files are
+    extracted, and the contained CSV files are saved.
 
     Args:
         start_date (datetime): The start date of the data period.
         end_date (datetime): The end date of the data period.
         module_ids (list): A list of integer module IDs for the data categories.
         output_dir (str): The directory where the CSV files will be saved.
+        max_workers (int): Number of concurrent requests.
+
+    Raises:
+        RuntimeError: If windows failed to download; the other windows are
+            still saved.
     """
     base_url = "https://www.smard.de/nip-download-manager/nip/download/market-data"
     
@@ -44,67 +127,68 @@ def get_smard_data(start_date, end_date, module_ids, output_dir="smard_data"):
         os.makedirs(output_dir)
         logging.info(f"Created output directory: {output_dir}")
 
+    # The API seems to handle up to 14 days per request well.
+    windows = []
     current_date = start_date
     while current_date <= end_date:
-        # The API seems to handle up to 14 days per request well.
         chunk_end_date = min(current_date + timedelta(days=13), end_date)
-        
-        from_timestamp = int(current_date.timestamp() * 1000)
-        to_timestamp = int(chunk_end_date.timestamp() * 1000) + (24 * 60 * 60 * 1000 - 1) # end of day
-
-        market_data_attributes = {
-            "resolution": "hour",
-            "from": from_timestamp,
-            "to": to_timestamp,
-            "moduleIds": module_ids,
-            "selectedCategory": 1, # Stromerzeugung
-            "activeChart": False,
-            "style": "color",
-            "categoriesModuleOrder": {},
-            "region": "DE",
-            "language": "de",
-            "format": "CSV"
-        }
-
-        # The server expects a URL-encoded form where 'request_form' contains the JSON string.
-        # We must manually encode it to get the correct format.
-        payload = urlencode({'request_form': json.dumps(market_data_attributes)})
-
-        # The server is particular about headers. We need to mimic a browser request.
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36',
-            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-        }
-
-        logging.info(f"Requesting data from {current_date.strftime('%Y-%m-%d')} to {chunk_end_date.strftime('%Y-%m-%d')}...")
-
-        if True:
-            # Send the request with the correct headers and payload
-            response = requests.post(base_url, headers=headers, data=payload)
-            response.raise_for_status()
-
-            # The response is a zip file in memory
-            with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-                for file_info in z.infolist():
-                    if file_info.filename.endswith('.csv'):
-                        # Create a unique filename to avoid overwriting
-                        output_filename = f"Stromerzeugung_{current_date.strftime('%Y%m%d')}_{chunk_end_date.strftime('%Y%m%d')}.csv"
-                        output_path = os.path.join(output_dir, output_filename)
-                        z.extract(file_info, path=output_dir)
-                        # Rename the extracted file
-                        os.rename(os.path.join(output_dir, file_info.filename), output_path)
-                        logging.info(f"  -> Saved {output_path}")
-
-        elif False: # requests.exceptions.RequestException as e:
-            logging.error(f"An error occurred during request: {e}")
-        else: # zipfile.BadZipFile:
-            logging.error("Downloaded file is not a valid zip file. Response text: %s", response.text[:200])
-
-        # Move to the next time window
+        windows.append((current_date, chunk_end_date))
         current_date = chunk_end_date + timedelta(days=1)
-        
-        # Be polite to the server
-        time.sleep(1)
+
+    # The request form only differs in from/to per window, so serialize it once.
+    market_data_attributes = {
+        "resolution": "hour",
+        "from": "__FROM__",
+        "to": "__TO__",
+        "moduleIds": module_ids,
+        "selectedCategory": 1, # Stromerzeugung
+        "activeChart": False,
+        "style": "color",
+        "categoriesModuleOrder": {},
+        "region": "DE",
+        "language": "de",
+        "format": "CSV"
+    }
+    # The server expects a URL-encoded form where 'request_form' contains the JSON string.
+    request_template = json.dumps(market_data_attributes)
+
+    # The server is particular about headers. We need to mimic a browser request.
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36',
+        'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+    }
+
+    local = threading.local()
+    sessions = []
+
+    def get_session():
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+            sessions.append(local.session)
+        return local.session
+
+    failed = []
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_download_window, get_session, base_url, headers, request_template,
+                                       window_start, window_end, output_dir): window_start
+                       for window_start, window_end in windows}
+            for future in as_completed(futures):
+                try:
+                    saved = future.result()
+                except (requests.exceptions.RequestException, zipfile.BadZipFile) as e:
+                    logging.error(f"Window starting {futures[future].strftime('%Y-%m-%d')} failed: {e}")
+                    failed.append(futures[future])
+                    continue
+                for output_path in saved:
+                    logging.info(f"  -> Saved {output_path}")
+    finally:
+        for session in sessions:
+            session.close()
+
+    if failed:
+        raise RuntimeError("Download failed for the windows starting "
+                           + ", ".join(d.strftime('%Y-%m-%d') for d in sorted(failed)))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Download electricity generation data from smard.de.")
@@ -10,8 +10,7 @@ import os
 import sys
 import logging
 
-from smard_utils.core.battery import Battery
-from smard_utils.core.bms import BatteryManagementSystem
+from smard_utils.core.bms import run_capacities
 from smard_utils.core.analytics import BatteryAnalytics
 from smard_utils.drivers.solar_driver import SolarDriver
 from smard_utils.bms_strategies.dynamic_discharge import DynamicDischargeStrategy
@@ -61,13 +60,15 @@ class SolBatSys:
         self.data = self.driver.data
 
     def run_analysis(self, capacity_list=[1.0, 5, 10, 20, 50, 70],
-                     power_list=[0.5, 2.5, 5, 10, 25, 35]):
+                     power_list=[0.5, 2.5, 5, 10, 25, 35],
+                     n_jobs=1):
         """
         Run battery analysis for multiple capacities.
 
         Args:
             capacity_list: List of battery capacities (MWh)
             power_list: List of battery powers (MW)
+            n_jobs: Worker processes for the capacities (1 = serial, None = all cores)
         """
         print("\nStarting solar battery analysis...")
 
@@ -75,29 +76,24 @@ class SolBatSys:
         full_capacity_list = [0.0] + list(capacity_list)
         full_power_list = [0.0] + list(power_list)
 
-        for capacity, power in zip(full_capacity_list, full_power_list):
-            battery = Battery(self.basic_data_set, capacity * 1000, power * 1000)
-            bms = BatteryManagementSystem(self.strategy, battery, self.driver)
-            bms.initialize()
+        price_arr = self.driver.data['price_per_kwh'].to_numpy(dtype=np.float64, copy=False)
+        avg_arr = self.driver.data['avrgprice'].to_numpy(dtype=np.float64, copy=False)
 
-            # Simulation loop
-            results = []
-            for i in range(len(self.driver)):
-                price = self.driver.data['price_per_kwh'].iloc[i]
-                avg_price = self.driver.data['avrgprice'].iloc[i]
-                step_result = bms.step(i, price, avg_price)
-                results.append(step_result)
+        # One simulation per capacity, in worker processes if n_jobs > 1
+        runs = run_capacities(self.strategy, self.driver, self.basic_data_set,
+                              [capacity * 1000 for capacity in full_capacity_list],
+                              [power * 1000 for power in full_power_list],
+                              price_arr, avg_arr, n_jobs=n_jobs)
 
+        for capacity, power, (bms, results) in zip(full_capacity_list, full_power_list, runs):
             # Record results
             self.analytics.add_simulation_result(
                 capacity * 1000, power * 1000, bms, results
             )
 
             # Track export flags
-            self.exporting_l.append((
-                np.size(bms.export_flags) - np.count_nonzero(bms.export_flags),
-                bms.export_flags.sum()
-            ))
+            exported = np.count_nonzero(bms.export_flags)
+            self.exporting_l.append((bms.export_flags.size - exported, exported))
 
         # Get results
         self.battery_results = self.analytics.get_results_dataframe()
@@ -110,8 +106,6 @@ class SolBatSys:
 
     def _convert_to_legacy_format(self):
         """Convert new results format to legacy solar format."""
-        df = self.battery_results
-
         # Create "always export" baseline (theoretical maximum)
         baseline_always = {
             'capacity kWh': -1.0,  # Special marker
@@ -119,19 +113,10 @@ class SolBatSys:
             'revenue [€]': (self.data['my_renew'] * self.data['price_per_kwh']).sum()
         }
 
-        # Start with "always" baseline, then add actual simulation results
-        # (including the 0.0 MWh no-battery simulation which is now in df)
-        legacy_df = pd.DataFrame([baseline_always])
-
-        for _, row in df.iterrows():
-            legacy_row = {
-                'capacity kWh': row['capacity_kwh'],
-                'exflow kWh': row['export_kwh'],
-                'revenue [€]': row['revenue_eur']
-            }
-            legacy_df = pd.concat([legacy_df, pd.DataFrame([legacy_row])], ignore_index=True)
-
-        self.battery_results = legacy_df
+        # "always" baseline, then the actual simulation results
+        # (including the 0.0 MWh no-battery simulation)
+        self.battery_results = self.analytics.get_legacy_results_dataframe(
+            baseline_always, columns=('capacity_kwh', 'export_kwh', 'revenue_eur'))
 
     def print_battery_results(self):
         """
@@ -142,8 +127,13 @@ class SolBatSys:
         rev0 = (self.data["price_per_kwh"] * self.data["my_renew"]).sum()
         exf0 = self.data["my_renew"].sum()
         texp0 = len(self.data["my_renew"]) * self.resolution
+        # Result columns as ndarrays once instead of slicing the Series per list
+        res = self.battery_results
+        capacity = res["capacity kWh"].to_numpy()
+        exflow = res["exflow kWh"].to_numpy()
+        revenue = res["revenue [€]"].to_numpy()
         # Row 1 is the no-battery (0.0 MWh) baseline in our implementation
-        rev1 = self.battery_results["revenue [€]"].iloc[1] if len(self.battery_results) > 1 else 0
+        rev1 = revenue[1] if len(revenue) > 1 else 0
 
         # Auto-scale
         if abs(self.data["my_renew"].sum()) / 1000 > 1000:
@@ -154,24 +144,13 @@ class SolBatSys:
             cols = ["cap kWh", "exfl kWh", "export [h]", "rev [€]", "revadd [€]", "rev €/kWh"]
 
         # Format results (include row 1 which is the no-battery baseline)
-        capacity_l = ["always"] + [f"{(c / scaler)}" for c in self.battery_results["capacity kWh"][1:]]
-
-        exflowl = [f"{(exf0 / scaler):.1f}"] + [
-            f"{(e / scaler):.1f}" for e in self.battery_results["exflow kWh"][1:]
-        ]
-
-        revenue_l = [f"{(rev0 / scaler):.1f}"] + [
-            f"{(f / scaler):.1f}" for f in self.battery_results["revenue [€]"][1:]
-        ]
-
-        revenue_gain = [f"{((rev0 - rev1) / scaler):.2f}"] + [
-            f"{((r - rev1) / scaler):.2f}" for r in self.battery_results["revenue [€]"][1:]
-        ]
+        cost_per_kwh = (revenue[2:] - rev1) / np.maximum(1e-10, capacity[2:])
 
-        capacity_costs = [f"{0:.2f}"] + [f"{0:.2f}"] + [
-            f"{((r - rev1) / max(1e-10, c)):.2f}"
-            for r, c in zip(self.battery_results["revenue [€]"][2:], self.battery_results["capacity kWh"][2:])
-        ]
+        capacity_l = ["always"] + [f"{(c / scaler)}" for c in capacity[1:].tolist()]
+        exflowl = [f"{(exf0 / scaler):.1f}"] + [f"{v:.1f}" for v in exflow[1:] / scaler]
+        revenue_l = [f"{(rev0 / scaler):.1f}"] + [f"{v:.1f}" for v in revenue[1:] / scaler]
+        revenue_gain = [f"{((rev0 - rev1) / scaler):.2f}"] + [f"{v:.2f}" for v in (revenue[1:] - rev1) / scaler]
+        capacity_costs = [f"{0:.2f}"] + [f"{0:.2f}"] + [f"{v:.2f}" for v in cost_per_kwh]
 
         # expo_l: "always" baseline + actual simulation export times (including 0.0 MWh)
         expo_l = [f"{int(texp0)}"] + [f"{int(e[1] * self.resolution)}" for e in self.exporting_l]
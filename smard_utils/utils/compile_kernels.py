@@ -0,0 +1,71 @@
+"""
+Warm the on-disk Numba cache of the simulation kernels.
+
+All kernels are decorated with ``cache=True``: the first call per type
+signature compiles them and stores the machine code next to the sources
+(``__pycache__``, or ``NUMBA_CACHE_DIR``); later processes only load it.
+Running this once after installation moves the one-off compile cost out of
+the first analysis run:
+
+    python -m smard_utils.utils.compile_kernels
+"""
+
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from smard_utils.utils.jit import NUMBA_AVAILABLE
+
+
+def warm_up(dtypes=("float64", "float32")) -> float:
+    """
+    Run every scan-capable battery model once on a short synthetic series.
+
+    Covers the single-run scan, the capacity sweep and the result
+    aggregation for each simulation dtype.
+
+    Args:
+        dtypes: Simulation dtypes to compile for (see BatterySimulation.sim_dtype)
+
+    Returns:
+        Elapsed time in seconds
+    """
+    from smard_utils.battery_model import BatteryModel, BatterySolBatModel, BatterySourceModel
+    from smard_utils.battery_simulation import BatterySimulation
+
+    start = time.perf_counter()
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2024-01-01", periods=48, freq="h")
+    price = rng.uniform(0.0, 0.2, index.size)
+    data = pd.DataFrame({
+        "my_renew": rng.uniform(0, 500, index.size),
+        "my_demand": rng.uniform(0, 400, index.size),
+        "price_per_kwh": price,
+        "avrgprice": np.full(index.size, price.mean()),
+    }, index=index)
+
+    # run_battery_comparison prints its result table
+    with contextlib.redirect_stdout(io.StringIO()):
+        for model in (BatteryModel, BatterySourceModel, BatterySolBatModel):
+            for dtype in dtypes:
+                sim = BatterySimulation(data=data.copy(), basic_data_set={"sim_dtype": dtype},
+                                        battery_model=model)
+                sim.resolution = 1.0
+                sim.simulate_battery(capacity=200, power=100)
+                sim.run_battery_comparison(capacities=[100, 200], n_jobs=2)
+    return time.perf_counter() - start
+
+
+def main():
+    """Compile and cache the kernels (no-op without numba)."""
+    if not NUMBA_AVAILABLE:
+        print("numba is not installed: the kernels run as plain Python, nothing to compile")
+        return
+    print(f"Simulation kernels compiled and cached in {warm_up():.1f} s")
+
+
+if __name__ == "__main__":
+    main()
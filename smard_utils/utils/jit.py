@@ -0,0 +1,53 @@
+"""
+Optional Numba JIT support.
+
+Exposes ``njit``, ``prange`` and ``vectorize`` for the simulation kernels.
+When numba is installed (``pip install -e .[fast]``) the kernels are
+compiled to native code; otherwise the decorators are no-ops (``vectorize``
+falls back to ``numpy.vectorize``) and the same functions run as plain
+Python.
+"""
+
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import numba
+    from numba import njit, prange, vectorize
+    NUMBA_AVAILABLE = True
+except ImportError:
+    numba = None
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op replacement for numba.njit (bare or with options)."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
+
+    def vectorize(*args, **kwargs):
+        """Replacement for numba.vectorize (bare or with signatures) via numpy.vectorize."""
+        def decorator(func):
+            return np.vectorize(func, otypes=[float])
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return decorator(args[0])
+        return decorator
+
+
+@contextmanager
+def limit_threads(n_threads):
+    """Run numba parallel kernels with at most n_threads threads (None = all); no-op without numba."""
+    if numba is None or n_threads is None:
+        yield
+        return
+    previous = numba.get_num_threads()
+    numba.set_num_threads(max(1, min(n_threads, numba.config.NUMBA_NUM_THREADS)))
+    try:
+        yield
+    finally:
+        numba.set_num_threads(previous)
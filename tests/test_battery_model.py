@@ -0,0 +1,314 @@
+"""
+Tests for battery_model.py - legacy battery models and kernels.
+"""
+
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from smard_utils import battery_model, battery_simulation
+from smard_utils.battery_model import (Balance, BatteryLPModel, BatteryModel, BatteryRawBatModel,
+                                       BatterySolBatModel, BatterySourceModel, _balance_strategy,
+                                       _r0_loss, r0_losses)
+from smard_utils.battery_simulation import BatteryManagementSystem, BatterySimulation
+
+
+class TestR0Losses:
+    """Test suite for the I²R loss kernels."""
+
+    def test_r0_losses_array_matches_scalar(self):
+        """The ufunc gives the same values as the scalar kernel."""
+        power = np.array([0.0, -300.0, 5.0, 1000.0, 2500.0])
+
+        losses = r0_losses(power, 0.25, 0.006, 800.0)
+
+        expected = [_r0_loss(p, 0.25, 0.006, 800.0) for p in power]
+        np.testing.assert_allclose(losses, expected, rtol=1e-12)
+
+    def test_r0_losses_disabled(self):
+        """No losses without internal resistance or voltage."""
+        power = np.array([100.0, 200.0])
+
+        assert not r0_losses(power, 1.0, 0.0, 800.0).any()
+        assert not r0_losses(power, 1.0, 0.006, 0.0).any()
+
+    def test_battery_model_r0_losses_accepts_arrays(self):
+        """BatteryModel._r0_losses handles scalars and arrays alike."""
+        battery = BatteryModel({})
+        power = np.array([50.0, 500.0])
+
+        losses = battery._r0_losses(power, 1.0)
+
+        assert losses == pytest.approx([battery._r0_losses(p, 1.0) for p in power])
+
+
+class TestRunBatch:
+    """Test suite for BatteryModel.run_batch."""
+
+    @pytest.fixture
+    def data(self):
+        rng = np.random.default_rng(3)
+        periods = 96
+        index = pd.date_range("2024-03-01", periods=periods, freq="15min")
+        price = rng.uniform(0.02, 0.25, periods)
+        return pd.DataFrame({
+            "my_renew": rng.uniform(0, 800, periods),
+            "my_demand": rng.uniform(0, 600, periods),
+            "price_per_kwh": price,
+            "avrgprice": np.full(periods, price.mean()),
+        }, index=index)
+
+    def test_run_batch_matches_simulation(self, data):
+        """run_batch reproduces BatterySimulation for the same battery."""
+        battery = BatteryModel({}, capacity_kwh=1500.0, p_max_kw=700.0)
+        battery.data = data
+        history = battery.run_batch(data["my_renew"], data["my_demand"], data["price_per_kwh"],
+                                    data["avrgprice"], dt_h=0.25)
+
+        sim = BatterySimulation(data=data.copy(), basic_data_set={})
+        sim.resolution = 0.25
+        sim.simulate_battery(capacity=1500.0, power=700.0)
+
+        np.testing.assert_allclose(history["storage_kwh"], sim.data["battery_storage"])
+        np.testing.assert_allclose(history["residual_kwh"], sim.data["residual"])
+        np.testing.assert_allclose(history["exflow_kwh"], sim.data["exflow"])
+        assert battery.current_storage == history["storage_kwh"].iloc[-1]
+        assert list(history.index) == list(data.index)
+
+    def test_history_is_columnar(self, data):
+        """history holds one float64 array per field, history_df wraps them."""
+        battery = BatteryModel({}, capacity_kwh=1500.0, p_max_kw=700.0)
+        battery.data = data
+        battery.run_batch(data["my_renew"], data["my_demand"], data["price_per_kwh"],
+                          data["avrgprice"], dt_h=0.25)
+
+        history = battery.history
+        assert all(isinstance(v, np.ndarray) and v.dtype == np.float64 and len(v) == len(data)
+                   for v in history.values())
+        np.testing.assert_allclose(history["soc"], history["storage_kwh"] / 1500.0)
+        pd.testing.assert_index_equal(battery.history_df.index, data.index)
+
+        battery.allocate_history(10)
+        assert battery.history_df.empty
+
+    @pytest.mark.parametrize("model", [BatteryModel, BatterySolBatModel])
+    def test_collect_none_matches_history_sums(self, data, model):
+        """collect='none' returns the totals of the full run without touching history."""
+        args = (data["my_renew"], data["my_demand"], data["price_per_kwh"], data["avrgprice"])
+        full = model({}, capacity_kwh=1500.0, p_max_kw=700.0)
+        full.data = data
+        history = full.run_batch(*args, dt_h=0.25, collect="arrays")
+
+        battery = model({}, capacity_kwh=1500.0, p_max_kw=700.0)
+        battery.data = data
+        totals = battery.run_batch(*args, dt_h=0.25, collect="none")
+
+        for key in ("inflow_kwh", "outflow_kwh", "residual_kwh", "exflow_kwh", "loss_kwh"):
+            assert totals[key] == pytest.approx(history[key].sum(), rel=1e-9)
+        assert totals["revenue"] == pytest.approx(history["exflow_kwh"] @ history["price"], rel=1e-9)
+        assert totals["export_steps"] == np.count_nonzero(history["exflow_kwh"] > 0)
+        assert battery.current_storage == pytest.approx(full.current_storage)
+        assert len(battery.history["soc"]) == 0
+
+    def test_run_batch_float32(self, data):
+        """float32 batch keeps float32 buffers and tracks the float64 run closely."""
+        args = (data["my_renew"], data["my_demand"], data["price_per_kwh"], data["avrgprice"])
+        ref = BatteryModel({}, capacity_kwh=1500.0, p_max_kw=700.0)
+        ref.data = data
+        history64 = ref.run_batch(*args, dt_h=0.25, collect="arrays")
+
+        battery = BatteryModel({}, capacity_kwh=1500.0, p_max_kw=700.0)
+        battery.data = data
+        history32 = battery.run_batch(*args, dt_h=0.25, collect="arrays", dtype=np.float32)
+
+        assert all(v.dtype == np.float32 for v in history32.values())
+        np.testing.assert_allclose(history32["storage_kwh"], history64["storage_kwh"], rtol=1e-4)
+        assert history32["residual_kwh"].sum() == pytest.approx(history64["residual_kwh"].sum(),
+                                                                 rel=1e-4)
+
+    def test_collect_rejects_unknown_mode(self, data):
+        battery = BatteryModel({})
+        battery.data = data
+        with pytest.raises(ValueError):
+            battery.run_batch(data["my_renew"], data["my_demand"], data["price_per_kwh"],
+                              data["avrgprice"], collect="dict")
+
+
+class TestSolBatModel:
+    """Test suite for BatterySolBatModel.loading_strategie."""
+
+    def test_overridden_conditions_are_used(self):
+        """The battery_cond_* hooks still decide the branch of the step kernel."""
+        class IdleModel(BatterySolBatModel):
+            def battery_cond_load(self, *args, **kwargs):
+                return False
+
+            def battery_cond_export_a(self, *args, **kwargs):
+                return False
+
+        battery = IdleModel({})
+        battery.data = pd.DataFrame(index=pd.date_range("2024-03-01", periods=1, freq="h"))
+        battery.price_array = np.zeros(24)
+        battery.exporting = np.zeros(1, dtype=bool)
+
+        storage, inflow, outflow, residual, exflow, loss = battery.loading_strategie(
+            renew=300.0, demand=100.0, current_storage=1000.0, capacity=2000.0,
+            avrgprice=0.1, price=0.1, power_per_step=1000.0, dt_h=1.0, i=0)
+
+        assert inflow == outflow == loss == 0.0
+        assert exflow == 300.0
+        assert battery.exporting[0]
+        assert storage == pytest.approx(1000.0 * (1.0 - battery.battery_discharge))
+
+
+class TestDischargingFactor:
+    """Test suite for the hour lookup behind the discharging factor."""
+
+    def test_price_array_ranks_first_price_per_hour(self):
+        """Setting data builds the int8 hour table used by setup_discharging_factor."""
+        index = pd.date_range("2024-03-01", periods=96, freq="15min")
+        price = np.tile(np.arange(24.0)[::-1], 4)
+        battery = BatteryModel({})
+        battery.data = pd.DataFrame({"price_per_kwh": price}, index=index)
+
+        assert battery._hour_idx.dtype == np.int8
+        np.testing.assert_array_equal(battery._hour_idx, index.hour)
+
+        battery.setup_discharging_factor(0, 0.25)
+        first_prices = price[::4]
+        expected = np.argsort(np.argsort(first_prices, kind="stable"))
+        np.testing.assert_allclose(battery.price_array, expected / 23 * 2 - 1)
+
+
+def test_balance_strategy_masks():
+    """Surplus loads, deficit unloads, balanced or missing values do nothing."""
+    renew = np.array([5.0, 1.0, 2.0, np.nan])
+    demand = np.array([1.0, 5.0, 2.0, 1.0])
+    expected = [Balance.LOAD.value, Balance.UNLOAD.value, Balance.NONE.value, Balance.NONE.value]
+    assert _balance_strategy(renew, demand).tolist() == expected
+
+
+@pytest.fixture(scope="module")
+def cython_kernel(tmp_path_factory):
+    """Build _battery_kernel.pyx into a temporary directory and import it."""
+    cython_build = pytest.importorskip("Cython.Build")
+    from setuptools import Distribution, Extension
+
+    build_dir = tmp_path_factory.mktemp("cython")
+    source = Path(battery_model.__file__).with_name("_battery_kernel.pyx")
+    extensions = cython_build.cythonize([Extension("_battery_kernel", [str(source)])],
+                                        build_dir=str(build_dir), quiet=True)
+    command = Distribution({"ext_modules": extensions}).get_command_obj("build_ext")
+    command.build_lib = str(build_dir)
+    command.build_temp = str(build_dir / "temp")
+    command.ensure_finalized()
+    command.run()
+
+    spec = importlib.util.spec_from_file_location("_battery_kernel",
+                                                  command.get_ext_fullpath("_battery_kernel"))
+    kernel = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(kernel)
+    return kernel
+
+
+def test_cython_kernel_matches_scan(cython_kernel):
+    """The Cython kernel reproduces the numba/Python scan and sums."""
+    rng = np.random.default_rng(7)
+    renew = rng.uniform(0, 800, 500)
+    demand = rng.uniform(0, 600, 500)
+    strategy = _balance_strategy(renew, demand)
+    strategy[::9] = Balance.EXPORT.value
+    args = (strategy, renew, demand, rng.uniform(0.6, 1.0, 500), 1000.0, 2000.0, 1000.0, 0.25,
+            0.95, 0.95, 0.05, 0.95, 1e-4, 0.01, 800.0)
+
+    run = battery_model._py_simulate_scan(*args)
+    for result, expected in zip(cython_kernel.simulate_scan(*args), run):
+        np.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-9)
+
+    _, _, _, residuals, exflows, losses, _ = run
+    price = rng.uniform(-0.05, 0.3, 500)
+    np.testing.assert_allclose(cython_kernel.aggregate(demand, residuals, exflows, losses, price, 0.003),
+                               battery_simulation._py_aggregate(demand, residuals, exflows, losses,
+                                                                price, 0.003),
+                               rtol=1e-9)
+
+
+@pytest.mark.parametrize("model", [BatteryModel, BatterySourceModel, BatterySolBatModel,
+                                   BatteryRawBatModel, BatteryLPModel])
+def test_models_are_slotted(model):
+    """Battery models keep their parameters in __slots__, defaults included."""
+    battery = model({"min_soc": 0.1})
+    assert not hasattr(battery, "__dict__")
+    assert battery.min_soc == 0.1
+    assert battery.basic_data_set["max_soc"] == battery.max_soc
+
+
+def test_basic_data_set_reads_through():
+    """The caller's data set is read, not copied or filled with defaults."""
+    params = {"min_soc": 0.1}
+    first = BatterySourceModel(params)
+    second = BatterySourceModel(params)
+    first.basic_data_set["max_soc"] = 0.8
+
+    assert params == {"min_soc": 0.1}
+    assert second.basic_data_set["max_soc"] == 0.95
+    assert first.basic_data_set["load_threshold"] == first.load_threshold == 0.9
+
+
+class TestLPModel:
+    """Test suite for BatteryLPModel (needs scipy)."""
+
+    @pytest.fixture
+    def data(self):
+        rng = np.random.default_rng(5)
+        index = pd.date_range("2024-05-01", periods=24 * 7, freq="h")
+        hour = index.hour.to_numpy()
+        solar = np.clip(np.sin((hour - 6) / 12 * np.pi), 0, None) * 1500
+        price = 0.08 + 0.1 * np.cos((hour - 19) / 24 * 2 * np.pi) + rng.normal(0, 0.01, len(index))
+        return pd.DataFrame({
+            "my_renew": solar,
+            "my_demand": np.full(len(index), 300.0),
+            "price_per_kwh": price,
+            "avrgprice": np.full(len(index), price.mean()),
+        }, index=index)
+
+    def _net_value(self, data, model):
+        sim = BatterySimulation(data=data.copy(), basic_data_set={}, battery_model=model)
+        sim.resolution = 1.0
+        result = sim.simulate_battery(capacity=2000, power=1000)
+        return sim, result["revenue [€]"].iloc[0] - result["spot price [€]"].iloc[0]
+
+    def test_lp_plan_beats_greedy_step(self, data):
+        """The daily LP shifts solar surplus into the evening price peak."""
+        pytest.importorskip("scipy")
+        sim, lp_value = self._net_value(data, BatteryLPModel)
+        _, greedy_value = self._net_value(data, BatteryModel)
+
+        assert lp_value > greedy_value
+        storage = sim.data["battery_storage"].to_numpy()
+        assert storage.min() >= 0.05 * 2000 - 1e-6
+        assert storage.max() <= 0.95 * 2000 + 1e-6
+
+    def test_lp_model_rejects_step_loop(self, data):
+        """With an overridden BMS the LP model stops before the step loop."""
+        class StepBMS(BatteryManagementSystem):
+            def run_step(self, **kwargs):
+                return super().run_step(**kwargs)
+
+        sim = BatterySimulation(data=data.copy(), basic_data_set={}, battery_model=BatteryLPModel,
+                                battery_management_system=StepBMS)
+        sim.resolution = 1.0
+        with pytest.raises(ValueError, match="scan"):
+            sim.simulate_battery(capacity=2000, power=1000)
+
+    def test_lp_model_without_scipy(self, data, monkeypatch):
+        """Without scipy the LP model fails with a clear ImportError."""
+        monkeypatch.setattr(battery_model, "linprog", None)
+        battery = BatteryLPModel({})
+        battery.data = data
+        with pytest.raises(ImportError, match="scipy"):
+            battery.run_batch(data["my_renew"], data["my_demand"], data["price_per_kwh"],
+                              data["avrgprice"])
@@ -0,0 +1,275 @@
+"""
+Tests for battery_simulation.py - legacy BatterySimulation.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from smard_utils.battery_model import Balance, BatteryModel, BatterySolBatModel, BatterySourceModel
+from smard_utils.battery_simulation import BatterySimulation, BatteryManagementSystem
+from smard_utils.utils.jit import NUMBA_AVAILABLE
+
+
+class LoopBMS(BatteryManagementSystem):
+    """Overrides run_step so that simulate_battery takes the per-step loop."""
+
+    def run_step(self, **kwargs):
+        return super().run_step(**kwargs)
+
+
+def make_simulation(bms=BatteryManagementSystem, periods=72, resolution=1.0, model=BatteryModel):
+    rng = np.random.default_rng(42)
+    index = pd.date_range("2024-03-01", periods=periods, freq=f"{int(resolution*60)}min")
+    price = rng.uniform(0.02, 0.25, periods)
+    data = pd.DataFrame({
+        "my_renew": rng.uniform(0, 800, periods),
+        "my_demand": rng.uniform(0, 600, periods),
+        "price_per_kwh": price,
+        "avrgprice": np.full(periods, price.mean()),
+    }, index=index)
+    sim = BatterySimulation(data=data, basic_data_set={}, battery_management_system=bms,
+                            battery_model=model)
+    sim.resolution = resolution
+    return sim
+
+
+class TestBatterySimulation:
+    """Test suite for BatterySimulation.simulate_battery."""
+
+    @pytest.mark.parametrize("model", [BatteryModel, BatterySourceModel, BatterySolBatModel])
+    def test_default_setup_uses_scan(self, model):
+        """Unmodified BMS and battery models are simulated in a single scan."""
+        assert make_simulation(model=model)._can_vectorize()
+        assert not make_simulation(bms=LoopBMS, model=model)._can_vectorize()
+
+    def test_overridden_model_uses_step_loop(self):
+        """A model with its own loading conditions falls back to the step loop."""
+        class NoLoadModel(BatterySolBatModel):
+            def battery_cond_load(self, *args):
+                return False
+
+        assert not make_simulation(model=NoLoadModel)._can_vectorize()
+
+    @pytest.mark.parametrize("model", [BatteryModel, BatterySolBatModel])
+    def test_overridden_discharging_factor_is_called(self, model):
+        """A discharging_factor override is used per step instead of the hour table."""
+        calls = []
+
+        class CountingModel(model):
+            __slots__ = ()
+
+            def discharging_factor(self, tact, dt_h):
+                calls.append(tact)
+                return super().discharging_factor(tact, dt_h)
+
+        sim = make_simulation(model=CountingModel)
+        assert not sim._can_vectorize()
+        result = sim.simulate_battery(capacity=2000, power=1000)
+
+        assert calls == list(sim.data.index)
+        pd.testing.assert_frame_equal(result,
+                                      make_simulation(model=model).simulate_battery(capacity=2000,
+                                                                                    power=1000))
+
+    @pytest.mark.parametrize("model", [BatteryModel, BatterySourceModel, BatterySolBatModel])
+    @pytest.mark.parametrize("resolution", [1.0, 0.25])
+    def test_scan_matches_step_loop(self, resolution, model):
+        """Scan and per-step loop produce identical time series and KPIs."""
+        periods = int(72 / resolution)
+        scan = make_simulation(periods=periods, resolution=resolution, model=model)
+        loop = make_simulation(bms=LoopBMS, periods=periods, resolution=resolution, model=model)
+
+        res_scan = scan.simulate_battery(capacity=2000, power=1000)
+        res_loop = loop.simulate_battery(capacity=2000, power=1000)
+
+        pd.testing.assert_frame_equal(res_scan, res_loop)
+        for col in ["battery_storage", "battery_inflow", "battery_outflow",
+                    "residual", "exflow", "loss"]:
+            np.testing.assert_allclose(scan.data[col], loop.data[col], rtol=1e-9, atol=1e-9)
+        np.testing.assert_array_equal(scan.battery.exporting, loop.battery.exporting)
+
+    def test_storage_stays_within_soc_limits(self):
+        """Storage never leaves the [min_soc, max_soc] band."""
+        sim = make_simulation()
+        sim.simulate_battery(capacity=1000, power=500)
+        storage = sim.data["battery_storage"].to_numpy()
+        assert storage.min() >= sim.battery.min_soc * 1000 - 1e-9
+        assert storage.max() <= sim.battery.max_soc * 1000 + 1e-9
+
+    def test_source_decisions_match_hysteresis(self):
+        """Precomputed BatterySourceModel decisions follow is_loading/is_unloading."""
+        sim = make_simulation(periods=240)
+        data = sim.data
+        data["avrgprice"] = data["price_per_kwh"].rolling(5, min_periods=1).mean()
+
+        reference = BatterySourceModel({})
+        expected = []
+        for price, avrgprice in zip(data["price_per_kwh"], data["avrgprice"]):
+            if reference.is_loading(price, avrgprice):
+                expected.append(Balance.LOAD.value)
+            elif reference.is_unloading(price, avrgprice):
+                expected.append(Balance.UNLOAD.value)
+            elif price > 0.0:
+                expected.append(Balance.EXPORT.value)
+            else:
+                expected.append(Balance.NONE.value)
+
+        battery = BatterySourceModel({})
+        battery.data = data
+        battery.setup_decisions()
+
+        assert list(battery._decisions) == expected
+        assert battery.last_cycle == reference.last_cycle
+
+    def test_source_step_uses_passed_prices(self):
+        """BatterySourceModel.loading_strategie decides on its own price arguments."""
+        battery = BatterySourceModel({})
+        battery._exporting = np.zeros(2, dtype=bool)
+
+        # Kein self._data: die Entscheidung kommt allein aus price/avrgprice
+        cheap = battery.loading_strategie(renew=100.0, demand=0.0, current_storage=500.0,
+                                          capacity=1000.0, avrgprice=0.2, price=0.01,
+                                          power_per_step=100.0, i=0)
+        expensive = battery.loading_strategie(renew=100.0, demand=0.0, current_storage=500.0,
+                                              capacity=1000.0, avrgprice=0.2, price=1.0,
+                                              power_per_step=100.0, i=1)
+        assert cheap[1] > 0.0 and cheap[2] == 0.0
+        assert expensive[1] == 0.0 and expensive[2] > 0.0
+
+    def test_exporting_counts_per_run(self):
+        """exporting_l starts empty and gets one (not exported, exported) pair per run."""
+        sim = make_simulation()
+        assert sim.exporting_l == []
+        sim.simulate_battery(capacity=1000, power=500)
+        assert len(sim.exporting_l) == 1
+        assert sum(sim.exporting_l[0]) == len(sim.data)
+
+    def test_simulate_without_data_raises(self):
+        """A simulation without input data stops with a clear error."""
+        sim = BatterySimulation(basic_data_set={})
+        with pytest.raises(ValueError, match="Datenquelle"):
+            sim.simulate_battery(capacity=1000, power=500)
+
+    def test_battery_results_collects_runs(self):
+        """Each simulate_battery call adds one row to battery_results."""
+        sim = make_simulation()
+        assert sim.battery_results is None
+        first = sim.simulate_battery(capacity=1000, power=500)
+        second = sim.simulate_battery(capacity=2000, power=1000)
+
+        expected = pd.concat([first, second], ignore_index=True)
+        pd.testing.assert_frame_equal(sim.battery_results, expected)
+        third = sim.simulate_battery(capacity=500, power=250)
+        assert list(sim.battery_results["capacity kWh"]) == [1000, 2000, 500]
+        pd.testing.assert_frame_equal(sim.battery_results.iloc[[2]].reset_index(drop=True), third)
+
+    def test_battery_results_extends_preset_frame(self):
+        """Runs are appended to a frame set beforehand (e.g. the reference rows of prepare_data)."""
+        sim = make_simulation()
+        preset = pd.DataFrame({"capacity kWh": [-1.0], "residual kWh": [10.0]})
+        sim.battery_results = preset
+        result = sim.simulate_battery(capacity=1000, power=500)
+
+        expected = pd.concat([preset, result], ignore_index=True)
+        pd.testing.assert_frame_equal(sim.battery_results, expected)
+
+    def test_run_battery_comparison(self):
+        """Comparison collects one result row per capacity, in order."""
+        sim = make_simulation()
+        results = sim.run_battery_comparison(capacities=[500, 1000, 2000], power_factor=0.5)
+
+        assert list(results["capacity kWh"]) == [500, 1000, 2000]
+        single = make_simulation().simulate_battery(capacity=1000, power=500)
+        pd.testing.assert_frame_equal(results.iloc[[1]].reset_index(drop=True), single)
+
+    @pytest.mark.parametrize("model", [BatteryModel, BatterySourceModel, BatterySolBatModel])
+    def test_run_battery_comparison_parallel(self, model):
+        """Parallel comparison gives the same results as the serial one."""
+        serial_sim = make_simulation(model=model)
+        parallel_sim = make_simulation(model=model)
+        serial = serial_sim.run_battery_comparison(capacities=[500, 1000, 2000])
+        parallel = parallel_sim.run_battery_comparison(capacities=[500, 1000, 2000], n_jobs=2)
+
+        pd.testing.assert_frame_equal(serial, parallel)
+        if NUMBA_AVAILABLE:
+            # threaded sweep keeps the series of the last run, like the serial loop
+            pd.testing.assert_frame_equal(serial_sim.data, parallel_sim.data)
+
+    def test_run_battery_comparison_processes(self):
+        """With a step-loop BMS the parallel comparison runs in worker processes."""
+        serial = make_simulation(bms=LoopBMS).run_battery_comparison(capacities=[500, 1000])
+        parallel = make_simulation(bms=LoopBMS).run_battery_comparison(capacities=[500, 1000],
+                                                                        n_jobs=2)
+
+        pd.testing.assert_frame_equal(serial, parallel)
+
+    @pytest.mark.parametrize("model", [BatteryModel, BatterySourceModel, BatterySolBatModel])
+    def test_simulate_batteries_matches_serial(self, model):
+        """simulate_batteries gives the same rows and series as repeated simulate_battery."""
+        serial = make_simulation(model=model)
+        batch = make_simulation(model=model)
+        for capacity, power in [(500, 250), (1000, 500), (2000, 1000)]:
+            serial.simulate_battery(capacity=capacity, power=power)
+        batch.simulate_batteries([500, 1000, 2000], [250, 500, 1000])
+
+        pd.testing.assert_frame_equal(serial.battery_results, batch.battery_results)
+        pd.testing.assert_frame_equal(serial.data, batch.data)
+
+    def test_float32_matches_float64(self):
+        """Simulation in float32 reproduces the float64 KPIs to 4 decimals."""
+        sim64 = make_simulation(periods=24 * 14)
+        sim32 = make_simulation(periods=24 * 14)
+        sim32.sim_dtype = "float32"
+
+        res64 = sim64.simulate_battery(capacity=2000, power=1000)
+        res32 = sim32.simulate_battery(capacity=2000, power=1000)
+
+        assert sim32.data["battery_storage"].dtype == np.float32
+        assert res32["autarky rate"].iloc[0] == pytest.approx(res64["autarky rate"].iloc[0], abs=1e-4)
+        assert res32["residual kWh"].iloc[0] == pytest.approx(res64["residual kWh"].iloc[0], rel=1e-4)
+
+    def test_cast_sim_columns_float32(self):
+        """cast_sim_columns stores the inputs as float32, _columns then needs no copy."""
+        sim = make_simulation()
+        sim.sim_dtype = "float32"
+        sim.cast_sim_columns()
+
+        renew, price = sim._columns("my_renew", "price_per_kwh")
+        assert renew.dtype == np.float32
+        assert np.shares_memory(price, sim.data["price_per_kwh"].to_numpy())
+
+
+def test_compile_kernels_warm_up():
+    """The kernel warm-up runs all scan-capable models without errors."""
+    from smard_utils.utils.compile_kernels import warm_up
+
+    assert warm_up(dtypes=("float64",)) >= 0.0
+
+
+_JIT_RESULTS_SCRIPT = """
+import json, sys
+sys.path.insert(0, sys.argv[1])
+from tests.test_battery_simulation import make_simulation
+from smard_utils.battery_model import BatteryModel, BatterySolBatModel, BatterySourceModel
+print(json.dumps([make_simulation(periods=500, model=m).simulate_battery(capacity=2000, power=1000)
+                  .to_numpy().tolist() for m in (BatteryModel, BatterySourceModel, BatterySolBatModel)]))
+"""
+
+
+@pytest.mark.skipif(not NUMBA_AVAILABLE, reason="needs numba")
+def test_jit_kernels_match_python_exactly():
+    """Compiled kernels give bit-identical results to NUMBA_DISABLE_JIT (no fastmath)."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = []
+    for disable in ("0", "1"):
+        out = subprocess.run([sys.executable, "-c", _JIT_RESULTS_SCRIPT, root], check=True,
+                             capture_output=True, text=True,
+                             env={**os.environ, "NUMBA_DISABLE_JIT": disable})
+        runs.append(json.loads(out.stdout.splitlines()[-1]))
+    assert runs[0] == runs[1]
@@ -7,7 +7,8 @@ import pandas as pd
 import numpy as np
 import tempfile
 import os
-from smard_utils.core.analytics import BatteryAnalytics
+from smard_utils.core.analytics import BatteryAnalytics, LEGACY_COLUMNS
+from smard_utils.core.bms import STEP_DTYPE, STEP_FIELDS
 from smard_utils.core.driver import EnergyDriver
 
 
@@ -138,6 +139,27 @@ class TestBatteryAnalytics:
         assert result['export_hours'] == 12  # 12 hours exporting (resolution 1.0)
         assert len(analytics.simulation_results) == 1
 
+    def test_add_simulation_result_structured(self):
+        """A structured array from bms.run() gives the same metrics as a list of dicts."""
+        driver = MockDriver({})
+        driver.load_data(None)
+
+        analytics = BatteryAnalytics(driver, {"fix_costs_per_kwh": 11, "marketing_costs": 0.01})
+        analytics.prepare_prices()
+
+        rng = np.random.default_rng(3)
+        step_results = np.zeros(24, dtype=STEP_DTYPE)
+        step_results['residual_kwh'] = rng.uniform(0, 20, 24)
+        step_results['export_kwh'] = rng.uniform(0, 100, 24)
+        step_results['loss_kwh'] = rng.uniform(0, 5, 24)
+        step_results['price'] = rng.uniform(-0.05, 0.3, 24)
+        as_dicts = [dict(zip(STEP_FIELDS, row.tolist())) for row in step_results]
+
+        structured = analytics.add_simulation_result(1000, 500, MockBMS(), step_results)
+        listed = analytics.add_simulation_result(1000, 500, MockBMS(), as_dicts)
+
+        assert structured == pytest.approx(listed)
+
     def test_autarky_rate_calculation(self):
         """Test autarky rate calculation."""
         driver = MockDriver({})
@@ -228,6 +250,30 @@ class TestBatteryAnalytics:
         assert 'revenue_eur' in df.columns
         assert df['capacity_kwh'].iloc[0] == 1000
 
+    def test_get_legacy_results_dataframe(self):
+        """Test legacy column names with a baseline row in front."""
+        driver = MockDriver({})
+        driver.load_data(None)
+
+        analytics = BatteryAnalytics(driver, {"fix_costs_per_kwh": 11})
+        analytics.prepare_prices()
+        for capacity in [0, 1000]:
+            step_results = [
+                {'residual_kwh': 10, 'export_kwh': 90, 'loss_kwh': 5, 'price': 0.15}
+                for _ in range(24)
+            ]
+            analytics.add_simulation_result(capacity, capacity // 2, MockBMS(), step_results)
+
+        df = analytics.get_legacy_results_dataframe({'capacity kWh': -1.0, 'exflow kWh': 0.0})
+        assert set(df.columns) == set(LEGACY_COLUMNS.values())
+        assert list(df['capacity kWh']) == [-1.0, 0, 1000]
+        assert np.isnan(df['revenue [€]'].iloc[0])
+
+        short = analytics.get_legacy_results_dataframe(
+            {'capacity kWh': -1.0}, columns=('capacity_kwh', 'export_kwh'))
+        assert list(short.columns) == ['capacity kWh', 'exflow kWh']
+        assert short['exflow kWh'].iloc[1] == df['exflow kWh'].iloc[1]
+
     def test_calculate_capacity_roi(self):
         """Test ROI calculation per capacity unit."""
         driver = MockDriver({})
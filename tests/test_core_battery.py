@@ -119,3 +119,43 @@ class TestBattery:
         # Should be less than input due to efficiency
         assert total_accounted < charge_amount
         assert stored > 0
+
+    def test_battery_history_columns(self):
+        """Test history is recorded column-wise and grows past the reserved size."""
+        battery = Battery({}, capacity_kwh=1000, p_max_kw=500)
+        battery.reserve_history(2)
+
+        results = [battery.execute(charge_kwh=50, dt_h=1.0) for _ in range(5)]
+
+        history = battery.history
+        assert len(history['storage_kwh']) == 5
+        assert list(history['storage_kwh']) == [r['storage_kwh'] for r in results]
+        assert list(history['loss_kwh']) == [r['loss_kwh'] for r in results]
+
+        battery.reset()
+        assert len(battery.history['soc']) == 0
+
+    def test_battery_step_constants_follow_dt(self):
+        """Test the per-step constants follow the timestep of each call."""
+        battery = Battery({}, capacity_kwh=1000, p_max_kw=400)
+        battery.prepare(1.0)
+
+        hourly = battery.execute(charge_kwh=1000, dt_h=1.0)
+        assert hourly['loss_kwh'] == pytest.approx(battery._calculate_i2r_loss(400, 1.0))
+
+        quarter = battery.execute(charge_kwh=1000, dt_h=0.25)
+        assert battery.step_constants(0.25)[0] == 100
+        assert quarter['loss_kwh'] == pytest.approx(battery._calculate_i2r_loss(400, 0.25))
+
+    def test_battery_parameter_changes_apply(self):
+        """Test execute() uses changed limits unless a run was prepared."""
+        battery = Battery({}, capacity_kwh=1000)
+        battery.execute(charge_kwh=100, dt_h=1)
+        battery.p_max_kw = 10
+        assert battery.execute(charge_kwh=100, dt_h=1)['stored_kwh'] < 10
+
+        battery.prepare(1)
+        battery.p_max_kw = 100
+        assert battery.execute(charge_kwh=100, dt_h=1)['stored_kwh'] < 10
+        battery.reset()
+        assert battery.execute(charge_kwh=100, dt_h=1)['stored_kwh'] > 10
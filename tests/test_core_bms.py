@@ -5,8 +5,9 @@ Tests for core/bms.py - Battery Management System.
 import pytest
 import pandas as pd
 import numpy as np
-from smard_utils.core.bms import BatteryManagementSystem, BMSStrategy
-from smard_utils.core.battery import Battery
+from smard_utils.core.bms import (STEP_DTYPE, STEP_FIELDS, BatteryManagementSystem, BMSStrategy,
+                                  run_capacities)
+from smard_utils.core.battery import HISTORY_FIELDS, Battery
 from smard_utils.core.driver import EnergyDriver
 
 
@@ -216,3 +217,109 @@ class TestBMS:
         # Should have tracked exports
         assert bms.export_flags[:10].sum() == 10
         assert bms.export_flags[10:].sum() == 0
+
+    def test_bms_run_matches_steps(self):
+        """run() stores the step() results of every timestep in a structured array."""
+        prices = np.linspace(0.05, 0.20, 24)
+        avg_prices = np.full(24, 0.10)
+
+        def make_bms():
+            strategy = MockStrategy({})
+            strategy.charge_flag = True
+            driver = MockDriver({})
+            driver.load_data(None)
+            bms = BatteryManagementSystem(strategy, Battery({}, capacity_kwh=1000, p_max_kw=500), driver)
+            bms.initialize()
+            return bms
+
+        results = make_bms().run(prices, avg_prices)
+        stepper = make_bms()
+        expected = [stepper.step(i, prices[i], avg_prices[i]) for i in range(24)]
+
+        assert results.dtype == STEP_DTYPE
+        assert results.shape == (24,)
+        for name in STEP_FIELDS:
+            np.testing.assert_array_equal(results[name], [step[name] for step in expected])
+
+
+class ArrayDriver(EnergyDriver):
+    """Driver that keeps the default get_timestep (eligible for the scan)."""
+
+    def __init__(self, basic_data_set):
+        super().__init__(basic_data_set)
+        self.resolution = 0.25
+
+    def load_data(self, data_source):
+        rng = np.random.default_rng(5)
+        dates = pd.date_range('2024-01-01', periods=96 * 3, freq='15min')
+        self._data = pd.DataFrame({
+            'my_renew': rng.uniform(0, 400, dates.size),
+            'my_demand': -rng.uniform(0, 300, dates.size),
+        }, index=dates)
+        return self._data
+
+
+@pytest.mark.parametrize("demand_sign", [-1.0, 1.0])
+def test_price_threshold_scan_matches_steps(demand_sign):
+    """The compiled scan of run() reproduces step() for PriceThresholdStrategy."""
+    from smard_utils.bms_strategies.price_threshold import PriceThresholdStrategy
+
+    driver = ArrayDriver({})
+    driver.load_data(None)
+    driver._data['my_demand'] *= demand_sign
+    rng = np.random.default_rng(6)
+    prices = rng.uniform(-0.02, 0.25, len(driver))
+    avg_prices = np.full(len(driver), 0.1)
+
+    def make_bms():
+        battery = Battery({}, capacity_kwh=1000, p_max_kw=500)
+        bms = BatteryManagementSystem(PriceThresholdStrategy({}), battery, driver)
+        bms.initialize()
+        return bms
+
+    scanned = make_bms()
+    assert scanned._scan_decisions(prices, avg_prices) is not None
+    results = scanned.run(prices, avg_prices)
+    stepper = make_bms()
+    expected = [stepper.step(i, prices[i], avg_prices[i]) for i in range(len(driver))]
+
+    for name in STEP_FIELDS:
+        np.testing.assert_array_equal(results[name], [step[name] for step in expected])
+    np.testing.assert_array_equal(scanned.export_flags, stepper.export_flags)
+    assert scanned.battery.current_storage == stepper.battery.current_storage
+    for name in HISTORY_FIELDS:
+        np.testing.assert_array_equal(scanned.battery.history[name], stepper.battery.history[name])
+
+
+def test_overridden_strategy_keeps_steps():
+    """A strategy subclass with its own decisions is not scanned."""
+    from smard_utils.bms_strategies.price_threshold import PriceThresholdStrategy
+
+    class NeverCharge(PriceThresholdStrategy):
+        def should_charge(self, context):
+            return False
+
+    prices = np.full(4, 0.1)
+    assert NeverCharge({}).scan_decisions(prices, prices) is None
+    assert MockStrategy({}).scan_decisions(prices, prices) is None
+
+
+def test_run_capacities_parallel_matches_serial():
+    """run_capacities gives the same results in worker processes as in a loop."""
+    from smard_utils.bms_strategies.price_threshold import PriceThresholdStrategy
+
+    driver = ArrayDriver({})
+    driver.load_data(None)
+    prices = np.random.default_rng(7).uniform(0.0, 0.25, len(driver))
+    avg_prices = np.full(len(driver), 0.1)
+    args = (PriceThresholdStrategy({}), driver, {}, [0.0, 500.0, 2000.0], [0.0, 250.0, 1000.0],
+            prices, avg_prices)
+
+    serial = run_capacities(*args)
+    parallel = run_capacities(*args, n_jobs=2)
+
+    assert len(parallel) == 3
+    for (bms_s, res_s), (bms_p, res_p) in zip(serial, parallel):
+        np.testing.assert_array_equal(res_s, res_p)
+        np.testing.assert_array_equal(bms_s.export_flags, bms_p.export_flags)
+        assert bms_s.battery.capacity_kwh == bms_p.battery.capacity_kwh
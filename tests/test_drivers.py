@@ -5,9 +5,11 @@ Tests for driver modules - BiogasDriver, SolarDriver, SenecDriver.
 import pytest
 import pandas as pd
 import numpy as np
+import glob
 import tempfile
 import os
-from smard_utils.drivers.biogas_driver import BiogasDriver
+from smard_utils.core.driver import read_smard_csv, load_smard_frame
+from smard_utils.drivers.biogas_driver import BiogasDriver, remove_holes_from_data
 from smard_utils.drivers.solar_driver import SolarDriver
 from smard_utils.drivers.senec_driver import SenecDriver
 
@@ -48,9 +50,12 @@ def smard_csv_file():
 
     yield temp_path
 
-    # Cleanup
+    # Cleanup, including Parquet caches written by load_smard_frame
     if os.path.exists(temp_path):
         os.unlink(temp_path)
+    directory, name = os.path.split(temp_path)
+    for cache in glob.glob(os.path.join(directory, f".{name}.*.parquet")):
+        os.unlink(cache)
 
 
 @pytest.fixture
@@ -135,6 +140,62 @@ class TestBiogasDriver:
 
         assert len(driver) == 24
 
+    def test_remove_holes_from_data_spreads_evenly(self):
+        """Test remove_holes_from_data yields evenly spaced timestamps."""
+        stamps = pd.Series(pd.date_range("2024-01-01", periods=10, freq="15min").delete([3, 7]))
+        df = remove_holes_from_data(pd.DataFrame({"DateTime_x": stamps}))
+
+        step = (stamps.iloc[-1] - stamps.iloc[0]) / (len(stamps) - 1)
+        expected = [stamps.iloc[0] + i * step for i in range(len(stamps))]
+        assert list(df["DateTime"]) == expected
+
+
+    def test_read_smard_csv_known_columns_only(self, smard_csv_file):
+        """Test read_smard_csv keeps date/time and the mapped energy columns."""
+        df = read_smard_csv(smard_csv_file)
+
+        assert list(df.columns) == ['Datum', 'Uhrzeit', 'biomass', 'hydro', 'wind_offshore',
+                                    'wind_onshore', 'solar', 'oel', 'total_demand']
+        assert df['wind_onshore'].iloc[1] == 5200
+
+    def test_read_smard_csv_non_numeric_entries(self, tmp_path):
+        """Test read_smard_csv turns '-' entries into NaN instead of failing."""
+        path = tmp_path / "smard.csv"
+        path.write_text("Datum;Uhrzeit;Photovoltaik [MWh] Originalauflösungen;Gesamtverbrauch [MWh] Originalauflösungen\n"
+                        "01.01.2024;00:00;-;50000,5\n"
+                        "01.01.2024;01:00;12,25;51000\n", encoding="utf-8")
+        df = read_smard_csv(path)
+
+        assert df['solar'].dtype == np.float64
+        assert np.isnan(df['solar'].iloc[0])
+        assert df['solar'].iloc[1] == 12.25
+        assert list(df['total_demand']) == [50000.5, 51000.0]
+
+    def test_load_smard_frame_cached(self, smard_csv_file):
+        """Test load_smard_frame returns the same frame from the Parquet cache."""
+        pytest.importorskip("pyarrow")
+        first = load_smard_frame(smard_csv_file)
+        cached = load_smard_frame(smard_csv_file)
+
+        assert first.index.name == 'DateTime' and 'Datum' not in first.columns
+        pd.testing.assert_frame_equal(first, cached)
+
+    def test_load_smard_frame_removes_stale_cache(self, smard_csv_file):
+        """Test a changed CSV replaces its old Parquet cache instead of adding one."""
+        pytest.importorskip("pyarrow")
+        directory, name = os.path.split(smard_csv_file)
+        other = os.path.join(directory, f".{name}x.1.2.00000000.parquet")
+        open(other, 'w').close()
+        first = load_smard_frame(smard_csv_file)
+        with open(smard_csv_file, 'a') as f:
+            f.write("02.01.2024;00:00;500;300;400;5000;5000;100;800;1200;600;2000;-200;50;60000\n")
+        reloaded = load_smard_frame(smard_csv_file)
+
+        caches = [f for f in os.listdir(directory) if f.startswith(f".{name}.")]
+        assert len(caches) == 1 and len(reloaded) == len(first) + 1
+        assert os.path.exists(other)
+        os.unlink(other)
+
 
 class TestSolarDriver:
     """Test suite for SolarDriver."""
@@ -201,6 +262,39 @@ class TestSolarDriver:
         assert renew > 0
         assert demand < 0
 
+    def test_solar_driver_cached_timesteps(self, smard_csv_file):
+        """Test get_timestep returns the same values from the ndarray cache."""
+        driver = SolarDriver({
+            "solar_max_power": 10000,
+            "wind_nominal_power": 0,
+            "year_demand": -100000
+        }, region="_de")
+
+        driver.load_data(smard_csv_file)
+        expected = [driver.get_timestep(i) for i in range(len(driver))]
+
+        driver.cache_timesteps()
+
+        assert [driver.get_timestep(i) for i in range(len(driver))] == expected
+
+    def test_solar_driver_cached_timesteps_follow_data(self, smard_csv_file):
+        """Test get_timestep does not serve a snapshot of replaced data."""
+        driver = SolarDriver({
+            "solar_max_power": 10000,
+            "wind_nominal_power": 0,
+            "year_demand": -100000
+        }, region="_de")
+        driver.load_data(smard_csv_file)
+        driver.cache_timesteps()
+
+        driver._data['my_renew'] *= 0
+        assert driver.get_timestep(0)[0] == 0.0
+        assert driver.get_timestep(13)[0] == 0.0
+
+        driver.load_data(smard_csv_file)
+        assert driver._timesteps is None
+        assert driver.get_timestep(13)[0] > 0
+
 
 class TestSenecDriver:
     """Test suite for SenecDriver."""
@@ -0,0 +1,86 @@
+"""
+Tests for smard_analyse.py - legacy Analyse.prepare_data.
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from smard_utils.smard_analyse import Analyse, _load_costs, _read_costs, root_dir
+
+
+@pytest.fixture
+def analyse():
+    rng = np.random.default_rng(7)
+    periods = 96
+    index = pd.date_range("2024-03-01", periods=periods, freq="15min")
+    data = pd.DataFrame({
+        "my_renew": rng.uniform(0, 800, periods),
+        "my_demand": rng.uniform(0, 600, periods),
+        "price_per_kwh": rng.uniform(0.02, 0.25, periods),
+    }, index=index)
+    a = Analyse(data=data, basic_data_set={"battery_discharge": 0.0005})
+    a.resolution = 0.25
+    a.costs_per_kwh = 0.11
+    a.prepare_data()
+    return a
+
+
+class TestPrepareData:
+    """Test suite for Analyse.prepare_data."""
+
+    def test_split_is_float_ndarray(self, analyse):
+        """pos, neg and exflow are float64 ndarrays, not lists."""
+        for arr in (analyse.pos, analyse.neg, analyse.exflow):
+            assert isinstance(arr, np.ndarray)
+            assert arr.dtype == np.float64
+
+    def test_split_balances(self, analyse):
+        """Own use plus residual gives demand, own use plus export gives renew."""
+        renew = analyse.data["my_renew"].to_numpy()
+        demand = analyse.data["my_demand"].to_numpy()
+        np.testing.assert_allclose(analyse.pos + analyse.neg, demand)
+        np.testing.assert_allclose(analyse.pos + analyse.exflow, renew)
+        assert (analyse.neg >= 0).all() and (analyse.exflow >= 0).all()
+
+    def test_no_battery_row(self, analyse):
+        """The 'no bat' row holds the totals and price products of the split."""
+        price = analyse.data["price_per_kwh"].to_numpy()
+        no_bat = analyse.battery_results.iloc[1]
+        assert no_bat["residual kWh"] == pytest.approx(analyse.neg.sum())
+        assert no_bat["exflow kWh"] == pytest.approx(analyse.exflow.sum())
+        assert no_bat["spot price [\N{euro sign}]"] == pytest.approx((analyse.neg * price).sum())
+        assert no_bat["revenue [\N{euro sign}]"] == pytest.approx((analyse.exflow * price).sum())
+        assert analyse.my_total_demand == pytest.approx(analyse.data["my_demand"].sum())
+
+
+def test_load_costs_is_cached():
+    """The hourly price table is parsed once per (year, path) and copied per caller."""
+    path = f"{root_dir}/costs"
+    costs = _load_costs(2024, path)
+    hits = _read_costs.cache_info().hits
+    costs["price"] = 0.0
+
+    again = _load_costs(2024, path)
+    assert _read_costs.cache_info().hits == hits + 1
+    assert again is not costs and again["price"].any()
+    assert {"price", "avrgprice"} <= set(again.columns)
+    assert again.index[0].year == 2024
+
+
+def test_load_costs_follows_file_changes(tmp_path):
+    """A rewritten price file is read again instead of served from the cache."""
+    source = f"{root_dir}/costs/2024-hour-price.csv"
+    target = tmp_path / "2024-hour-price.csv"
+    shutil.copy(source, target)
+    first = _load_costs(2024, str(tmp_path))
+
+    prices = pd.read_csv(target)
+    prices["price"] *= 2
+    prices.to_csv(target, index=False)
+    os.utime(target, ns=(0, os.stat(target).st_mtime_ns + 1))
+
+    np.testing.assert_allclose(_load_costs(2024, str(tmp_path))["price"], 2 * first["price"])
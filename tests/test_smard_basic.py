@@ -14,6 +14,7 @@ from smard_utils.biobatsys import main as biobatsys_main
 from smard_utils.solbatsys import main as solbatsys_main
 from smard_utils.senec_analyes import main as senec_main
 from smard_utils.community import main as community_main
+from smard_utils.simple_bms import main as simple_bms_main
 
 test_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -37,3 +38,5 @@ def test_senec_main():
 def test_community_main():
     community_main([])
 
+def test_simple_bms_main():
+    simple_bms_main({"pytest_path":f"{test_dir}/tmp"})
@@ -0,0 +1,67 @@
+"""
+Tests for smard_downloader.py - concurrent window downloads.
+"""
+
+import io
+import threading
+import zipfile
+from datetime import datetime
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from smard_utils import smard_downloader
+
+
+class FakeResponse:
+    """Streamed response holding the given bytes."""
+
+    def __init__(self, content):
+        self.raw = io.BytesIO(content)
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def fake_post(monkeypatch):
+    """Answer every window with a zip, except the one starting 15.01.2024."""
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as z:
+        z.writestr("data.csv", "Datum;Uhrzeit\n")
+    sessions = {}
+    closed = []
+
+    def post(session, url, data=None, **kwargs):
+        sessions.setdefault(threading.get_ident(), set()).add(id(session))
+        if str(int(datetime(2024, 1, 15).timestamp() * 1000)) in data:
+            return FakeResponse(b"<html>maintenance</html>")
+        return FakeResponse(archive.getvalue())
+
+    monkeypatch.setattr(requests.Session, "post", post)
+    monkeypatch.setattr(requests.Session, "close", lambda session: closed.append(id(session)))
+    monkeypatch.setattr(smard_downloader.time, "sleep", lambda seconds: None)
+    return sessions, closed
+
+
+def test_get_smard_data_reports_failed_windows(fake_post, tmp_path):
+    """A bad window is raised at the end, after the other windows were saved."""
+    sessions, closed = fake_post
+
+    with pytest.raises(RuntimeError, match="2024-01-15"):
+        smard_downloader.get_smard_data(datetime(2024, 1, 1), datetime(2024, 2, 11), [1004066],
+                                        output_dir=str(tmp_path), max_workers=2)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "Stromerzeugung_20240101_20240114.csv", "Stromerzeugung_20240129_20240211.csv"]
+    # one session per worker thread, all closed afterwards
+    assert all(len(ids) == 1 for ids in sessions.values())
+    assert len({i for ids in sessions.values() for i in ids}) == len(sessions)
+    assert sorted(closed) == sorted(i for ids in sessions.values() for i in ids)
@@ -259,6 +259,21 @@ class TestDynamicDischargeStrategy:
 
         assert -1 <= df <= 1
 
+    def test_context_factor_uses_hour_table(self):
+        """Test index-based factor lookup matches the timestamp-based one."""
+        strategy = DynamicDischargeStrategy({})
+
+        dates = pd.date_range('2024-01-01 00:00', periods=96, freq='15min')
+        data = pd.DataFrame({'price_per_kwh': np.tile(np.linspace(0.20, 0.05, 24), 4)}, index=dates)
+
+        strategy.setup_price_array(data, 0.25)
+        strategy._update_price_array(0)
+
+        assert strategy._hours.dtype == np.int8
+        for index in range(0, 96, 7):
+            context = {'index': index, 'timestamp': dates[index]}
+            assert strategy._context_factor(context) == strategy._discharging_factor(dates[index])
+
     def test_saturation_curve_below_threshold(self):
         """Test saturation curve returns 0 below threshold."""
         strategy = DynamicDischargeStrategy({})